@@ -0,0 +1,196 @@
+# Rikishi analytics from every stored bout, kept as aggregates so that no read
+# has to scan bouts:
+#
+#   rikishi_basho    one row per rikishi per basho: rank, wins and losses (fusen
+#                    wins and losses also counted on their own)
+#   head_to_head     one row per rikishi per opponent they have met, both ways round,
+#                    with the first and last basho they met in (as year * 100 + month,
+#                    since backfilled basho get ids after newer ones)
+#   rank_matchups    wins and losses of each banzuke rank (rank_no) against each other,
+#                    both ways round, fusen left out since nobody fought
+#
+# Playoff bouts (day 16) are not part of a record and are left out of all three.
+#
+# add() is called inside the caller's transaction, next to the INSERT of new bouts
+# (ingestion, backfill). analytics_days has the last day of each basho already added,
+# so add() only takes bouts after it and can't count a day twice. rebuild() starts
+# over from bouts, after a bout is corrected: `flask rebuild_analytics`.
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS rikishi_basho (
+        rikishi_id INTEGER NOT NULL,
+        basho_id INTEGER NOT NULL,
+        rank_no INTEGER NOT NULL,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        fusen_wins INTEGER NOT NULL DEFAULT 0,
+        fusen_losses INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (rikishi_id, basho_id),
+        FOREIGN KEY (rikishi_id) REFERENCES rikishi(id),
+        FOREIGN KEY (basho_id) REFERENCES basho(id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS head_to_head (
+        rikishi_id INTEGER NOT NULL,
+        opponent_id INTEGER NOT NULL,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        first_basho INTEGER NOT NULL,
+        last_basho INTEGER NOT NULL,
+        PRIMARY KEY (rikishi_id, opponent_id),
+        FOREIGN KEY (rikishi_id) REFERENCES rikishi(id),
+        FOREIGN KEY (opponent_id) REFERENCES rikishi(id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS rank_matchups (
+        rank_no INTEGER NOT NULL,
+        opponent_rank_no INTEGER NOT NULL,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (rank_no, opponent_rank_no)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS analytics_days (
+        basho_id INTEGER PRIMARY KEY NOT NULL,
+        last_day INTEGER NOT NULL,
+        FOREIGN KEY (basho_id) REFERENCES basho(id)
+    )""",
+]
+
+LAST_DAY = 15       # day 16 holds the playoff
+
+
+def add(db, basho_id):
+    """Add the basho's bouts stored since the last call to the aggregates."""
+    done = db.tuples("SELECT last_day FROM analytics_days WHERE basho_id = ?", basho_id)
+    done = done[0][0] if done else 0
+    if done >= LAST_DAY:
+        return
+    last = db.tuples("SELECT MAX(tournament_day) FROM bouts WHERE basho_id = ? AND tournament_day <= ?",
+                     basho_id, LAST_DAY)[0][0]
+    if last is None or last <= done:
+        return
+
+    # each bout twice, once from either side
+    db.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS analytics_delta (
+            rikishi_id INTEGER NOT NULL,
+            opponent_id INTEGER NOT NULL,
+            rank_no INTEGER NOT NULL,
+            opponent_rank_no INTEGER NOT NULL,
+            win INTEGER NOT NULL,
+            fusen INTEGER NOT NULL
+        )""")
+    db.execute("DELETE FROM analytics_delta")
+    db.execute("""
+        INSERT INTO analytics_delta
+        SELECT winner_id, loser_id, winner_rank, loser_rank, 1, fusen
+          FROM bouts WHERE basho_id = ? AND tournament_day > ? AND tournament_day <= ?
+         UNION ALL
+        SELECT loser_id, winner_id, loser_rank, winner_rank, 0, fusen
+          FROM bouts WHERE basho_id = ? AND tournament_day > ? AND tournament_day <= ?""",
+        basho_id, done, last, basho_id, done, last)
+
+    db.execute("""
+        INSERT INTO rikishi_basho (rikishi_id, basho_id, rank_no, wins, losses, fusen_wins, fusen_losses)
+        SELECT rikishi_id, ?, MAX(rank_no), SUM(win), SUM(1 - win), SUM(win * fusen), SUM((1 - win) * fusen)
+          FROM analytics_delta
+         GROUP BY rikishi_id
+            ON CONFLICT (rikishi_id, basho_id) DO UPDATE
+           SET wins = wins + excluded.wins,
+               losses = losses + excluded.losses,
+               fusen_wins = fusen_wins + excluded.fusen_wins,
+               fusen_losses = fusen_losses + excluded.fusen_losses""",
+        basho_id)
+    db.execute("""
+        INSERT INTO head_to_head (rikishi_id, opponent_id, wins, losses, first_basho, last_basho)
+        SELECT rikishi_id, opponent_id, SUM(win), SUM(1 - win), b.start_year * 100 + b.start_month,
+               b.start_year * 100 + b.start_month
+          FROM analytics_delta
+          JOIN basho AS b ON b.id = ?
+         GROUP BY rikishi_id, opponent_id
+            ON CONFLICT (rikishi_id, opponent_id) DO UPDATE
+           SET wins = wins + excluded.wins,
+               losses = losses + excluded.losses,
+               first_basho = MIN(first_basho, excluded.first_basho),
+               last_basho = MAX(last_basho, excluded.last_basho)""",
+        basho_id)
+    db.execute("""
+        INSERT INTO rank_matchups (rank_no, opponent_rank_no, wins, losses)
+        SELECT rank_no, opponent_rank_no, SUM(win), SUM(1 - win)
+          FROM analytics_delta
+         WHERE fusen = 0
+         GROUP BY rank_no, opponent_rank_no
+            ON CONFLICT (rank_no, opponent_rank_no) DO UPDATE
+           SET wins = wins + excluded.wins,
+               losses = losses + excluded.losses""")
+
+    db.execute("INSERT OR REPLACE INTO analytics_days (basho_id, last_day) VALUES (?, ?)", basho_id, last)
+    db.execute("DELETE FROM analytics_delta")
+
+
+def rebuild(db):
+    """Recreate every aggregate from bouts, oldest basho first. Run inside a transaction."""
+    for table in ("rikishi_basho", "head_to_head", "rank_matchups", "analytics_days"):
+        db.execute(f"DELETE FROM {table}")
+    for (basho_id,) in db.tuples("SELECT b.id FROM basho AS b "
+                                 " WHERE EXISTS (SELECT 1 FROM bouts WHERE basho_id = b.id) "
+                                 " ORDER BY b.start_year, b.start_month"):
+        add(db, basho_id)
+
+
+def career(db, rikishi_id):
+    """
+    A rikishi's record over every stored basho and basho by basho, or None for an
+    unknown rikishi: {rikishi_id, ring_name, wins, losses, fusen_wins, fusen_losses,
+    basho: [{basho_id, start_year, start_month, rank_no, wins, losses, ...}, ...]}
+    """
+    rikishi = db.execute("SELECT id AS rikishi_id, ring_name FROM rikishi WHERE id = ?", rikishi_id)
+    if not rikishi:
+        return None
+    rikishi = rikishi[0]
+    basho = db.execute("""
+        SELECT rb.basho_id, b.start_year, b.start_month, rb.rank_no,
+               rb.wins, rb.losses, rb.fusen_wins, rb.fusen_losses
+          FROM rikishi_basho AS rb
+          JOIN basho AS b ON b.id = rb.basho_id
+         WHERE rb.rikishi_id = ?
+         ORDER BY b.start_year, b.start_month""",
+        rikishi_id)
+    for column in ("wins", "losses", "fusen_wins", "fusen_losses"):
+        rikishi[column] = sum(b[column] for b in basho)
+    rikishi["basho"] = basho
+    return rikishi
+
+
+def head_to_head(db, rikishi_id, opponent_id=None):
+    """
+    The rikishi's record against opponent_id, or against everyone they have met, most
+    bouts first: [{opponent_id, ring_name, wins, losses, first_basho, last_basho}, ...]
+    with the basho as "year.month". None if either rikishi is unknown, [] if they never met.
+    """
+    other = rikishi_id if opponent_id is None else opponent_id
+    known = db.tuples("SELECT COUNT(*) FROM rikishi WHERE id IN (?, ?)", rikishi_id, other)[0][0]
+    if known != len({rikishi_id, other}):
+        return None
+    sql = ("SELECT h.opponent_id, r.ring_name, h.wins, h.losses, h.first_basho, h.last_basho "
+           "  FROM head_to_head AS h "
+           "  JOIN rikishi AS r ON r.id = h.opponent_id "
+           " WHERE h.rikishi_id = ?")
+    if opponent_id is not None:
+        rows = db.execute(sql + " AND h.opponent_id = ?", rikishi_id, opponent_id)
+    else:
+        rows = db.execute(sql + " ORDER BY h.wins + h.losses DESC, r.ring_name", rikishi_id)
+    for row in rows:
+        for column in ("first_basho", "last_basho"):
+            row[column] = f"{row[column] // 100}.{row[column] % 100:02d}"
+    return rows
+
+
+def rank_matrix(db):
+    """
+    Wins and losses of every rank against every other, from the point of view of
+    rank_no: [{rank_no, opponent_rank_no, wins, losses, win_rate}, ...]
+    """
+    return [{"rank_no": rank_no, "opponent_rank_no": opponent_rank_no, "wins": wins, "losses": losses,
+             "win_rate": round(wins / (wins + losses), 3)}
+            for rank_no, opponent_rank_no, wins, losses in db.tuples(
+                "SELECT rank_no, opponent_rank_no, wins, losses FROM rank_matchups "
+                " ORDER BY rank_no, opponent_rank_no")]
@@ -1,64 +1,88 @@
 import os
-from cs50 import SQL
+import time
+import click
 from flask import Flask, jsonify, redirect, render_template, request, session
-from flask_session import Session
 from werkzeug.security import check_password_hash, generate_password_hash
 
-from helpers import apology, banzuke_helper, fetch_basho_results, fetch_days_results
-from helpers import get_basho_data, get_basho_winner, get_non_future_basho, get_players
-from helpers import insert_player_data, load_banzuke, login_required, fetch_save_results
+from helpers import apology, banzuke_payload, draft_results_state, fetch_basho_results, fetch_days_results
+from helpers import get_basho_data, get_basho_winner, get_days_results, get_non_future_basho, get_players
+from helpers import insert_player_data, load_banzuke, login_required, ingest_results, init_db
+
+import instrument
+from database import Database
+from live import Hub
+from projection import project
+import analytics
+import autodraft
+import backfill
+from httpcache import apply_policy, immutable, json_with_etag, revalidated, static_url
+from jsonapi import Bout, MsgspecJSONProvider, Pick
+from scoring import recompute
+from sessions import SqliteSessionInterface
+import standings
+from sumodb import cache_stats
 
 from datetime import timedelta
 
 # Configure application
 app = Flask(__name__)
 
-from datetime import timedelta
-
-# Configure session to use filesystem (instead of signed cookies)
-from datetime import timedelta
-import os
-from flask_session import Session
+# JSON responses and request bodies through msgspec (see jsonapi.py)
+app.json = MsgspecJSONProvider(app)
 
-# Configure session to use filesystem (instead of signed cookies)
+# Configure server-side sessions, kept in their own SQLite database (see sessions.py)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev")
-app.config["SESSION_TYPE"] = "filesystem"            # ✅ must be a STRING
 app.config["SESSION_PERMANENT"] = True               # or False if you want browser sessions
 app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(days=1)
-app.config["SESSION_FILE_DIR"] = os.path.join(os.path.dirname(__file__), ".flask_session")
-
-# (optional) fail-fast guard to catch bad overrides
-if not isinstance(app.config.get("SESSION_TYPE"), str):
-    raise RuntimeError(f"SESSION_TYPE must be str; got {type(app.config['SESSION_TYPE']).__name__}")
+app.session_interface = SqliteSessionInterface(app, Database(os.getenv("HONBASHO_SESSION_DB", "sessions.db")),
+                                               permanent=app.config["SESSION_PERMANENT"])
 
-if not isinstance(app.config.get("SESSION_TYPE"), str):
-    raise RuntimeError(f"SESSION_TYPE must be str; got {type(app.config['SESSION_TYPE']).__name__}")
 
-Session(app)
+# Configure the SQLite database
+db = Database(os.getenv('HONBASHO_DB', 'honbasho.db'))
+db = instrument.init_app(app, db)
+init_db(db)
+live = Hub(db)
 
+app.add_template_global(static_url)
 
-# Configure CS50 Library to use SQLite database
-db = SQL("sqlite:///honbasho.db")
 
 @app.after_request
 def after_request(response):
-    """Ensure responses aren't cached"""
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Expires"] = 0
-    response.headers["Pragma"] = "no-cache"
-    return response
+    """Cache-Control by kind of response: see httpcache.py"""
+    return apply_policy(response)
 
 
 # ------------------ Routes  ------------------  #
 @app.route("/")
 def index():
-    """    Start up work: Load any banzuke that has not been loaded."""
-    # load any published banzuke
-    load_banzuke(db)
+    """Landing page. Banzuke are loaded by the ingest command, not here."""
 
     return render_template("project.html")
 
 
+@app.route("/auto_draft/<int:basho_id>", methods=["GET", "POST"])
+@login_required
+def auto_draft(basho_id=None):
+    """
+    Suggested picks from each rikishi's expected points (see autodraft.py).
+    GET ?players=n returns a whole snake draft for n players, one rikishi per group.
+    POST {"taken": [rikishi ids], "buckets": [group numbers]} returns the best
+    rikishi still available in each of those groups (default all).
+    """
+
+    if not db.execute("SELECT 1 FROM banzuke WHERE basho_id = ? LIMIT 1", basho_id):
+        return apology("no banzuke for that basho", 404)
+
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        picks = autodraft.next_picks(db, basho_id, data.get("taken", []), data.get("buckets"))
+        return {str(bucket): pick for bucket, pick in picks.items()}
+    else:
+        players = max(1, min(request.args.get("players", autodraft.MAX_PLAYERS, type=int), autodraft.MAX_PLAYERS))
+        return autodraft.snake_draft(db, basho_id, players)
+
+
 @app.route("/banzuke")
 @app.route("/banzuke/<int:month>/<int:year>")
 @login_required
@@ -73,7 +97,14 @@ def banzuke(month=None, year=None):
         bashos = get_basho_data(db, only_loaded=True)
         return render_template("banzuke.html", bashos=bashos)
     else:
-        return banzuke_helper(db, year, month)
+        found = banzuke_payload(db, year, month)
+        if found is None:
+            return {}
+        payload, etag, final = found
+        response = app.response_class(payload, mimetype="application/json")
+        response.set_etag(etag)
+        response = immutable(response) if final else revalidated(response)
+        return response.make_conditional(request)
 
 
 @app.route("/basho_results", methods=["GET", "POST"])
@@ -89,7 +120,7 @@ def basho_results():
         year = data["year"]
         month = data ["month"]
         j = fetch_basho_results(year, month, day)
-        return (j)
+        return [Bout(**bout) for bout in j]
      else:
         games = get_non_future_basho(db)
         return render_template("basho_results.html", games=games)
@@ -144,33 +175,47 @@ def days_results(draft_id=None, day=None):
     """
     Return a list of dictionaries representing the days results with respect
     to a specific draft.
+    A scored day only changes on a recompute, so its ETag is worked out from the
+    draft's state and a repeat request is answered with a 304 without reading it.
     """
 
-    picks = db.execute("""
-        SELECT
-            dr.*,
-            r.ring_name,
-            rw.rank_no  AS winner_rank_no,
-            ro.rank_no  AS opponent_rank_no
-        FROM days_results AS dr
-        JOIN rikishi  AS r  ON dr.rikishi_id = r.id
-        JOIN drafts   AS d  ON d.id = dr.draft_id
-        -- winner rank
-        JOIN banzuke  AS bw ON bw.basho_id = d.basho_id AND bw.rikishi_id  = dr.rikishi_id
-        JOIN ranks    AS rw ON rw.id = bw.rank_id
-        -- opponent rank
-        JOIN banzuke  AS bo ON bo.basho_id = d.basho_id AND bo.rikishi_id  = dr.oponent_id
-        JOIN ranks    AS ro ON ro.id = bo.rank_id
-        WHERE dr.draft_id = ? AND dr.tournament_day = ?
-        """, draft_id, day)
-    if picks:
-        current = db.execute("SELECT last_seen FROM drafts WHERE id = ?", draft_id )
-        if day > current[0]['last_seen']:
-            db.execute("UPDATE drafts SET last_seen = ? WHERE id = ?", day, draft_id)
-
-        return picks
-    else:
+    draft = draft_results_state(db, draft_id, session["user_id"])
+    if draft is None:
         return []
+    scored = day <= draft["loaded"]
+    if scored:
+        db.execute("UPDATE drafts SET last_seen = ? WHERE id = ? AND user_id = ? AND last_seen < ?",
+                   day, draft_id, session["user_id"], day)
+
+    return json_with_etag(f"dr-{draft_id}-{day}-{int(scored)}-{draft['results_version']}",
+                          lambda: get_days_results(db, draft_id, day, day) if scored else [],
+                          final=scored and draft["over"])
+
+
+@app.route("/days_results/<int:draft_id>")
+@login_required
+def days_results_range(draft_id=None):
+    """
+    Return the days results of a draft for days ?from=..&to=.. (default 1..16)
+    in one response, as {day: [results...]}. Used to repaint days already seen,
+    so last_seen is left alone.
+    """
+
+    first_day = request.args.get("from", 1, type=int)
+    last_day = request.args.get("to", 16, type=int)
+    draft = draft_results_state(db, draft_id, session["user_id"])
+    if draft is None:
+        return {}
+    scored_to = min(last_day, draft["loaded"])
+
+    def build():
+        by_day = {}
+        for row in get_days_results(db, draft_id, first_day, scored_to):
+            by_day.setdefault(row.tournament_day, []).append(row)
+        return by_day
+
+    return json_with_etag(f"drr-{draft_id}-{first_day}-{scored_to}-{draft['results_version']}", build,
+                          final=draft["over"] and (last_day <= draft["loaded"] or draft["loaded"] >= 16))
 
 
 @app.route("/delete_draft/<int:draft_id>", methods=["DELETE"])
@@ -190,8 +235,15 @@ def delete_draft(draft_id):
     if user[0]['user_id'] != session["user_id"]:
         return jsonify(ok=False, code="Draft does not belong to you so cannot be deleted."), 403
 
-    db.execute("DELETE FROM draft_picks WHERE draft_id = ?", draft_id)
-    db.execute("DELETE FROM drafts WHERE id = ?", draft_id)
+    db.execute("BEGIN")
+    try:
+        standings.remove_draft(db, draft_id)
+        db.execute("DELETE FROM draft_picks WHERE draft_id = ?", draft_id)
+        db.execute("DELETE FROM drafts WHERE id = ?", draft_id)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
 
     return jsonify(ok=True), 204
 
@@ -221,6 +273,56 @@ def drafts():
 
 
 
+@app.route("/head_to_head/<int:rikishi_id>")
+@app.route("/head_to_head/<int:rikishi_id>/<int:opponent_id>")
+@login_required
+def head_to_head(rikishi_id=None, opponent_id=None):
+    """
+    The rikishi's record against every opponent they have met, most bouts first,
+    or against just opponent_id. From the analytics aggregates (see analytics.py).
+    """
+
+    record = analytics.head_to_head(db, rikishi_id, opponent_id)
+    if record is None:
+        return jsonify(ok=False, code="NO_SUCH_RIKISHI"), 404
+    return record
+
+
+@app.route("/leaderboard")
+@app.route("/leaderboard/<int:basho_id>")
+@login_required
+def leaderboard(basho_id=None):
+    """
+    The user's best players of a basho across all their drafts, or of all time
+    without a basho, from the materialized standings (?limit=, default 50).
+    """
+
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    return standings.leaderboard(db, session["user_id"], basho_id, limit)
+
+
+@app.route("/live/<int:draft_id>")
+@login_required
+def live_scores(draft_id=None):
+    """
+    Stream the draft's newly scored days, and its prizes, as Server-Sent Events
+    while the ingest command writes them (see live.py).
+    """
+
+    draft = db.execute("SELECT last_days_results_loaded, prizes, winner "
+                       "  FROM drafts "
+                       " WHERE id = ? AND user_id = ?",
+                       draft_id, session["user_id"])
+    if not draft:
+        return apology("no such draft", 404)
+
+    response = live.stream(draft_id, (draft[0]["last_days_results_loaded"], draft[0]["prizes"], draft[0]["winner"]),
+                           session["user_id"])
+    if response is None:
+        return apology("too many live scoreboards open", 429)
+    return response
+
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     """Log user in"""
@@ -319,13 +421,13 @@ def new_draft():
 
 @app.route("/parse_sumodb_day/<int:year>/<int:month>/<int:day>")
 def parse_sumdb_day_ep(year, month, day):
-    return (fetch_basho_results(year, month, day))
+    return [Bout(**bout) for bout in fetch_basho_results(year, month, day)]
 
 
 @app.route("/picks/<int:draft_id>")
 @login_required
 def oldpicks(draft_id=None):
-    picks = db.execute("SELECT draft_picks.draft_id, "
+    picks = db.tuples("SELECT draft_picks.draft_id, "
                        "       draft_picks.player_id, "
                        "       rikishi.id as rikishi_id, "
                        "       rikishi.ring_name, "
@@ -342,7 +444,7 @@ def oldpicks(draft_id=None):
                       draft_id)
     last_seen = db.execute("SELECT last_seen FROM drafts WHERE id = ?", draft_id )
 
-    return {'picks':picks, 'last_seen': last_seen[0]['last_seen']}
+    return {'picks': [Pick(*row) for row in picks], 'last_seen': last_seen[0]['last_seen']}
 
 
 @app.route("/players", methods=["GET", "POST"])
@@ -365,6 +467,30 @@ def prize_winners(basho=None):
 
 
 
+@app.route("/projection/<int:draft_id>")
+@login_required
+def projection(draft_id=None):
+    """
+    Projected final standings of a draft: each player's expected points and
+    chance of winning, from simulating the rest of the basho (?sims=, default 10000).
+    """
+
+    if not db.execute("SELECT 1 FROM drafts WHERE id = ? AND user_id = ?", draft_id, session["user_id"]):
+        return apology("no such draft", 404)
+    result = project(db, draft_id, request.args.get("sims", 10000, type=int))
+    if result is None:
+        return apology("no such draft", 404)
+    return result
+
+
+@app.route("/rank_matrix")
+@login_required
+def rank_matrix():
+    """Wins, losses and win rate of every banzuke rank against every other, fusen left out."""
+
+    return analytics.rank_matrix(db)
+
+
 @app.route("/register", methods=["GET", "POST"])
 def register():
     """Register user"""
@@ -397,17 +523,25 @@ def register():
 
 
 
+@app.route("/rikishi/<int:rikishi_id>")
+@login_required
+def rikishi_record(rikishi_id=None):
+    """A rikishi's record over every stored basho, and basho by basho with their rank."""
+
+    record = analytics.career(db, rikishi_id)
+    if record is None:
+        return jsonify(ok=False, code="NO_SUCH_RIKISHI"), 404
+    return record
+
+
 @app.route("/score_game", methods=["GET", "POST"])
 @login_required
 def score_game():
     """
-    Ensure that
+    GET lists the user's drafts, POST returns a draft's days results.
+    Results are written ahead of time by the ingest command, so this only reads.
     """
 
-    bashos = get_basho_data(db, only_loaded = True)
-    for basho in bashos:
-        fetch_save_results(db, session["user_id"], basho['id'])
-
     if request.method == "GET":
         games = db.execute("SELECT drafts.id as draft_id, "
                            "       drafts.name AS draft_name, "
@@ -425,10 +559,108 @@ def score_game():
         return render_template("score_game.html", games=games)
     else:
         draft_id = request.form["draft_id"]
-        results = db.execute("SELECT * "
-                             "  FROM days_results "
-                             "  JOIN rikishi ON days_results.rikishi_id=rikishi.id "
-                             " WHERE draft_id = ? "
-                             " ORDER BY tournament_day ASC",
-                             draft_id)
-        return results
+        return get_days_results(db, draft_id, 1, 16)
+
+
+@app.route("/seen/<int:draft_id>/<int:day>", methods=["POST"])
+@login_required
+def seen(draft_id=None, day=None):
+    """Record that a day pushed by /live has been shown, so a reload starts from there."""
+
+    db.execute("UPDATE drafts SET last_seen = ? WHERE id = ? AND user_id = ? AND last_seen < ?",
+               day, draft_id, session["user_id"], day)
+    return ("", 204)
+
+
+@app.route("/standings/<int:draft_id>")
+@login_required
+def draft_standings(draft_id=None):
+    """
+    The draft's players ranked by points, each with their wins, losses, prizes
+    and cumulative points by scored day. Read from the materialized standings,
+    so one row per player plus one per player per day.
+    """
+
+    if not db.execute("SELECT 1 FROM drafts WHERE id = ? AND user_id = ?", draft_id, session["user_id"]):
+        return jsonify(ok=False, code="NO_SUCH_DRAFT"), 404
+    return standings.draft(db, draft_id)
+
+
+
+# ------------------ Commands  ------------------  #
+@app.cli.command("backfill")
+@click.argument("first_year", type=int)
+@click.argument("last_year", type=int, required=False)
+@click.option("--window", default=backfill.WINDOW, show_default=True,
+              help="Basho downloading ahead of the one being parsed.")
+@click.option("--batch", default=backfill.BATCH, show_default=True,
+              help="Basho written per transaction.")
+def backfill_history(first_year, last_year, window, batch):
+    """
+    Import the banzuke and bouts of every finished basho from FIRST_YEAR to LAST_YEAR.
+    Resumable: run it again after an interruption and it carries on where it stopped.
+    """
+
+    def progress(basho, bouts):
+        name = f"{basho['start_year']}.{basho['start_month']:02d}"
+        click.echo(f"{name}: {bouts} bouts" if bouts is not None else f"{name}: no banzuke on sumodb, skipped")
+
+    totals = backfill.backfill(db, first_year, last_year or first_year, window, batch, progress)
+    db.execute("PRAGMA optimize")
+    click.echo(f"imported {totals['basho']} basho, {totals['bouts']} bouts in {totals['seconds']}s "
+               f"({totals['per_minute']} basho/minute, target {backfill.TARGET_PER_MINUTE})")
+    click.echo(f"sumodb cache: {cache_stats()}")
+
+
+@app.cli.command("ingest")
+@click.option("--loop", is_flag=True, help="Keep polling instead of running once.")
+@click.option("--interval", default=600, show_default=True,
+              help="Seconds between polls while a basho is in progress.")
+@click.option("--idle-interval", default=6 * 60 * 60, show_default=True,
+              help="Seconds between polls when no basho is in progress.")
+def ingest(loop, interval, idle_interval):
+    """
+    Fetch banzuke and basho results from sumodb and score every draft, ahead of page views.
+    Safe to run next to the web workers: every write is guarded by cas_update.
+    """
+
+    while True:
+        try:
+            # load any published banzuke, then the results
+            load_banzuke(db)
+            in_progress = ingest_results(db)
+        except Exception:
+            if not loop:
+                raise
+            app.logger.exception("results ingestion failed, will retry")
+            in_progress = True
+
+        if not loop:
+            click.echo(f"sumodb cache: {cache_stats()}")
+            break
+        time.sleep(interval if in_progress else idle_interval)
+
+
+@app.cli.command("rebuild_analytics")
+def rebuild_analytics():
+    """Recreate the rikishi analytics from the stored bouts, e.g. after a bout is corrected."""
+
+    start = time.perf_counter()
+    db.execute("BEGIN")
+    try:
+        analytics.rebuild(db)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    click.echo(f"rebuilt the analytics in {time.perf_counter() - start:.2f}s")
+
+
+@app.cli.command("recompute")
+@click.argument("basho_id", type=int)
+def recompute_basho(basho_id):
+    """Rescore every bout and draft pick of a basho from its stored bouts."""
+
+    start = time.perf_counter()
+    picks = recompute(db, basho_id)
+    click.echo(f"rescored {picks} draft picks in {time.perf_counter() - start:.2f}s")
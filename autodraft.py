@@ -0,0 +1,144 @@
+from collections import OrderedDict
+
+import numpy as np
+
+import projection
+
+# Suggested picks for /new_draft: a whole snake draft, or the best rikishi still
+# available in each bucket.
+#
+# Each rikishi on a basho's banzuke gets an expected value (EV) in points:
+#   - the mean bout points of a rikishi at their rank in earlier basho, or the
+#     simulated mean (projection.simulate) where there are too few earlier basho,
+#   - plus the simulated special prize and yusho points at their banzuke slot,
+#   - plus their own record against their rank in earlier basho, shrunk towards 0
+#     when there are few of them.
+# The table, sorted best first within each bucket, is built once per basho and kept
+# until new bouts are stored; a pick is then a walk down one bucket's list.
+
+# the six groups of the draft, by rank_no, as in templates/new_draft.html
+BUCKETS = [(1, 4), (5, 8), (9, 12), (13, 16), (17, 21), (5, 21)]
+BUCKET_NAMES = ["Yokozuna–Komusubi", "Maegashira #1–#4", "Maegashira #5–#8",
+                "Maegashira #9–#12", "Maegashira #13+", "Wildcard (#1–#17)"]
+MAX_PLAYERS = 3
+
+SIMS = 2000
+MIN_RANK_SAMPLES = 3        # earlier basho at a rank before its mean replaces the simulated one
+SHRINK = 3.0                # earlier basho of a rikishi that count as much as the rank's mean
+
+CACHE_SIZE = 16
+_cache = OrderedDict()      # basho_id -> (version, table)
+
+
+def expected_values(db, basho_id):
+    """
+    The basho's EV table, built once and cached until new bouts are stored:
+    {"rikishi": {id: {id, name, rank_no, ev}}, "buckets": [[id, ...] best first, ...]}
+    """
+    version = db.tuples("SELECT MAX(rowid) FROM bouts")[0][0]
+    cached = _cache.get(basho_id)
+    if cached is not None and cached[0] == version:
+        _cache.move_to_end(basho_id)
+        return cached[1]
+
+    table = _build(db, basho_id)
+    _cache[basho_id] = (version, table)
+    _cache.move_to_end(basho_id)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return table
+
+
+def _build(db, basho_id):
+    banzuke = db.tuples("SELECT rikishi.id, rikishi.ring_name, ranks.rank_no "
+                        "  FROM banzuke "
+                        "  JOIN rikishi ON rikishi.id = banzuke.rikishi_id "
+                        "  JOIN ranks   ON ranks.id = banzuke.rank_id "
+                        " WHERE banzuke.basho_id = ? AND banzuke.call_up = 0 "
+                        " ORDER BY ranks.rank_no, banzuke.rank_id",
+                        basho_id)
+    if not banzuke:
+        return {"rikishi": {}, "buckets": [[] for _ in BUCKETS]}
+    ids = np.array([r[0] for r in banzuke], dtype=np.int64)
+    rank_no = np.array([r[2] for r in banzuke], dtype=np.int64)
+
+    # rank prior by simulation: bout points, and what the prizes and yusho add
+    slope = projection.fitted_slope(db)
+    rng = np.random.default_rng(basho_id)
+    bouts_only = projection.simulate(rank_no, 0, projection.LAST_DAY, slope, SIMS, rng,
+                                     prizes=False, yusho=False).mean(axis=0)
+    with_prizes = projection.simulate(rank_no, 0, projection.LAST_DAY, slope, SIMS, rng).mean(axis=0)
+    prizes = with_prizes - bouts_only
+
+    # earlier basho: points per (basho, rikishi), and the rank they had
+    history = np.array(db.tuples("""
+        SELECT b.basho_id, b.rikishi_id, MAX(b.rank_no), SUM(b.points)
+          FROM (SELECT basho_id, winner_id AS rikishi_id, winner_rank AS rank_no, points FROM bouts
+                UNION ALL
+                SELECT basho_id, loser_id, loser_rank, 0 FROM bouts) AS b
+          JOIN basho AS past ON past.id = b.basho_id
+          JOIN basho AS this ON this.id = ?
+         WHERE past.start_year * 100 + past.start_month < this.start_year * 100 + this.start_month
+         GROUP BY b.basho_id, b.rikishi_id""", basho_id), dtype=np.float64).reshape(-1, 4)
+
+    size = max(int(rank_no.max()), int(history[:, 2].max()) if len(history) else 0) + 1
+    samples = np.bincount(history[:, 2].astype(np.int64), minlength=size)
+    totals = np.bincount(history[:, 2].astype(np.int64), weights=history[:, 3], minlength=size)
+    # simulated bout points per rank_no, for ranks with little history
+    simulated = np.bincount(rank_no, weights=bouts_only, minlength=size) \
+        / np.maximum(np.bincount(rank_no, minlength=size), 1)
+    rank_mean = np.where(samples >= MIN_RANK_SAMPLES, totals / np.maximum(samples, 1), simulated)
+
+    ev = rank_mean[rank_no] + prizes
+    if len(history):
+        residual = history[:, 3] - rank_mean[history[:, 2].astype(np.int64)]
+        # which of this banzuke's rikishi each earlier record belongs to
+        order = np.argsort(ids)
+        past_ids = history[:, 1].astype(np.int64)
+        found = np.minimum(np.searchsorted(ids[order], past_ids), len(ids) - 1)
+        known = ids[order][found] == past_ids
+        slot = order[found[known]]
+        n = np.bincount(slot, minlength=len(ids))
+        ev += np.bincount(slot, weights=residual[known], minlength=len(ids)) / (n + SHRINK)
+
+    rikishi = {int(i): {"id": int(i), "name": name, "rank_no": int(r), "ev": round(float(v), 2)}
+               for (i, name, r), v in zip(banzuke, ev)}
+    buckets = [sorted((i for i, r in rikishi.items() if low <= r["rank_no"] <= high),
+                      key=lambda i: -rikishi[i]["ev"])
+               for low, high in BUCKETS]
+    return {"rikishi": rikishi, "buckets": buckets}
+
+
+def best_available(table, bucket, taken):
+    """The rikishi with the highest EV in the bucket that is not taken, or None."""
+    return next((table["rikishi"][i] for i in table["buckets"][bucket] if i not in taken), None)
+
+
+def next_picks(db, basho_id, taken=(), buckets=None):
+    """For each bucket (default all), the best rikishi not in taken: {bucket: rikishi or None}."""
+    table = expected_values(db, basho_id)
+    taken = set(taken)
+    return {b: best_available(table, b, taken) for b in (range(len(BUCKETS)) if buckets is None else buckets)}
+
+
+def snake_draft(db, basho_id, players, taken=()):
+    """
+    A whole draft for players players: one round per bucket, the order reversed every
+    round, each player taking the best rikishi left in the round's bucket.
+    Returns [{"picks": [rikishi per bucket], "ev": total}, ...] in draft order.
+    """
+    table = expected_values(db, basho_id)
+    taken = set(taken)
+    slates = [{"picks": [None] * len(BUCKETS), "ev": 0.0} for _ in range(players)]
+    for bucket in range(len(BUCKETS)):
+        order = range(players) if bucket % 2 == 0 else reversed(range(players))
+        for p in order:
+            pick = best_available(table, bucket, taken)
+            if pick is None:
+                continue
+            taken.add(pick["id"])
+            slates[p]["picks"][bucket] = pick
+            slates[p]["ev"] += pick["ev"]
+    for slate in slates:
+        slate["ev"] = round(slate["ev"], 2)
+    return slates
@@ -0,0 +1,196 @@
+import calendar
+import time
+
+import numpy as np
+
+import analytics
+import scoring
+import sumoparse
+from helpers import banzuke_url, invalidate_banzuke_payload, results_url
+from sumodb import basho_is_over, get_page, prefetch
+
+# Bulk import of past basho, their banzuke and every day's bouts, from sumodb:
+#   flask backfill 1990 2024
+#
+# Basho rows are created for every finished honbasho in the range. The pages of the
+# next WINDOW basho download on sumodb.prefetch's threads, through the disk cache,
+# while the current one is parsed, and BATCH parsed basho are written in one
+# transaction with a few multi-row INSERTs each. A written basho has
+# banzuke_loaded = 1 and last_update_day = 16: that is the checkpoint, so an
+# interrupted backfill carries on from the first basho without it. A basho with no
+# banzuke on sumodb (cancelled) is marked with banzuke_checked_at and skipped.
+#
+# Basho with drafts are left to the ingest command, which also scores the drafts.
+
+# month -> (venue, city) of the six honbasho
+SCHEDULE = {
+    1: ("Kokugikan", "Tokyo"),
+    3: ("Edion Arena", "Osaka"),
+    5: ("Kokugikan", "Tokyo"),
+    7: ("Nagoya", "Nagoya"),
+    9: ("Kokugikan", "Tokyo"),
+    11: ("Fukuoka Kokusai Center", "Fukuoka"),
+}
+DAYS = 16                   # day 16 holds the playoff, if there was one
+WINDOW = 4                  # basho downloading ahead of the one being parsed
+BATCH = 6                   # basho written per transaction
+CALL_UP_RANK = 44           # ranks.id given to a rikishi called up from juryo (see resolve_rikishi)
+LOWEST_RANK_NO = 21         # Maegashira #17, the lowest rank_no with an east and a west row in ranks
+TARGET_PER_MINUTE = 20      # basho per minute from an empty cache at sumodb's rate limit
+
+
+def start_day(year, month):
+    """Opening day of a basho: the second Sunday of the month."""
+    first_sunday = 1 + (calendar.SUNDAY - calendar.weekday(year, month, 1)) % 7
+    return first_sunday + 7
+
+
+def plan(db, first_year, last_year):
+    """
+    Add a basho row for every finished honbasho from first_year to last_year that has
+    none, and return the basho still to import, oldest first.
+    """
+    have = {(y, m) for y, m in db.tuples("SELECT start_year, start_month FROM basho "
+                                         " WHERE start_year BETWEEN ? AND ?", first_year, last_year)}
+    missing = [(y, m) for y in range(first_year, last_year + 1) for m in SCHEDULE
+               if (y, m) not in have and basho_is_over(y, m)]
+    if missing:
+        db.execute("INSERT INTO basho (name, city, start_year, start_month, start_day) VALUES "
+                   + ", ".join("(?, ?, ?, ?, ?)" for _ in missing),
+                   *[v for y, m in missing for v in (*SCHEDULE[m], y, m, start_day(y, m))])
+
+    todo = db.execute("""
+        SELECT id, start_year, start_month
+          FROM basho
+         WHERE start_year BETWEEN ? AND ?
+           AND NOT (banzuke_loaded = 1 AND last_update_day >= ?)
+           AND NOT (banzuke_loaded = 0 AND banzuke_checked_at > 0)
+           AND NOT EXISTS (SELECT 1 FROM drafts WHERE drafts.basho_id = basho.id)
+         ORDER BY start_year, start_month""",
+        first_year, last_year, DAYS)
+    return [b for b in todo if basho_is_over(b["start_year"], b["start_month"])]
+
+
+def urls(basho):
+    year, month = basho["start_year"], basho["start_month"]
+    return [banzuke_url(year, month)] + [results_url(year, month, day) for day in range(1, DAYS + 1)]
+
+
+def parse(basho):
+    """The basho's banzuke and {day: bouts} from the cache, or None if it has no banzuke."""
+    year, month = basho["start_year"], basho["start_month"]
+    banzuke = sumoparse.parse_banzuke(get_page(banzuke_url(year, month)))
+    if not banzuke:
+        return None
+    return banzuke, {day: sumoparse.parse_results(get_page(results_url(year, month, day)))
+                     for day in range(1, DAYS + 1)}
+
+
+def write(db, basho_id, banzuke, days):
+    """
+    Store a parsed basho: new rikishi, the banzuke (plus anyone in the bouts as a
+    call up) and every bout with its points, added to the analytics. Run inside a transaction.
+    Returns the number of bouts.
+    """
+    ranks = {(rank_no, side): (rank_id, rank_no) for rank_id, rank_no, side in
+             db.tuples("SELECT id, rank_no, cardinality FROM ranks")}
+    call_up_rank_no = db.tuples("SELECT rank_no FROM ranks WHERE id = ?", CALL_UP_RANK)[0][0]
+
+    # rank of everyone on the banzuke, then anyone else in the bouts as a call up
+    rank_of = {}
+    for r in banzuke:
+        rank_of.setdefault(r["name"], ranks[(min(r["rank"], LOWEST_RANK_NO), r["side"].upper())] + (0,))
+    for bouts in days.values():
+        for b in bouts:
+            for name in (b["winner"], b["loser"]):
+                rank_of.setdefault(name, (CALL_UP_RANK, call_up_rank_no, 1))
+
+    names = list(rank_of)
+    ph = ", ".join("?" for _ in names)
+    ids = dict(db.tuples(f"SELECT ring_name, id FROM rikishi WHERE ring_name IN ({ph})", *names))
+    new = [name for name in names if name not in ids]
+    if new:
+        db.execute("INSERT INTO rikishi (ring_name) VALUES " + ", ".join("(?)" for _ in new), *new)
+        ids.update(db.tuples(f"SELECT ring_name, id FROM rikishi WHERE ring_name IN ({ph})", *names))
+
+    listed = {r[0] for r in db.tuples("SELECT rikishi_id FROM banzuke WHERE basho_id = ?", basho_id)}
+    rows = [(basho_id, ids[name], call_up, rank_id)
+            for name, (rank_id, _, call_up) in rank_of.items() if ids[name] not in listed]
+    _insert(db, "INSERT INTO banzuke (basho_id, rikishi_id, call_up, rank_id) VALUES", rows)
+
+    bouts = [(day, bout_no, ids[b["winner"]], ids[b["loser"]], rank_of[b["winner"]][1], rank_of[b["loser"]][1],
+              int(b["technique"] == "fusen"), b["technique"])
+             for day, day_bouts in sorted(days.items()) for bout_no, b in enumerate(day_bouts, start=1)]
+    if bouts:
+        columns = ("tournament_day", "bout_no", "winner_id", "loser_id", "winner_rank", "loser_rank", "fusen")
+        table = np.array([b[:7] for b in bouts], dtype=np.int64)
+        points = scoring.score_basho({c: table[:, i] for i, c in enumerate(columns)})
+        _insert(db, "INSERT OR IGNORE INTO bouts (basho_id, tournament_day, bout_no, winner_id, loser_id, "
+                    "winner_rank, loser_rank, fusen, technique, points) VALUES",
+                [(basho_id, *b, int(p)) for b, p in zip(bouts, points)])
+        analytics.add(db, basho_id)
+
+    db.execute("UPDATE basho SET banzuke_loaded = 1, last_update_day = ? WHERE id = ?", DAYS, basho_id)
+    invalidate_banzuke_payload(db, basho_id)
+    return len(bouts)
+
+
+def _insert(db, sql, rows):
+    """Run "INSERT ... VALUES" followed by the rows, scoring.CHUNK rows at a time."""
+    if not rows:
+        return
+    tuple_ph = "(" + ", ".join("?" for _ in rows[0]) + ")"
+    for i in range(0, len(rows), scoring.CHUNK):
+        chunk = rows[i:i + scoring.CHUNK]
+        db.execute(sql + " " + ", ".join(tuple_ph for _ in chunk), *[v for r in chunk for v in r])
+
+
+def backfill(db, first_year, last_year, window=WINDOW, batch=BATCH, progress=None):
+    """
+    Import every finished basho from first_year to last_year not imported yet.
+    progress, if given, is called with (basho, bouts) after each basho is committed
+    (bouts is None for a basho sumodb has no banzuke for).
+    Returns {"basho", "bouts", "seconds", "per_minute"}.
+    """
+    start = time.perf_counter()
+    todo = plan(db, first_year, last_year)
+    downloads = {}
+    pending = []
+    totals = {"basho": 0, "bouts": 0}
+
+    def commit():
+        db.execute("BEGIN")
+        try:
+            counts = []
+            for basho, parsed in pending:
+                if parsed is None:
+                    db.execute("UPDATE basho SET banzuke_checked_at = ? WHERE id = ?", int(time.time()), basho["id"])
+                    counts.append(None)
+                else:
+                    counts.append(write(db, basho["id"], *parsed))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        for (basho, _), bouts in zip(pending, counts):
+            totals["basho"] += bouts is not None
+            totals["bouts"] += bouts or 0
+            if progress:
+                progress(basho, bouts)
+        pending.clear()
+
+    for i, basho in enumerate(todo):
+        for ahead in todo[i:i + window]:
+            if ahead["id"] not in downloads:
+                downloads[ahead["id"]] = prefetch(urls(ahead))
+        for future in downloads.pop(basho["id"]).values():
+            future.result()
+        pending.append((basho, parse(basho)))
+        if len(pending) >= batch:
+            commit()
+    if pending:
+        commit()
+
+    seconds = time.perf_counter() - start
+    return dict(totals, seconds=round(seconds, 2),
+                per_minute=round(totals["basho"] * 60 / seconds, 1) if seconds else 0.0)
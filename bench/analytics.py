@@ -0,0 +1,167 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Response times of the analytics routes (analytics.py) over decades of bouts, against
+# working the same answers out from the bouts table, and what keeping the aggregates
+# costs when bouts are stored.
+#
+# The history is generated: a 42-man makuuchi whose members retire and are replaced
+# a few at a time, written basho by basho through backfill.write, which adds each
+# basho to the aggregates as the ingest command does.
+#
+#   python bench/analytics.py --years 1960-2024
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from run import copy_db  # noqa: E402
+
+MAKUUCHI = 42
+TURNOVER = 3        # rikishi replaced after each basho
+FUSEN = 0.005       # share of bouts that are fusen
+
+
+def percentile(times, p):
+    ordered = sorted(times)
+    return ordered[round(p * (len(ordered) - 1))] * 1000
+
+
+def history(first, last, rnd):
+    """(year, month, banzuke, {day: bouts}) for every basho from first to last, in the form sumoparse returns."""
+    active = [f"Rikishi{i}" for i in range(MAKUUCHI)]
+    strength = {name: rnd.random() for name in active}
+    joined = MAKUUCHI
+    for year in range(first, last + 1):
+        for month in (1, 3, 5, 7, 9, 11):
+            ordered = sorted(active, key=lambda n: -strength[n] - rnd.random() * 0.3)
+            # Y, Y, O, O, S, S, K, K, then M1 east and west down to M17
+            banzuke = [{"name": name, "rank": 1 + i // 2, "side": ("east", "west")[i % 2]}
+                       for i, name in enumerate(ordered)]
+            days = {}
+            for day in range(1, 16):
+                rnd.shuffle(ordered)
+                bouts = []
+                for a, b in zip(ordered[::2], ordered[1::2]):
+                    a_wins = rnd.random() < 0.5 + (strength[a] - strength[b]) / 2
+                    bouts.append({"winner": a if a_wins else b, "loser": b if a_wins else a,
+                                  "technique": "fusen" if rnd.random() < FUSEN else "yorikiri"})
+                days[day] = bouts
+            yield year, month, banzuke, days
+
+            for name in rnd.sample(active, TURNOVER):
+                active.remove(name)
+                new = f"Rikishi{joined}"
+                joined += 1
+                active.append(new)
+                strength[new] = rnd.random()
+
+
+# the same answers worked out from bouts, for comparison
+SCANS = {
+    "career": ("SELECT basho_id, SUM(win), SUM(1 - win) FROM ("
+               "  SELECT basho_id, 1 AS win FROM bouts WHERE winner_id = ? AND tournament_day <= 15"
+               "  UNION ALL SELECT basho_id, 0 FROM bouts WHERE loser_id = ? AND tournament_day <= 15)"
+               " GROUP BY basho_id", 2),
+    "head to head, all": ("SELECT opponent_id, SUM(win), SUM(1 - win) FROM ("
+                          "  SELECT loser_id AS opponent_id, 1 AS win FROM bouts"
+                          "   WHERE winner_id = ? AND tournament_day <= 15"
+                          "  UNION ALL SELECT winner_id, 0 FROM bouts WHERE loser_id = ? AND tournament_day <= 15)"
+                          " GROUP BY opponent_id", 2),
+    "rank matrix": ("SELECT winner_rank, loser_rank, COUNT(*) FROM bouts"
+                    " WHERE fusen = 0 AND tournament_day <= 15 GROUP BY winner_rank, loser_rank", 0),
+}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the analytics routes.")
+    parser.add_argument("--source", default=os.path.join(ROOT, "honbasho.db"), help="database with the ranks")
+    parser.add_argument("--years", default="1960-2024", help="first-last year of generated basho")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    args = parser.parse_args(argv)
+    first, last = (int(y) for y in args.years.split("-"))
+
+    workdir = tempfile.mkdtemp(prefix="honbasho-analytics-")
+    path = os.path.join(workdir, "honbasho.db")
+    copy_db(args.source, path)
+    os.environ["HONBASHO_DB"] = path
+    os.environ["HONBASHO_SESSION_DB"] = os.path.join(workdir, "sessions.db")
+    os.environ["SUMODB_OFFLINE"] = "1"
+    import analytics
+    import app as appmod
+    import backfill
+    db = appmod.db
+
+    try:
+        rnd = random.Random(0)
+        write_seconds = add_seconds = 0.0
+        count = 0
+        for year, month, banzuke, days in history(first, last, rnd):
+            basho_id = db.execute("INSERT INTO basho (name, city, start_year, start_month, start_day) "
+                                  "VALUES ('Bench', 'Bench', ?, ?, 1)", year, month)
+            db.execute("BEGIN")
+            start = time.perf_counter()
+            backfill.write(db, basho_id, banzuke, days)
+            write_seconds += time.perf_counter() - start
+            db.execute("COMMIT")
+            count += 1
+        db.execute("PRAGMA optimize")
+
+        # the cost of the aggregates alone: all of them again, one basho at a time
+        db.execute("BEGIN")
+        start = time.perf_counter()
+        analytics.rebuild(db)
+        add_seconds = time.perf_counter() - start
+        db.execute("COMMIT")
+
+        sizes = {t: db.tuples(f"SELECT COUNT(*) FROM {t}")[0][0]
+                 for t in ("bouts", "rikishi_basho", "head_to_head", "rank_matchups")}
+        print(f"{count} basho, " + ", ".join(f"{t} {n}" for t, n in sizes.items()))
+        print(f"storing a basho (backfill.write): {write_seconds / count * 1000:.1f} ms, "
+              f"of which analytics.add {add_seconds / count * 1000:.1f} ms")
+
+        client = appmod.app.test_client()
+        client.post("/register", data={"username": "bench", "password": "bench", "confirmation": "bench"})
+        client.post("/login", data={"username": "bench", "password": "bench"})
+        veterans = [r[0] for r in db.tuples("SELECT rikishi_id FROM rikishi_basho GROUP BY rikishi_id "
+                                            "HAVING COUNT(*) >= 30")]
+        opponents = {r: [o for (o,) in db.tuples("SELECT opponent_id FROM head_to_head WHERE rikishi_id = ?", r)]
+                     for r in veterans[:50]}
+
+        routes = {
+            "career": lambda r: f"/rikishi/{r}",
+            "head to head, all": lambda r: f"/head_to_head/{r}",
+            "head to head, one": lambda r: f"/head_to_head/{r}/{rnd.choice(opponents[r])}",
+            "rank matrix": lambda r: "/rank_matrix",
+        }
+        print(f"\n  {'route':20} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}   from bouts: {'p50 ms':>8}")
+        for name, url in routes.items():
+            times = []
+            for _ in range(args.requests):
+                rikishi_id = rnd.choice(list(opponents))
+                start = time.perf_counter()
+                resp = client.get(url(rikishi_id))
+                times.append(time.perf_counter() - start)
+                assert resp.status_code == 200, (url(rikishi_id), resp.status_code)
+            scan = ""
+            if name in SCANS:
+                sql, ids = SCANS[name]
+                scan_times = []
+                for _ in range(min(args.requests, 20)):
+                    rikishi_id = rnd.choice(list(opponents))
+                    start = time.perf_counter()
+                    db.tuples(sql, *[rikishi_id] * ids)
+                    scan_times.append(time.perf_counter() - start)
+                scan = f"{percentile(scan_times, 0.5):>8.2f}"
+            print(f"  {name:20} {percentile(times, 0.5):>8.2f} {percentile(times, 0.95):>8.2f} "
+                  f"{max(times) * 1000:>8.2f}   {'':12}{scan}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,88 @@
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Throughput of the historical backfill (backfill.py) against bench/standin.py,
+# from an empty sumodb cache and again from a warm one, a rerun to check that
+# finished basho are skipped, and how the queries that read every stored bout
+# hold up once the backfill has multiplied them.
+#
+#   python bench/backfill.py --years 1990-2009 --latency 0.05
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import standin  # noqa: E402
+from run import copy_db  # noqa: E402
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the historical basho backfill.")
+    parser.add_argument("--source", default=os.path.join(ROOT, "honbasho.db"),
+                        help="database with the ranks and the banzuke the stand-in serves")
+    parser.add_argument("--basho", type=int, default=1, help="basho id whose banzuke the stand-in serves")
+    parser.add_argument("--years", default="1995-2004", help="first-last year to backfill")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds the sumodb stand-in takes to answer")
+    args = parser.parse_args(argv)
+    first, last = (int(y) for y in args.years.split("-"))
+
+    workdir = tempfile.mkdtemp(prefix="honbasho-backfill-")
+    source = os.path.join(workdir, "source.db")
+    copy_db(args.source, source)
+    roster = standin.load_roster(source, args.basho)
+    server, base_url = standin.start(standin.Basho(roster, first, 1), latency=args.latency)
+
+    # sumodb.py reads these when it is imported
+    os.environ["SUMODB_BASE_URL"] = base_url
+    os.environ["SUMODB_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ.pop("SUMODB_OFFLINE", None)
+    import autodraft
+    import backfill
+    import projection
+    import scoring
+    from database import Database
+    from helpers import init_db
+
+    logging.disable(logging.INFO)
+    try:
+        for run in ("empty cache", "warm cache"):
+            path = os.path.join(workdir, f"{run.split()[0]}.db")
+            copy_db(source, path)
+            db = Database(path)
+            init_db(db)
+            before = server.requests
+            totals = backfill.backfill(db, first, last)
+            print(f"{run:12} {totals['basho']:>4} basho {totals['bouts']:>7} bouts "
+                  f"{totals['seconds']:>7.2f}s {totals['per_minute']:>8.1f} basho/minute "
+                  f"({server.requests - before} sumodb requests)")
+
+        rerun = backfill.backfill(db, first, last)
+        print(f"rerun        {rerun['basho']:>4} basho (everything already imported is skipped)")
+
+        counts = {table: db.tuples(f"SELECT COUNT(*) FROM {table}")[0][0] for table in ("basho", "banzuke", "bouts")}
+        print("rows:", ", ".join(f"{table} {n}" for table, n in counts.items()))
+        latest = db.tuples("SELECT id FROM basho WHERE start_year = ? ORDER BY start_month DESC LIMIT 1", last)[0][0]
+        _, ms = timed(projection.fitted_slope, db)
+        print(f"  projection.fitted_slope over every bout     {ms:8.1f} ms")
+        _, ms = timed(scoring.load_bouts, db, latest)
+        print(f"  scoring.load_bouts of one basho             {ms:8.1f} ms")
+        _, ms = timed(autodraft.expected_values, db, latest)
+        print(f"  autodraft.expected_values (all history)     {ms:8.1f} ms")
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,122 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Encode time and payload size of the api's JSON responses, Flask's default provider
+# on dict rows (before) against jsonapi.MsgspecJSONProvider on its typed structs (after), on a
+# whole basho of days results for one draft with every makuuchi rikishi picked,
+# and on the banzuke. "rows + encode" includes reading the rows from sqlite.
+#
+#   python bench/encoding.py --repeat 200
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from run import copy_db  # noqa: E402
+
+DAYS = 15
+
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def seed(db, basho_id, rnd):
+    """A draft of every rikishi on the basho's banzuke, each with a bout on every day."""
+    rikishi = [r for r in db.tuples("SELECT b.rikishi_id, k.rank_no FROM banzuke AS b "
+                                    "  JOIN ranks AS k ON k.id = b.rank_id "
+                                    " WHERE b.basho_id = ? AND b.call_up = 0", basho_id)]
+    user_id = db.execute("INSERT INTO users (username, hash) VALUES ('json', '')")
+    player_id = db.execute("INSERT INTO players (name, user_id) VALUES ('json', ?)", user_id)
+    draft_id = db.execute("INSERT INTO drafts (user_id, basho_id, name, last_days_results_loaded) "
+                          "VALUES (?, ?, 'json', ?)", user_id, basho_id, DAYS)
+    db.execute("BEGIN")
+    for rikishi_id, _ in rikishi:
+        db.execute("INSERT INTO draft_picks (draft_id, player_id, rikishi_id) VALUES (?, ?, ?)",
+                   draft_id, player_id, rikishi_id)
+    for day in range(1, DAYS + 1):
+        rnd.shuffle(rikishi)
+        for bout_no in range(len(rikishi) // 2):
+            (winner_id, winner_rank), (loser_id, loser_rank) = rikishi[2 * bout_no:2 * bout_no + 2]
+            db.execute("INSERT INTO bouts (basho_id, tournament_day, bout_no, winner_id, loser_id, "
+                       "                   winner_rank, loser_rank, technique, points) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?, 'yorikiri', ?)",
+                       basho_id, day, bout_no + 1, winner_id, loser_id, winner_rank, loser_rank,
+                       rnd.randint(1, 3))
+    db.execute("COMMIT")
+    return draft_id
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding of the api payloads.")
+    parser.add_argument("--source", default=os.path.join(ROOT, "honbasho.db"))
+    parser.add_argument("--basho", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=200, help="runs of each measurement, best is reported")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="honbasho-json-")
+    path = os.path.join(workdir, "honbasho.db")
+    copy_db(args.source, path)
+
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    import jsonapi
+    from database import Database
+    from helpers import banzuke_helper, get_days_results, init_db
+
+    flask_app = Flask(__name__)
+    providers = {"before": DefaultJSONProvider(flask_app), "after": jsonapi.MsgspecJSONProvider(flask_app)}
+
+    def encode(when, obj):
+        return providers[when].response(obj).get_data()
+
+    try:
+        db = Database(path)
+        init_db(db)
+        db.execute("DELETE FROM bouts WHERE basho_id = ?", args.basho)
+        draft_id = seed(db, args.basho, random.Random(0))
+        year, month = db.tuples("SELECT start_year, start_month FROM basho WHERE id = ?", args.basho)[0]
+
+        def dict_rows():
+            # the query get_days_results ran before it returned DayResults
+            return db.execute("SELECT dr.*, r.ring_name, dr.rank_no AS winner_rank_no, "
+                              "       dr.opponent_rank_no AS opponent_rank_no "
+                              "  FROM days_results AS dr JOIN rikishi AS r ON dr.rikishi_id = r.id "
+                              " WHERE dr.draft_id = ? AND dr.tournament_day BETWEEN 1 AND ? "
+                              " ORDER BY dr.tournament_day", draft_id, DAYS)
+
+        results = {"before": dict_rows(), "after": get_days_results(db, draft_id, 1, DAYS)}
+        slots = banzuke_helper(db, year, month)
+        banzuke = {"before": jsonapi.msgspec.to_builtins(slots), "after": slots}
+        payloads = {
+            f"days results ({len(results['after'])} rows)": (
+                results, lambda: encode("before", dict_rows()),
+                lambda: encode("after", get_days_results(db, draft_id, 1, DAYS))),
+            f"banzuke ({sum(len(s) for s in slots.values())} slots)": (
+                banzuke, None, None),
+        }
+
+        print(f"  {'payload':28} {'':7} {'encode ms':>10} {'rows + encode ms':>17} {'bytes':>8}")
+        for name, (objs, before_query, after_query) in payloads.items():
+            encoders = {when: (lambda when=when: encode(when, objs[when])) for when in objs}
+            queries = {"before": before_query, "after": after_query}
+            assert jsonapi.msgspec.json.decode(encoders["before"]()) == jsonapi.msgspec.json.decode(encoders["after"]())
+            for when in ("before", "after"):
+                encode_ms = best(encoders[when], args.repeat)
+                query_ms = f"{best(queries[when], args.repeat):.3f}" if queries[when] else "-"
+                print(f"  {name:28} {when:7} {encode_ms:>10.3f} {query_ms:>17} {len(encoders[when]()):>8}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
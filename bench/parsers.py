@@ -0,0 +1,183 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+# Golden-file check and micro-benchmark of the sumodb page parsers (sumoparse.py).
+#
+# Every saved page in bench/golden (<name>.html, with what it must parse to in
+# <name>.json) and every recorded page in bench/recordings is parsed with each
+# backend. Any backend that disagrees with the golden output, or with the soup
+# backend on a recording, fails the run. Then each backend is timed per page type.
+#
+# bench/golden holds three sets of pages: banzuke.html, results_day*.html etc. from
+# the stand-in (bench/standin.py), *_markup.html written by hand around markup edge
+# cases, and *_<YYYYMM>*.html in sumodb's full page layout (head, scripts, menus,
+# the other divisions' tables). A page named for a basho is checked against that
+# basho's row of the Sansho page.
+#
+#   python bench/parsers.py
+#   python bench/parsers.py --save      # regenerate the stand-in pages in bench/golden
+#   python bench/parsers.py --fetch     # download the sumodb pages of --basho into bench/golden
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import helpers  # noqa: E402
+import sumodb  # noqa: E402
+import sumoparse  # noqa: E402
+import standin  # noqa: E402
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+SANSHO_TARGET = "2025.07"
+
+
+def kind_of(name):
+    """Page type from a saved page's name (recording names start with the aspx page)."""
+    lowered = name.lower()
+    for kind in ("results_text", "results", "banzuke", "sansho"):
+        if lowered.startswith(kind):
+            return kind
+    return None
+
+
+def target_of(name):
+    """The Sansho row a saved page is checked against: its basho ("YYYY.MM"), if it is named for one."""
+    m = re.search(r"_(\d{4})(\d{2})", name)
+    return f"{m.group(1)}.{m.group(2)}" if m else SANSHO_TARGET
+
+
+def parse(kind, html, backend, target=SANSHO_TARGET):
+    if kind == "results":
+        return sumoparse.parse_results(html, backend)
+    if kind == "banzuke":
+        return sumoparse.parse_banzuke(html, backend)
+    if kind == "sansho":
+        return sumoparse.parse_sansho(html, target, backend)
+    return sumoparse.parse_yusho(html, backend)
+
+
+def pages():
+    """[(name, kind, html, expected or None)] of every golden and recorded page."""
+    found = []
+    for path in sorted(glob.glob(os.path.join(GOLDEN, "*.html")) + glob.glob(os.path.join(standin.RECORDINGS, "*.html"))):
+        name = os.path.basename(path)[:-len(".html")]
+        kind = kind_of(name)
+        if kind is None:
+            continue
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        expected = None
+        if os.path.exists(path[:-len(".html")] + ".json"):
+            with open(path[:-len(".html")] + ".json", encoding="utf-8") as f:
+                expected = json.load(f)
+        found.append((name, kind, html, expected))
+    return found
+
+
+def save(db_path, basho_id):
+    """Write a page of each type from the stand-in, and its soup parse, to bench/golden."""
+    con = sqlite3.connect(db_path)
+    year, month = con.execute("SELECT start_year, start_month FROM basho WHERE id = ?", (basho_id,)).fetchone()
+    con.close()
+    basho = standin.Basho(standin.load_roster(db_path, basho_id), year, month)
+
+    saved = {
+        "results_day1": basho.results_page(1),
+        "results_day15": basho.results_page(standin.DAYS),
+        "results_day16": basho.results_page(standin.DAYS + 1),
+        "banzuke": basho.banzuke_page(),
+        "sansho": basho.sansho_page(),
+        "results_text": basho.results_text_page(),
+    }
+    for name, html in saved.items():
+        write_golden(name, html, f"{year}.{month:02d}")
+
+
+def fetch(basho, day):
+    """Download a page of each type for basho (YYYYMM) from sumodb to bench/golden."""
+    year, month = divmod(basho, 100)
+    urls = {
+        f"banzuke_{basho}": helpers.banzuke_url(year, month),
+        f"results_{basho}_day{day}": helpers.results_url(year, month, day),
+        f"results_text_{basho}": helpers.results_text_url(year, month),
+        f"sansho_{basho}": helpers.SANSHO_URL,
+    }
+    for name, url in urls.items():
+        write_golden(name, sumodb.get_page(url), target_of(name))
+
+
+def write_golden(name, html, target):
+    """Save a page and its soup parse, which the other backends must match, to bench/golden."""
+    os.makedirs(GOLDEN, exist_ok=True)
+    with open(os.path.join(GOLDEN, name + ".html"), "w", encoding="utf-8") as f:
+        f.write(html)
+    with open(os.path.join(GOLDEN, name + ".json"), "w", encoding="utf-8") as f:
+        json.dump(parse(kind_of(name), html, "soup", target), f, indent=1, ensure_ascii=False)
+    print("saved", name)
+
+
+def check(found):
+    """Every backend against the golden output, or against soup for recordings."""
+    failures = 0
+    for name, kind, html, expected in found:
+        reference = expected if expected is not None else parse(kind, html, "soup", target_of(name))
+        for backend in sumoparse.BACKENDS:
+            got = parse(kind, html, backend, target_of(name))
+            if got != reference:
+                failures += 1
+                print(f"FAIL {backend} on {name}")
+    print(f"{len(found)} pages x {len(sumoparse.BACKENDS)} backends checked, {failures} failures")
+    return failures == 0
+
+
+def bench(found, seconds):
+    """Mean time per parse of each page type, per backend, and the speedup over soup."""
+    by_kind = {}
+    for _, kind, html, _ in found:
+        by_kind.setdefault(kind, []).append(html)
+
+    print(f"\n  {'page':14}" + "".join(f"{b + ' ms':>12}" for b in sumoparse.BACKENDS) + f"{'speedup':>10}")
+    for kind, htmls in sorted(by_kind.items()):
+        means = {}
+        for backend in sumoparse.BACKENDS:
+            runs, start = 0, time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                for html in htmls:
+                    parse(kind, html, backend)
+                runs += len(htmls)
+            means[backend] = (time.perf_counter() - start) / runs * 1000
+        print(f"  {kind:14}" + "".join(f"{means[b]:>12.3f}" for b in sumoparse.BACKENDS)
+              + f"{means['soup'] / means['fast']:>9.1f}x")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Check and time the sumodb page parsers.")
+    parser.add_argument("--save", action="store_true", help="regenerate the stand-in pages in bench/golden and exit")
+    parser.add_argument("--fetch", type=int, metavar="YYYYMM",
+                        help="download a page of each type for this basho from sumodb to bench/golden and exit")
+    parser.add_argument("--day", type=int, default=9, help="results day for --fetch")
+    parser.add_argument("--db", default=os.path.join(ROOT, "honbasho.db"), help="database for --save")
+    parser.add_argument("--basho", type=int, default=1, help="basho for --save")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per page type and backend")
+    args = parser.parse_args(argv)
+
+    if args.save:
+        save(args.db, args.basho)
+        return
+    if args.fetch:
+        fetch(args.fetch, args.day)
+        return
+
+    found = pages()
+    ok = check(found)
+    bench(found, args.seconds)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Timing of the Monte Carlo projection engine (projection.py) on a synthetic
+# 42-man makuuchi banzuke, from every day of the basho, plus a sanity check
+# that the simulated records and yusho points add up.
+#
+#   python bench/projection.py --sims 10000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import projection  # noqa: E402
+import scoring  # noqa: E402
+
+# Y, Y, O, O, S, S, K, K, then M1 to M17 east and west
+RANK_NO = np.array([1, 1, 2, 2, 3, 3, 4, 4] + [5 + m for m in range(17) for _ in range(2)])
+
+
+def check(sims):
+    """Every simulated day has one winner per bout and every basho exactly one yusho."""
+    rng = np.random.default_rng(0)
+    days = 15
+    points = projection.simulate(RANK_NO, np.zeros(len(RANK_NO)), days, projection.DEFAULT_SLOPE, sims, rng,
+                                 prizes=False, yusho=True)
+    # at least one point per win, so a yusho winner has more than YUSHO_POINTS
+    yusho = (points >= scoring.YUSHO_POINTS + 8).sum(axis=1)
+    ok = bool((yusho >= 1).all())
+    favourite = points[:, :2].mean()
+    underdog = points[:, -2:].mean()
+    print(f"yusho awarded in every sim: {ok}; mean points yokozuna {favourite:.1f}, M17 {underdog:.1f}")
+    return ok
+
+
+def bench(sims, repeat):
+    rng = np.random.default_rng(1)
+    players = 3
+    pick_index = np.arange(players * 6) * 2 % len(RANK_NO)
+    pick_player = np.repeat(np.arange(players), 6)
+    print(f"\n  {'day':>4} {'days left':>10} {'ms':>9}   ({sims} sims, best of {repeat})")
+    for day in range(0, 15, 2):
+        wins = rng.integers(0, day + 1, len(RANK_NO))
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            future = projection.simulate(RANK_NO, wins, 15 - day, projection.DEFAULT_SLOPE, sims, rng)
+            projection.standings(future, pick_index, pick_player, np.zeros(players))
+            best = min(best, time.perf_counter() - start)
+        print(f"  {day:>4} {15 - day:>10} {best * 1000:>9.1f}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Time the projection engine.")
+    parser.add_argument("--sims", type=int, default=projection.SIMS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    ok = check(args.sims)
+    bench(args.sims, args.repeat)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,253 @@
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Offline benchmarks of the hot paths, at increasing numbers of drafts.
+#
+# Each scale gets its own copy of the database (reference data from --source, then
+# synthetic users, players and drafts) and its own empty sumodb cache, with every
+# sumodb page served by bench/standin.py. For every operation it reports p50/p95
+# latency, SQL statements per operation and rows written per operation.
+#
+#   python bench/run.py --scales 10,100,1000
+#   python bench/run.py --json bench_output.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import standin  # noqa: E402
+
+PASSWORD = "bench"
+PICKS_PER_PLAYER = 6
+PLAYERS_PER_USER = 2
+
+
+class Meter:
+    """SQL statements run and rows written, read before and after an operation."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = None
+
+    @property
+    def rows(self):
+        return self.db.total_changes()
+
+    def attach(self, db):
+        self.db = db
+        for name in ("execute", "tuples"):
+            setattr(db, name, self._counted(getattr(db, name)))
+
+    def _counted(self, run):
+        def counted(sql, *args):
+            self.queries += 1
+            return run(sql, *args)
+        return counted
+
+
+class Op:
+    def __init__(self, name):
+        self.name = name
+        self.times = []
+        self.queries = 0
+        self.rows = 0
+
+    def percentile(self, p):
+        ordered = sorted(self.times)
+        return ordered[round(p * (len(ordered) - 1))] * 1000
+
+    def row(self, scale):
+        n = len(self.times)
+        return {"drafts": scale, "op": self.name, "n": n,
+                "p50_ms": round(self.percentile(0.50), 2), "p95_ms": round(self.percentile(0.95), 2),
+                "queries_per_op": round(self.queries / n, 1), "rows_per_op": round(self.rows / n, 1)}
+
+
+def measure(op, meter, fn, *args, **kwargs):
+    queries, rows = meter.queries, meter.rows
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    op.times.append(time.perf_counter() - start)
+    op.queries += meter.queries - queries
+    op.rows += meter.rows - rows
+    return result
+
+
+def copy_db(source, path):
+    """Copy a database with the backup api, so pages still in its WAL file come along."""
+    src, dst = sqlite3.connect(source), sqlite3.connect(path)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def make_template(source, path, basho_id):
+    """Copy source keeping only reference data (ranks, rikishi, basho, banzuke)."""
+    copy_db(source, path)
+    con = sqlite3.connect(path)
+    tables = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in ("days_results", "days_results_archive", "draft_picks", "drafts", "players", "users", "bouts", "banzuke_payloads"):
+        if table in tables:
+            con.execute(f"DELETE FROM {table}")
+    con.execute("UPDATE basho SET last_update_day = 0 WHERE id = ?", (basho_id,))
+    con.commit()
+    year, month = con.execute("SELECT start_year, start_month FROM basho WHERE id = ?", (basho_id,)).fetchone()
+    con.close()
+    return year, month
+
+
+def seed(path, basho_id, users, drafts, password_hash, rnd):
+    """users users with two players each and drafts drafts spread over them."""
+    con = sqlite3.connect(path)
+    rikishi = [r[0] for r in con.execute("SELECT rikishi_id FROM banzuke WHERE basho_id = ? AND call_up = 0",
+                                         (basho_id,))]
+    players = {}
+    for u in range(users):
+        user_id = con.execute("INSERT INTO users (username, hash) VALUES (?, ?)",
+                              (f"bench{u}", password_hash)).lastrowid
+        players[user_id] = [con.execute("INSERT INTO players (name, user_id) VALUES (?, ?)",
+                                        (f"player{p}", user_id)).lastrowid
+                            for p in range(PLAYERS_PER_USER)]
+
+    user_ids = list(players)
+    for d in range(drafts):
+        user_id = user_ids[d % len(user_ids)]
+        draft_id = con.execute("INSERT INTO drafts (user_id, basho_id, name) VALUES (?, ?, ?)",
+                               (user_id, basho_id, f"draft{d}")).lastrowid
+        picks = rnd.sample(rikishi, PICKS_PER_PLAYER * PLAYERS_PER_USER)
+        con.executemany("INSERT INTO draft_picks (draft_id, player_id, rikishi_id) VALUES (?, ?, ?)",
+                        [(draft_id, players[user_id][i // PICKS_PER_PLAYER], r) for i, r in enumerate(picks)])
+    con.commit()
+    con.close()
+    return rikishi, players[user_ids[0]]
+
+
+def run_scale(appmod, workdir, basho_id, year, month, drafts, users, samples, password_hash, server):
+    import helpers
+    import sumodb
+    from database import Database
+
+    path = os.path.join(workdir, f"scale_{drafts}.db")
+    copy_db(os.path.join(workdir, "template.db"), path)
+    rnd = random.Random(drafts)
+    rikishi, players = seed(path, basho_id, min(users, drafts), drafts, password_hash, rnd)
+
+    db = Database(path)
+    meter = Meter()
+    meter.attach(db)
+    appmod.db = db
+    helpers._banzuke_cache.clear()
+    sumodb.CACHE_DIR = os.path.join(workdir, f"cache_{drafts}")
+    ops = {}
+
+    def op(name):
+        return ops.setdefault(name, Op(name))
+
+    # ingestion, timed as a whole and day by day
+    fetch_days_results = helpers.fetch_days_results
+
+    def timed_day(*args):
+        return measure(op("fetch_days_results"), meter, fetch_days_results, *args)
+
+    helpers.fetch_days_results = timed_day
+    requests_before = server.requests
+    try:
+        with appmod.app.app_context():
+            measure(op("fetch_save_results"), meter, helpers.fetch_save_results, db, basho_id)
+    finally:
+        helpers.fetch_days_results = fetch_days_results
+    sumodb_requests = server.requests - requests_before
+
+    for _ in range(samples):
+        measure(op("banzuke_helper"), meter, helpers.banzuke_helper, db, year, month)
+
+    client = appmod.app.test_client()
+    client.post("/login", data={"username": "bench0", "password": PASSWORD})
+    # the routes only serve the logged-in user's drafts
+    draft_ids = [r["id"] for r in db.execute("SELECT d.id FROM drafts AS d JOIN users AS u ON u.id = d.user_id "
+                                             " WHERE u.username = 'bench0'")]
+
+    for i in range(samples):
+        draft_id = rnd.choice(draft_ids)
+        url = f"/days_results/{draft_id}/{rnd.randint(1, 16)}"
+        resp = measure(op("GET /days_results/<draft>/<day>"), meter, client.get, url)
+        measure(op("GET /days_results/<draft>/<day> (304)"), meter,
+                client.get, url, headers={"If-None-Match": resp.headers["ETag"]})
+        measure(op("GET /days_results/<draft>"), meter,
+                client.get, f"/days_results/{draft_id}?from=1&to=16")
+        measure(op("GET /standings/<draft>"), meter, client.get, f"/standings/{draft_id}")
+        measure(op("GET /score_game"), meter, client.get, "/score_game")
+        measure(op("POST /score_game"), meter, client.post, "/score_game", data={"draft_id": draft_id})
+        picks = rnd.sample(rikishi, PICKS_PER_PLAYER * len(players))
+        slates = [{"player_id": p, "picks": {str(k): {"id": picks[j * PICKS_PER_PLAYER + k]}
+                                            for k in range(PICKS_PER_PLAYER)}}
+                  for j, p in enumerate(players)]
+        measure(op("POST /new_draft"), meter, client.post, "/new_draft",
+                json={"players": slates, "basho_id": basho_id, "draft_name": f"bench-new-{i}"})
+
+    return [o.row(drafts) for o in ops.values()], sumodb_requests
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Offline benchmarks of honbasho's hot paths.")
+    parser.add_argument("--source", default=os.path.join(ROOT, "honbasho.db"),
+                        help="database to take ranks, rikishi, basho and banzuke from")
+    parser.add_argument("--basho", type=int, default=1, help="basho id with a loaded banzuke")
+    parser.add_argument("--scales", default="10,100,1000", help="comma separated numbers of drafts")
+    parser.add_argument("--users", type=int, default=20, help="users the drafts are spread over")
+    parser.add_argument("--samples", type=int, default=100, help="samples per operation")
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="seconds the sumodb stand-in takes to answer, like the real network")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="honbasho-bench-")
+    template = os.path.join(workdir, "template.db")
+    year, month = make_template(args.source, template, args.basho)
+
+    basho = standin.Basho(standin.load_roster(template, args.basho), year, month)
+    server, base_url = standin.start(basho, latency=args.latency)
+
+    # app.py opens HONBASHO_DB and migrates it when imported
+    os.environ["HONBASHO_DB"] = template
+    os.environ["SUMODB_BASE_URL"] = base_url
+    os.environ["SUMODB_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ.pop("SUMODB_OFFLINE", None)
+    import app as appmod
+    from werkzeug.security import generate_password_hash
+
+    # urllib3 logs every connection at DEBUG
+    logging.disable(logging.INFO)
+
+    password_hash = generate_password_hash(PASSWORD)
+    rows = []
+    try:
+        for scale in [int(s) for s in args.scales.split(",")]:
+            results, sumodb_requests = run_scale(appmod, workdir, args.basho, year, month, scale,
+                                                 args.users, args.samples, password_hash, server)
+            rows += results
+            print(f"\n{scale} drafts ({sumodb_requests} sumodb requests to the stand-in)")
+            print(f"  {'operation':40} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'rows':>8}")
+            for r in results:
+                print(f"  {r['op']:40} {r['n']:>5} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                      f"{r['queries_per_op']:>8} {r['rows_per_op']:>8}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
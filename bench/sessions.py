@@ -0,0 +1,128 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+# Session store benchmark: Flask-Session's filesystem store against the SQLite one
+# (sessions.py), with --threads users at once each logging in and then loading a
+# page that reads the session --pages times. Reports p50/p95 latency of logins and
+# page loads, and throughput, for each store: once with each user's requests on one
+# long-lived thread, and once with every request on a thread of its own, as a
+# thread-per-request server runs them.
+#
+#   python bench/sessions.py --threads 8 --pages 200
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from run import PASSWORD, copy_db, seed  # noqa: E402
+
+
+def percentile(times, p):
+    ordered = sorted(times)
+    return ordered[round(p * (len(ordered) - 1))] * 1000
+
+
+def run_store(app, threads, pages, fresh_threads=False):
+    """
+    Log threads users in at once and have each load /players pages times, every
+    request on a new thread if fresh_threads.
+    """
+    logins, loads = [], []
+    lock = threading.Lock()
+    start_line = threading.Barrier(threads)
+
+    def timed(send, times):
+        start = time.perf_counter()
+        resp = send()
+        times.append(time.perf_counter() - start)
+        return resp
+
+    def request(send, times):
+        if not fresh_threads:
+            return timed(send, times)
+        out = []
+        thread = threading.Thread(target=lambda: out.append(timed(send, times)))
+        thread.start()
+        thread.join()
+        return out[0]
+
+    def user(u):
+        client = app.test_client()
+        my_logins, my_loads = [], []
+        start_line.wait()
+        resp = request(lambda: client.post("/login", data={"username": f"bench{u}", "password": PASSWORD}),
+                       my_logins)
+        assert resp.status_code == 302, resp.status_code
+        for _ in range(pages):
+            resp = request(lambda: client.get("/players"), my_loads)
+            assert resp.status_code == 200, resp.status_code
+        with lock:
+            logins.extend(my_logins)
+            loads.extend(my_loads)
+
+    workers = [threading.Thread(target=user, args=(u,)) for u in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return logins, loads, elapsed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the session stores.")
+    parser.add_argument("--source", default=os.path.join(ROOT, "honbasho.db"))
+    parser.add_argument("--basho", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8, help="users logging in and loading pages at once")
+    parser.add_argument("--pages", type=int, default=200, help="page loads per user")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="honbasho-sessions-")
+    path = os.path.join(workdir, "honbasho.db")
+    copy_db(args.source, path)
+    from werkzeug.security import generate_password_hash
+    # a cheap hash, so logins measure the session store rather than the password check
+    seed(path, args.basho, args.threads, 0, generate_password_hash(PASSWORD, method="pbkdf2:sha256:1"),
+         random.Random(0))
+
+    os.environ["HONBASHO_DB"] = path
+    os.environ["HONBASHO_SESSION_DB"] = os.path.join(workdir, "sessions.db")
+    os.environ["SUMODB_OFFLINE"] = "1"
+    import app as appmod
+    from flask_session.filesystem import FileSystemSessionInterface
+    from database import Database
+    from sessions import SqliteSessionInterface
+
+    stores = {
+        "filesystem": lambda: FileSystemSessionInterface(appmod.app, cache_dir=os.path.join(workdir, "flask_session"),
+                                                         permanent=True),
+        "sqlite": lambda: SqliteSessionInterface(appmod.app, Database(os.path.join(workdir, "sessions-bench.db")),
+                                                 permanent=True),
+    }
+    try:
+        print(f"{args.threads} users at once, {args.pages} page loads each")
+        for fresh_threads in (False, True):
+            print("\n" + ("a new thread per request" if fresh_threads else "one thread per user"))
+            print(f"  {'store':12} {'login p50':>10} {'login p95':>10} {'page p50':>9} {'page p95':>9} "
+                  f"{'pages/s':>9}")
+            for name, make in stores.items():
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", DeprecationWarning)
+                    appmod.app.session_interface = make()
+                logins, loads, elapsed = run_store(appmod.app, args.threads, args.pages, fresh_threads)
+                print(f"  {name:12} {percentile(logins, 0.5):>10.2f} {percentile(logins, 0.95):>10.2f} "
+                      f"{percentile(loads, 0.5):>9.2f} {percentile(loads, 0.95):>9.2f} "
+                      f"{len(loads) / elapsed:>9.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
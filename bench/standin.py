@@ -0,0 +1,226 @@
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# A local stand-in for sumodb.sumogames.de, serving the four pages honbasho reads
+# (results, Banzuke, Sansho and Results_text) so benchmarks never touch the network.
+#
+# A page saved under the recordings directory is served as is, named after the
+# request, e.g. results.aspx_b=202507&d=3.html. Anything not recorded is generated
+# from the banzuke of the basho in the database, in the same html layout as sumodb.
+#
+#   python bench/standin.py honbasho.db 1 --port 8765
+#   python bench/standin.py honbasho.db 1 --record    # save the real pages first
+
+RECORDINGS = os.path.join(os.path.dirname(__file__), "recordings")
+SUMODB = "https://sumodb.sumogames.de/"
+DAYS = 15
+RANK_CODES = {1: "Y", 2: "O", 3: "S", 4: "K"}
+
+
+def recording_name(path_and_query):
+    return path_and_query.lstrip("/").replace("?", "_").replace("/", "_") + ".html"
+
+
+def load_roster(db_path, basho_id):
+    """[(ring_name, rank_no, cardinality)] of the basho's banzuke, highest rank first."""
+    con = sqlite3.connect(db_path)
+    try:
+        return con.execute("SELECT rikishi.ring_name, ranks.rank_no, ranks.cardinality "
+                           "  FROM banzuke "
+                           "  JOIN rikishi ON rikishi.id = banzuke.rikishi_id "
+                           "  JOIN ranks ON ranks.id = banzuke.rank_id "
+                           " WHERE banzuke.basho_id = ? AND banzuke.call_up = 0 "
+                           " ORDER BY ranks.rank_no, ranks.cardinality, banzuke.id",
+                           (basho_id,)).fetchall()
+    finally:
+        con.close()
+
+
+def short_rank(rank_no, cardinality):
+    code = RANK_CODES.get(rank_no, f"M{rank_no - 4}")
+    return code + ("e" if cardinality == "EAST" else "w")
+
+
+class Basho:
+    """Fifteen days of made up, but repeatable, results for a roster."""
+
+    def __init__(self, roster, year, month, seed=0):
+        self.roster = roster
+        self.ym = f"{year}{month:02d}"
+        self.days = {}
+        record = {name: [0, 0] for name, _, _ in roster}
+        rnd = random.Random(seed)
+        for day in range(1, DAYS + 1):
+            names = [name for name, _, _ in roster]
+            rnd.shuffle(names)
+            bouts = []
+            for east, west in zip(names[0::2], names[1::2]):
+                east_won = rnd.random() < 0.5
+                fusen = rnd.random() < 0.02
+                winner, loser = (east, west) if east_won else (west, east)
+                record[winner][0] += 1
+                record[loser][1] += 1
+                bouts.append((east, west, east_won, fusen, tuple(record[east]), tuple(record[west])))
+            self.days[day] = bouts
+        self.record = record
+
+    def results_page(self, day):
+        rows = []
+        for east, west, east_won, fusen, east_rec, west_rec in self.days.get(day, []):
+            win = "hoshi_fusensho.gif" if fusen else "hoshi_shiro.gif"
+            loss = "hoshi_fusenpai.gif" if fusen else "hoshi_kuro.gif"
+            left, right = (win, loss) if east_won else (loss, win)
+            technique = "fusen" if fusen else "yorikiri"
+            rows.append(f'<tr><td class="tk_kekka"><img src="img/{left}"></td>'
+                        f'{self._cell(east, east_rec)}'
+                        f'<td class="tk_kim">{technique}<br></td>'
+                        f'{self._cell(west, west_rec)}'
+                        f'<td class="tk_kekka"><img src="img/{right}"></td></tr>')
+        return f'<html><body><table class="tk_table">{"".join(rows)}</table></body></html>'
+
+    @staticmethod
+    def _cell(name, rec):
+        return (f'<td><a href="Rikishi.aspx?r=0">{name}</a><br>'
+                f'<a href="Rikishi_basho.aspx?r=0">{rec[0]}-{rec[1]} (0-0)</a></td>')
+
+    def banzuke_page(self):
+        by_rank = {}
+        for name, rank_no, cardinality in self.roster:
+            by_rank.setdefault(rank_no, {"EAST": [], "WEST": []})[cardinality].append(name)
+        rows = []
+        for rank_no, sides in sorted(by_rank.items()):
+            for i in range(max(len(sides["EAST"]), len(sides["WEST"]))):
+                cells = []
+                for side in ("EAST", "WEST"):
+                    names = sides[side]
+                    cells.append(f'<td><a href="Rikishi.aspx?r=0">{names[i]}</a></td>' if i < len(names) else "<td></td>")
+                code = RANK_CODES.get(rank_no, f"M{rank_no - 4}")
+                rows.append(f'<tr><td><a href="Rikishi_basho.aspx?r=0">8-7</a></td>{cells[0]}'
+                            f'<td class="short_rank">{code}</td>{cells[1]}<td></td></tr>')
+        return ('<html><body><table class="banzuke"><caption>Makuuchi Banzuke</caption><tbody>'
+                + "".join(rows) + "</tbody></table></body></html>")
+
+    def _leaders(self):
+        return sorted(self.roster, key=lambda r: -self.record[r[0]][0])
+
+    def sansho_page(self):
+        leaders = self._leaders()
+        prize = lambda r: f'<a href="Rikishi.aspx?r=0">{short_rank(r[1], r[2])} {r[0]}</a>'
+        target = f"{self.ym[:4]}.{self.ym[4:]}"
+        return ('<html><body><table><tr><th>Basho</th><th>Gino-sho</th><th>Shukun-sho</th><th>Kanto-sho</th></tr>'
+                f'<tr><td>{target}</td><td>{prize(leaders[1])}</td><td>not awarded</td>'
+                f'<td>{prize(leaders[2])}{prize(leaders[3])}</td></tr></table></body></html>')
+
+    def results_text_page(self):
+        lines = ["Makuuchi"]
+        for east, west, _, _, _, _ in self.days[DAYS]:
+            e, w = self.record[east], self.record[west]
+            lines.append(f"M1e  {east} ({e[0]}-{e[1]})  yorikiri  M1w  {west} ({w[0]}-{w[1]})")
+        lines.append("Juryo")
+        return "<html><body><pre>" + "\n".join(lines) + "</pre></body></html>"
+
+    def page(self, path, query):
+        page = path.rsplit("/", 1)[-1].lower()
+        if page == "results.aspx":
+            return self.results_page(int(query.get("d", ["0"])[0]))
+        if page == "banzuke.aspx":
+            return self.banzuke_page()
+        if page == "sansho.aspx":
+            return self.sansho_page()
+        if page == "results_text.aspx":
+            return self.results_text_page()
+        return None
+
+
+def make_server(basho, port=0, recordings=RECORDINGS, latency=0.0):
+    """
+    An http server for basho on localhost (port 0 picks a free one) and its base url.
+    latency seconds are added to every response, to play the part of the real network.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server.requests += 1
+            time.sleep(latency)
+            recorded = os.path.join(recordings, recording_name(self.path))
+            if os.path.exists(recorded):
+                with open(recorded, "rb") as f:
+                    body = f.read()
+            else:
+                parts = urlsplit(self.path)
+                html = basho.page(parts.path, parse_qs(parts.query))
+                if html is None:
+                    self.send_error(404)
+                    return
+                body = html.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.requests = 0
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def start(basho, port=0, recordings=RECORDINGS, latency=0.0):
+    """Serve basho from a daemon thread; returns (server, base_url)."""
+    server, base_url = make_server(basho, port, recordings, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base_url
+
+
+def record(year, month, recordings=RECORDINGS):
+    """Save the real sumodb pages of a basho under recordings."""
+    import requests
+
+    ym = f"{year}{month:02d}"
+    paths = [f"results.aspx?b={ym}&d={d}" for d in range(1, DAYS + 2)]
+    paths += [f"Banzuke.aspx?b={ym}", "Sansho.aspx", f"Results_text.aspx?b={ym}"]
+    os.makedirs(recordings, exist_ok=True)
+    for path in paths:
+        resp = requests.get(SUMODB + path, timeout=30)
+        resp.raise_for_status()
+        with open(os.path.join(recordings, recording_name(path)), "w", encoding="utf-8") as f:
+            f.write(resp.text)
+        print("recorded", path)
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve sumodb pages for one basho locally.")
+    parser.add_argument("db", help="honbasho database with the basho's banzuke")
+    parser.add_argument("basho_id", type=int)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--record", action="store_true", help="save the real sumodb pages and exit")
+    args = parser.parse_args(argv)
+
+    con = sqlite3.connect(args.db)
+    year, month = con.execute("SELECT start_year, start_month FROM basho WHERE id = ?", (args.basho_id,)).fetchone()
+    con.close()
+
+    if args.record:
+        record(year, month)
+        return
+
+    server, base_url = make_server(Basho(load_roster(args.db, args.basho_id), year, month, args.seed),
+                                   args.port, latency=args.latency)
+    print(f"serving basho {year}.{month:02d} on {base_url} (SUMODB_BASE_URL={base_url})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,89 @@
+import re
+import sqlite3
+import threading
+
+# A thin data-access layer straight over sqlite3, with the interface of cs50's SQL
+# that the app was written against: db.execute(sql, *args) returns a list of dicts
+# for a query, the new row's id for an INSERT, the number of rows for an UPDATE or
+# DELETE, and turns a constraint violation into a ValueError.
+#
+# Each thread keeps one connection open, with the PRAGMAs below applied when it
+# connects and sqlite3's prepared statement cache in front of it.
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",     # readers don't block the writer
+    "PRAGMA synchronous = NORMAL",   # safe with WAL, fsync only at checkpoints
+    "PRAGMA busy_timeout = 5000",    # wait for a concurrent writer instead of failing
+)
+STATEMENT_CACHE = 256
+
+_WRITE = re.compile(r"\b(INSERT|REPLACE|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+def command(sql):
+    """First keyword of the statement, or the statement's DML keyword after a WITH."""
+    keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if keyword == "WITH":
+        m = _WRITE.search(sql)
+        return m.group(1).upper() if m else "SELECT"
+    return keyword
+
+
+class Database:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._commands = {}
+
+    def connection(self):
+        """This thread's connection, opened on first use."""
+        con = getattr(self._local, "connection", None)
+        if con is None:
+            # isolation_level=None: every statement commits on its own unless inside BEGIN ... COMMIT
+            con = sqlite3.connect(self.path, isolation_level=None, cached_statements=STATEMENT_CACHE)
+            for pragma in PRAGMAS:
+                con.execute(pragma)
+            self._local.connection = con
+        return con
+
+    def _cursor(self, sql, args):
+        con = self.connection()
+        kind = self._commands.get(sql)
+        if kind is None:
+            kind = self._commands[sql] = command(sql)
+
+        if kind == "ROLLBACK" and not con.in_transaction:
+            # sqlite already rolled the transaction back after the error being handled
+            return kind, None
+        try:
+            return kind, con.execute(sql, args)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(e) from None
+
+    def execute(self, sql, *args):
+        """Run one statement with ? placeholders, results as with cs50's SQL.execute."""
+        kind, cursor = self._cursor(sql, args)
+        if cursor is None:
+            return True
+        if cursor.description is not None:
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        if kind in ("INSERT", "REPLACE"):
+            return cursor.lastrowid if cursor.rowcount == 1 else None
+        if kind in ("UPDATE", "DELETE"):
+            return cursor.rowcount
+        return True
+
+    def tuples(self, sql, *args):
+        """Run a query and return its rows as plain tuples, for hot paths that don't need dicts."""
+        return self._cursor(sql, args)[1].fetchall()
+
+    def total_changes(self):
+        """Rows inserted, updated or deleted on this thread's connection since it opened."""
+        return self.connection().total_changes
+
+    def close(self):
+        con = getattr(self._local, "connection", None)
+        if con is not None:
+            con.close()
+            self._local.connection = None
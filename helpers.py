@@ -1,10 +1,18 @@
-import re
-import requests
-from bs4 import BeautifulSoup
+import hashlib
+import time
+from collections import OrderedDict
 from flask import redirect, render_template, session
 from functools import wraps
 from datetime import date
 
+import analytics
+import instrument
+import jsonapi
+import scoring
+import standings
+import sumoparse
+from sumodb import BASE_URL, basho_is_over, get_page, prefetch
+
 def apology(message, code=400):
     """Render message as an apology to user."""
 
@@ -47,13 +55,13 @@ def login_required(f):
 
 
 
-# Build {1: [{'EAST': {'Name': 'jhn', 'ID': 10}, 'rank_name': 'Yokozuna', 'WEST': {'Name': 'whe', 'ID': 11}]
+# Build {1: [BanzukeSlot(EAST=Side(name='jhn', id=10), rank_name='Yokozuna', WEST=Side(name='whe', id=11))]}
 def banzuke_helper(db, year:int, month:int):
     """
     Create a data structure of the banzuke for an html page to render
     """
 
-    fighters = db.execute("SELECT ring_name, rikishi_id, rank_no, rank_name, cardinality FROM banzuke "
+    fighters = db.tuples("SELECT ring_name, rikishi_id, rank_no, rank_name, cardinality FROM banzuke "
                           "JOIN basho ON basho_id=basho.id "
                           "JOIN rikishi ON rikishi_id=rikishi.id "
                           "JOIN ranks ON rank_id=ranks.id "
@@ -62,43 +70,98 @@ def banzuke_helper(db, year:int, month:int):
                           "ORDER BY rank_no ASC", month, year)
 
     ranked = {}
+    # number of fighters placed so far per (rank_no, cardinality): the next open slot
+    placed = {}
 
-    for fighter in fighters:
-        ring_name = fighter["ring_name"]
-        rikishi_id = fighter["rikishi_id"]
-        rank_no = fighter["rank_no"]
-        rank_name = fighter["rank_name"]
-        cardinality = fighter["cardinality"]
-
-        # Ensure the rank key exists
-        if rank_no not in ranked:
-            ranked[rank_no] = [{"EAST": {"name": "--", "id": "--"},
-                                "rank_name": rank_name,
-                                "WEST": {"name": "--", "id": "--"}}]
-
-
-        # Try to place the fighter in an existing slot
-        placed = False
-        for slot in ranked[rank_no]:
-            if slot[cardinality]["name"] == "--":
-                slot[cardinality]["name"] = ring_name
-                slot[cardinality]["id"] = rikishi_id
-                placed = True
-                break
+    for ring_name, rikishi_id, rank_no, rank_name, cardinality in fighters:
+        slots = ranked.setdefault(rank_no, [])
+        i = placed.get((rank_no, cardinality), 0)
+        placed[(rank_no, cardinality)] = i + 1
+
+        # If there is no open slot on this side, start a new East/West pair
+        if i == len(slots):
+            slots.append(jsonapi.BanzukeSlot(EAST=jsonapi.Side("--", "--"), rank_name=rank_name,
+                                             WEST=jsonapi.Side("--", "--")))
 
-        # If no empty slot was found, start a new East/West pair
-        if not placed:
-            if cardinality == "EAST":
-                ranked[rank_no].append({"EAST": {"name": ring_name, "id": rikishi_id}, "rank_name": rank_name, "WEST": {"name": "--", "id": "--"}})
-            else:
-                ranked[rank_no].append({"EAST": {"name": "--", "id": "--"}, "rank_name": rank_name, "WEST": {"name": ring_name, "id": rikishi_id}})
+        setattr(slots[i], cardinality, jsonapi.Side(ring_name, rikishi_id))
     return ranked
 
 
+# In-process copies of rendered banzuke, {basho_id: (etag, payload)}, least recently used first
+BANZUKE_CACHE_SIZE = 32
+_banzuke_cache = OrderedDict()
+
+
+def banzuke_payload(db, year:int, month:int):
+    """
+    Return (payload, etag, final) for the basho's banzuke as JSON text, rendering it only
+    once per basho. Published banzuke are kept in banzuke_payloads so every worker
+    shares them, and in a small in-process LRU. final is True once the basho is over
+    and all its days are stored, so no more call ups can join the banzuke.
+    Returns None for an unknown basho.
+    """
+
+    q = db.execute("SELECT basho.id, banzuke_loaded, last_update_day, etag "
+                   "  FROM basho "
+                   "  LEFT JOIN banzuke_payloads ON basho_id = basho.id "
+                   " WHERE start_month = ? AND start_year = ?",
+                   month, year)
+    if not q:
+        return None
+
+    basho_id, loaded, etag = q[0]['id'], q[0]['banzuke_loaded'], q[0]['etag']
+    final = bool(loaded) and q[0]['last_update_day'] >= 16 and basho_is_over(year, month)
+
+    cached = _banzuke_cache.get(basho_id)
+    if etag is not None and cached and cached[0] == etag:
+        _banzuke_cache.move_to_end(basho_id)
+        return cached[1], etag, final
+
+    if etag is not None:
+        payload = db.execute("SELECT payload FROM banzuke_payloads WHERE basho_id = ?", basho_id)[0]['payload']
+    else:
+        encoded = jsonapi.encode(banzuke_helper(db, year, month))
+        payload, etag = encoded.decode(), hashlib.sha1(encoded).hexdigest()
+        if loaded:
+            db.execute("INSERT OR REPLACE INTO banzuke_payloads (basho_id, payload, etag) VALUES (?, ?, ?)",
+                       basho_id, payload, etag)
+        else:
+            # not published yet, nothing worth keeping
+            return payload, etag, False
+
+    _banzuke_cache[basho_id] = (etag, payload)
+    _banzuke_cache.move_to_end(basho_id)
+    while len(_banzuke_cache) > BANZUKE_CACHE_SIZE:
+        _banzuke_cache.popitem(last=False)
+    return payload, etag, final
+
+
+def invalidate_banzuke_payload(db, basho_id):
+    """The basho's banzuke rows changed: drop the rendered copy for every worker."""
+    db.execute("DELETE FROM banzuke_payloads WHERE basho_id = ?", basho_id)
+    _banzuke_cache.pop(basho_id, None)
+
 
 
 
 
+
+def results_url(year, month, day):
+    return f"{BASE_URL}results.aspx?b={year}{month:02d}&d={day}"
+
+
+def banzuke_url(year, month):
+    return f"{BASE_URL}Banzuke.aspx?b={year}{month:02d}"
+
+
+def results_text_url(year, month):
+    return f"{BASE_URL}Results_text.aspx?b={year}{month:02d}"
+
+
+SANSHO_URL = f"{BASE_URL}Sansho.aspx"
+
+
+@instrument.parses
 def fetch_basho_results(year:int, month:int, day:int):
     """
     Fetch and parse the N-th day results from sumodb.sumogames.de
@@ -108,65 +171,7 @@ def fetch_basho_results(year:int, month:int, day:int):
     :return: dict with basho, day and list of bouts:
       [{winner, winner_record, loser, loser_record, technique}, …]
     """
-    url = f"https://sumodb.sumogames.de/results.aspx?b={year}{month:02d}&d={day}"
-    resp = requests.get(url)
-    resp.raise_for_status()
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-    table = soup.find("table", class_="tk_table")
-    if not table:
-        raise RuntimeError(f"Couldn't find the results table for basho={basho_ym}, day={day}")
-
-    bouts = []
-    for tr in table.find_all("tr"):
-        tds = tr.find_all("td")
-        if len(tds) != 5:
-            continue
-
-        left_star  = tds[0].find("img")["src"]
-        right_star = tds[4].find("img")["src"]
-
-        # decide which side won
-        win_images = ("hoshi_shiro.gif", "hoshi_fusensho.gif")
-        if any(img in left_star  for img in win_images):
-            winner_td, loser_td = tds[1], tds[3]
-        elif any(img in right_star for img in win_images):
-            winner_td, loser_td = tds[3], tds[1]
-        else:
-            # no clear winner marker → skip
-            continue
-
-        # technique override for fusen‐wins/dropouts
-        if "fusen" in left_star or "fusen" in right_star:
-            technique = "fusen"
-        else:
-            tech_strings = list(tds[2].stripped_strings)
-            technique = next((s for s in tech_strings if s.isalpha()), "")
-
-        # helper to extract name + record and strip off the "(...)"
-        def extract_info(cell):
-            name = cell.find(
-                "a", href=lambda u: u and u.startswith("Rikishi.aspx")
-            ).get_text(strip=True)
-            raw_rec = cell.find(
-                "a", href=lambda u: u and "Rikishi_basho.aspx" in u
-            ).get_text(strip=True)
-            rec = re.sub(r'\s*\(.*?\)', '', raw_rec)
-            return name, rec
-
-        winner_name, winner_record = extract_info(winner_td)
-        loser_name,  loser_record  = extract_info(loser_td)
-
-        bouts.append({
-            "winner":        winner_name,
-            "winner_record": winner_record,
-            "loser":         loser_name,
-            "loser_record":  loser_record,
-            "technique":     technique
-        })
-
-
-    return bouts
+    return sumoparse.parse_results(get_page(results_url(year, month, day)))
 
 # return the rikishi's id or None if it does not exist
 def get_rikishi_id(db, name):
@@ -192,41 +197,70 @@ def add_if_missing_rikishi(db, basho_id, ring_name, rank, call_up=False):
     return rikishi_id
 
 
+# Return {ring_name: (rikishi_id, rank_no)} for every name, adding anyone not on the
+# basho's banzuke as a call up. Uses the same handful of queries whatever the number of names.
+def resolve_rikishi(db, basho_id, names, rank=44):
+    def load_banzuke_ranks(only=None):
+        sql = ("SELECT ring_name, rikishi.id AS rikishi_id, rank_no "
+               "  FROM banzuke "
+               "  JOIN rikishi ON banzuke.rikishi_id = rikishi.id "
+               "  JOIN ranks ON banzuke.rank_id = ranks.id "
+               " WHERE banzuke.basho_id = ?")
+        if only:
+            sql += f" AND ring_name IN ({','.join('?' for _ in only)})"
+            return db.execute(sql, basho_id, *only)
+        return db.execute(sql, basho_id)
+
+    # 1) the whole basho's banzuke in one query
+    resolved = {r["ring_name"]: (r["rikishi_id"], r["rank_no"]) for r in load_banzuke_ranks()}
+
+    missing = sorted(set(names) - resolved.keys())
+    if not missing:
+        return resolved
+
+    # 2) call ups: add to rikishi if new, then to the banzuke, in one transaction
+    ph = ",".join("?" for _ in missing)
+    db.execute("BEGIN")
+    try:
+        known = {r["ring_name"] for r in
+                 db.execute(f"SELECT ring_name FROM rikishi WHERE ring_name IN ({ph})", *missing)}
+        new = [name for name in missing if name not in known]
+        if new:
+            db.execute("INSERT INTO rikishi (ring_name) VALUES " + ",".join("(?)" for _ in new), *new)
+        db.execute(f"INSERT INTO banzuke (basho_id, rikishi_id, call_up, rank_id) "
+                   f"SELECT ?, id, 1, ? FROM rikishi WHERE ring_name IN ({ph})",
+                   basho_id, rank, *missing)
+        invalidate_banzuke_payload(db, basho_id)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+
+    resolved.update({r["ring_name"]: (r["rikishi_id"], r["rank_no"]) for r in load_banzuke_ranks(missing)})
+    return resolved
+
+
 # given JSON {winner: _, winner_record: _, loser: loser_, loser_record: _, tecnique: _}, add
 # the rank of each fighter. i.e., add winner_rank: _, looser_rank: _, winner_id: _, looser_id: _
 def amend_results(db, basho_id, bouts):
-    def get_rikishi_info(ring_name):
-        q = db.execute("""
-            SELECT rikishi.id AS rikishi_id, rank_no
-            FROM   banzuke
-            JOIN   rikishi ON banzuke.rikishi_id = rikishi.id
-            JOIN   ranks ON banzuke.rank_id = ranks.id
-            WHERE  ring_name = ? AND banzuke.basho_id = ? """,
-            ring_name, basho_id)
-        if not q:
-            # should not happen because called after add_if_missing
-            raise ValueError(f"Rikishi {ring_name} not found in banzuke for basho {basho_id}")
-        return q[0]['rikishi_id'], q[0]['rank_no']
+    names = {b['winner'] for b in bouts} | {b['loser'] for b in bouts}
+    resolved = resolve_rikishi(db, basho_id, names)
 
     for bout in bouts:
-        add_if_missing_rikishi(db, basho_id, bout['winner'], 44, True)
-        add_if_missing_rikishi(db, basho_id, bout['loser'], 44, True)
-
-        bout['winner_id'], bout['winner_rank'] = get_rikishi_info(bout['winner'])
-        bout['loser_id'],  bout['loser_rank']  = get_rikishi_info(bout['loser'])
+        bout['winner_id'], bout['winner_rank'] = resolved[bout['winner']]
+        bout['loser_id'],  bout['loser_rank']  = resolved[bout['loser']]
 
     return bouts
 
 
 # given {winner: _, winner_record: _, loser: loser_, loser_record: _, tecnique: _, winner_rank: _, looser_rank: _, winner_id: _, looser_id: _}
 # add win_points:_
-# This is the first time we care about a particular draft
-def calculate_points_fast(db, draft_id, bouts):
+# Points depend only on the basho, not on any draft, so they are computed once per day
+def calculate_points_fast(db, basho_id, tournament_day, bouts):
     """
     Input 'bouts' from amend_results(), which includes:
       winner_id, loser_id, winner_rank, loser_rank, technique
-    Output adds: win_points (int)
-    Only winners' points change; losers get 0 (as in your original).
+    Output adds: win_points (int), the winner's full points for the bout (see scoring.py)
     """
 
     # 1) Gather all winner_ids we might care about
@@ -237,47 +271,23 @@ def calculate_points_fast(db, draft_id, bouts):
             b["win_points"] = 0
         return bouts
 
-    # 2) Load current wins for all those rikishi in ONE query
+    # 2) Load wins before this day for all those rikishi in ONE query
     placeholders = ",".join("?" for _ in winner_ids)
     rows = db.execute(
-        f"SELECT rikishi_id, wins FROM draft_picks "
-        f"WHERE draft_id = ? AND rikishi_id IN ({placeholders})",
-        draft_id, *winner_ids
+        f"SELECT winner_id AS rikishi_id, COUNT(*) AS wins FROM bouts "
+        f"WHERE basho_id = ? AND tournament_day < ? AND winner_id IN ({placeholders}) "
+        f"GROUP BY winner_id",
+        basho_id, tournament_day, *winner_ids
     )
     wins_by_id = {r["rikishi_id"]: r["wins"] for r in rows}
 
-    def compute_kicker(winner_rank, loser_rank, technique, current_wins):
-        kicker = 0
-        # thresholds based on current_wins BEFORE this bout
-        if current_wins == 7:  # kachikoshi on this win
-            kicker += 2
-        elif current_wins == 9:  # 10th win on this win
-            kicker += 1
-
-        if technique != "fusen":
-            if winner_rank > 4:  # M ranks
-                if loser_rank == 4: kicker += 1   # beat Komusubi
-                elif loser_rank == 3: kicker += 2 # beat Sekiwake
-                elif loser_rank == 2: kicker += 3 # beat Ozeki
-                elif loser_rank == 1: kicker += 5 # beat Yokozuna
-            elif winner_rank == 4:  # K
-                if loser_rank == 3: kicker += 1
-                elif loser_rank == 2: kicker += 2
-                elif loser_rank == 1: kicker += 3
-            elif winner_rank == 3:  # S
-                if loser_rank == 2: kicker += 1
-                elif loser_rank == 1: kicker += 2
-            elif winner_rank == 2:  # O
-                if loser_rank == 1: kicker += 1
-
-        return kicker
-
-    # 3) Annotate bouts
-    for b in bouts:
-        cur_wins = wins_by_id.get(b["winner_id"], 0)
-        b["win_points"] = compute_kicker(
-            b["winner_rank"], b["loser_rank"], b["technique"], cur_wins
-        )
+    # 3) Annotate bouts, all of the day's bouts scored in one batch
+    points = scoring.win_points([b["winner_rank"] for b in bouts],
+                                [b["loser_rank"] for b in bouts],
+                                [b["technique"] == "fusen" for b in bouts],
+                                [wins_by_id.get(b["winner_id"], 0) for b in bouts])
+    for b, p in zip(bouts, points):
+        b["win_points"] = int(p)
 
     return bouts
 
@@ -285,183 +295,303 @@ def calculate_points_fast(db, draft_id, bouts):
 
 # given {winner: _, winner_record: _, loser: loser_, loser_record: _, tecnique: _,
 #        winner_rank: _, looser_rank: _,  winner_id: _, looser_id: _, win_points:_}
-# update the days_results table
-def update_results_fast(db, draft_id, tournament_day, bouts):
-    # 1) Limit to rikishi that were actually drafted in THIS draft
-    ids = {b["winner_id"] for b in bouts} | {b["loser_id"] for b in bouts}
-    if not ids:
+# store the day's bouts once for the basho, in one multi-row insert; every draft is scored from these rows
+def save_bouts(db, basho_id, tournament_day, bouts):
+    if not bouts:
         return
-    ph = ",".join("?" for _ in ids)
-    rows = db.execute(
-        f"SELECT rikishi_id FROM draft_picks WHERE draft_id = ? AND rikishi_id IN ({ph})",
-        draft_id, *ids
+
+    values = []
+    for bout_no, b in enumerate(bouts, start=1):
+        is_fusen = 1 if b["technique"] == "fusen" else 0
+        values += [basho_id, tournament_day, bout_no, b["winner_id"], b["loser_id"],
+                   b["winner_rank"], b["loser_rank"], b["technique"], is_fusen, b["win_points"]]
+
+    db.execute(
+        "INSERT OR IGNORE INTO bouts "
+        "  (basho_id, tournament_day, bout_no, winner_id, loser_id, "
+        "   winner_rank, loser_rank, technique, fusen, points) "
+        "VALUES " + ",".join("(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)" for _ in bouts),
+        *values
     )
-    valid = {r["rikishi_id"] for r in rows}
-    if not valid:
-        return
 
-    insert_sql = """
-        INSERT OR IGNORE INTO days_results
-          (draft_id, tournament_day, rikishi_id, oponent_id, win, loss, funsensho, points)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """
-
-    # 2) Apply winners
-    for b in bouts:
-        if b["winner_id"] in valid:
-            is_fusen = 1 if b["technique"] == "fusen" else 0
-            pts = b["win_points"] + 1
-            db.execute(
-                insert_sql,
-                draft_id, tournament_day, b["winner_id"], b["loser_id"],
-                1, 0, is_fusen, pts
-            )
-            # increment counters (safe even if INSERT was ignored once per unique constraint)
-            db.execute(
-                "UPDATE draft_picks SET wins = wins + 1, points = points + ? "
-                "WHERE draft_id = ? AND rikishi_id = ?",
-                pts, draft_id, b["winner_id"]
-            )
-
-    # 3) Apply losers
-    for b in bouts:
-        if b["loser_id"] in valid:
-            is_fusen = 1 if b["technique"] == "fusen" else 0
-            db.execute(
-                insert_sql,
-                draft_id, tournament_day, b["loser_id"], b["winner_id"],
-                0, 1, is_fusen, 0
-            )
-            db.execute(
-                "UPDATE draft_picks SET losses = losses + 1 "
-                "WHERE draft_id = ? AND rikishi_id = ?",
-                draft_id, b["loser_id"]
-            )
-
-
-
-def fetch_sansho_winners(db, draft_id, year: int, month: int):
-    """
-    Fetch Sanshō winners for a given basho (year, month) from sumodb.
+
+# Score a day's bouts for every draft on the basho still waiting for that day.
+# The days results themselves are the days_results view over bouts, so only the totals are
+# written, straight from bouts and draft_picks (standings.DAY_PICKS). The caller moves the
+# drafts past the day in the same transaction, so nothing is counted twice.
+def update_results_fast(db, basho_id, tournament_day):
+    # 1) One aggregate update of the picks' running totals, for all waiting drafts at once
+    db.execute(f"""
+        UPDATE draft_picks
+           SET wins   = draft_picks.wins + agg.wins,
+               losses = draft_picks.losses + agg.losses,
+               points = draft_picks.points + agg.points
+          FROM (SELECT draft_id, rikishi_id,
+                       SUM(win) AS wins, SUM(loss) AS losses, SUM(points) AS points
+                  FROM ({standings.DAY_PICKS})
+                 GROUP BY draft_id, rikishi_id) AS agg
+         WHERE agg.draft_id = draft_picks.draft_id
+           AND agg.rikishi_id = draft_picks.rikishi_id
+        """,
+        basho_id, tournament_day, tournament_day - 1,
+        basho_id, tournament_day, tournament_day - 1)
+
+    # 2) The same bouts added to the standings of each player
+    standings.add_day(db, basho_id, tournament_day)
+
+
+
+@instrument.parses
+def fetch_sansho_winners(db, basho_id, year: int, month: int):
+    """
+    Fetch Sanshō winners for a given basho (year, month) from sumodb and
+    award them to every draft on the basho that has not had its prizes yet.
     Returns a list of dicts: [{ "prize": ..., "ring_name": ... }, ...]
     """
-    url = "https://sumodb.sumogames.de/Sansho.aspx"
+    url = SANSHO_URL
     target = f"{year}.{month:02d}"
 
-    resp = requests.get(url)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    table = soup.find("table")
-    if not table:
-        raise RuntimeError("No table found on page")
-
-    rows = table.find_all("tr")
-    target_row = None
-    for row in rows[1:]:  # skip header
-        cells = row.find_all("td")
-        if not cells:
-            continue
-        if cells[0].text.strip() == target:
-            target_row = cells
-            break
+    results = sumoparse.parse_sansho(get_page(url), target)
+    if not results:
+        return results
 
-    if not target_row:
-        raise ValueError(f"No basho found for {target}")
-
-    prize_names = ["Gino‑sho", "Shukun‑sho", "Kanto‑sho"]
-    results = []
-
-    for idx, prize in enumerate(prize_names, start=1):
-        td = target_row[idx]
-        if not td or not td.text.strip() or "not awarded" in td.text.lower():
-            continue
+    db.execute("BEGIN")
+    try:
+        for prize in results:
+            id = get_rikishi_id(db, prize['ring_name'])
+            db.execute("UPDATE draft_picks "
+                       "   SET special_prizes = special_prizes + 1, "
+                       "       points = points + ? "
+                       " WHERE rikishi_id = ? AND draft_id IN "
+                       "       (SELECT id FROM drafts WHERE basho_id = ? AND prizes = 0)",
+                       scoring.SPECIAL_PRIZE_POINTS,
+                       id,
+                       basho_id)
+            standings.add(db, "SELECT dp.draft_id, dp.player_id, ?, 0, 0, 1, 0 "
+                              "  FROM draft_picks AS dp "
+                              "  JOIN drafts AS d ON d.id = dp.draft_id "
+                              " WHERE dp.rikishi_id = ? AND d.basho_id = ? AND d.prizes = 0",
+                          scoring.SPECIAL_PRIZE_POINTS, id, basho_id)
 
-        for a in td.find_all("a"):
-            full_text = a.text.strip()
-            # Strip rank prefix like "M14e Kusano"
-            parts = full_text.split()
-            ring_name = parts[-1] if len(parts) >= 2 else full_text
-            results.append({
-                "prize": prize,
-                "ring_name": ring_name
-            })
-
-    if results:
         # prizes have now been fetched
-        db.execute("UPDATE drafts SET prizes = 1 WHERE id = ?", draft_id)
-
-    for prize in results:
-        id = get_rikishi_id(db, prize['ring_name'])
-        db.execute("UPDATE draft_picks "
-                   "   SET special_prizes = special_prizes + 1, "
-                   "       points = points + 2 "
-                   " WHERE draft_id = ? AND rikishi_id = ?",
-                   draft_id,
-                   id)
+        db.execute("UPDATE drafts SET prizes = 1 WHERE basho_id = ? AND prizes = 0", basho_id)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
 
     return results
 
-def fetch_makuuchi_yusho_winner(db, draft_id, year: int, month: int):
-    basho_ym = f"{year}{month:02d}"
-    url = f"https://sumodb.sumogames.de/Results_text.aspx?b={basho_ym}"
-
-    resp = requests.get(url)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    pre = soup.find("pre")
-    if not pre:
-        raise RuntimeError("Could not find results text block")
+@instrument.parses
+def fetch_makuuchi_yusho_winner(db, basho_id, year: int, month: int):
+    url = results_text_url(year, month)
 
-    lines = pre.get_text().splitlines()
-
-    in_makuuchi = False
-    most_wins = -1
-    winner = None
-
-    for line in lines:
-        line = line.strip()
-        if line == "Makuuchi":
-            in_makuuchi = True
-            continue
-        elif in_makuuchi and re.match(r"^[A-Z][a-z]", line):  # e.g. "Juryo"
-            break
-        elif in_makuuchi:
-            parts = re.split(r"\s{2,}", line)
-            for i in [1, 4]:  # these are the ring name + record columns
-                if i < len(parts):
-                    part = parts[i]
-                    if "(" in part and ")" in part:
-                        try:
-                            ring_name = part.split(" (")[0]
-                            record = part.split("(")[1].split(")")[0]
-                            wins = int(record.split("-")[0])
-                            if wins > most_wins:
-                                most_wins = wins
-                                winner = ring_name
-                        except Exception:
-                            continue
+    winner = sumoparse.parse_yusho(get_page(url))
 
     if not winner:
         return {"winner": "None"}
 
     id = get_rikishi_id(db, winner)
-    db.execute("UPDATE draft_picks "
-               "   SET basho_winner = 1, "
-               "       points = points + 10 "
-               " WHERE draft_id = ? AND rikishi_id = ?",
-                   draft_id,
-                   id)
-    if winner:
+    db.execute("BEGIN")
+    try:
+        db.execute("UPDATE draft_picks "
+                   "   SET basho_winner = 1, "
+                   "       points = points + ? "
+                   " WHERE rikishi_id = ? AND draft_id IN "
+                   "       (SELECT id FROM drafts WHERE basho_id = ? AND winner = 0)",
+                   scoring.YUSHO_POINTS,
+                   id,
+                   basho_id)
+        standings.add(db, "SELECT dp.draft_id, dp.player_id, ?, 0, 0, 0, 1 "
+                          "  FROM draft_picks AS dp "
+                          "  JOIN drafts AS d ON d.id = dp.draft_id "
+                          " WHERE dp.rikishi_id = ? AND d.basho_id = ? AND d.winner = 0",
+                      scoring.YUSHO_POINTS, id, basho_id)
+
         # winner has been fetched
-        db.execute("UPDATE drafts SET winner = 1 WHERE id = ?", draft_id)
+        db.execute("UPDATE drafts SET winner = 1 WHERE basho_id = ? AND winner = 0", basho_id)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
 
     return {"winner": winner}
 
 
 
+# Schema added since the original tables in dbnotes.txt, applied at start up
+SCHEMA = [
+    # one row per real-world bout, shared by every draft on the basho
+    """CREATE TABLE IF NOT EXISTS bouts (
+        basho_id INTEGER NOT NULL,
+        tournament_day INTEGER NOT NULL,
+        bout_no INTEGER NOT NULL,
+        winner_id INTEGER NOT NULL,
+        loser_id INTEGER NOT NULL,
+        winner_rank INTEGER NOT NULL,
+        loser_rank INTEGER NOT NULL,
+        technique TEXT NOT NULL,
+        fusen INTEGER NOT NULL DEFAULT 0,
+        points INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (basho_id) REFERENCES basho(id),
+        FOREIGN KEY (winner_id) REFERENCES rikishi(id),
+        FOREIGN KEY (loser_id) REFERENCES rikishi(id)
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_bouts_basho_day_bout ON bouts(basho_id, tournament_day, bout_no)",
+    "CREATE INDEX IF NOT EXISTS idx_bouts_basho_winner ON bouts(basho_id, winner_id)",
+    # days results scored before bouts were stored, which bouts can't reproduce (see migrate_days_results)
+    """CREATE TABLE IF NOT EXISTS days_results_archive (
+        draft_id INTEGER NOT NULL,
+        tournament_day INTEGER NOT NULL,
+        rikishi_id INTEGER NOT NULL,
+        win INTEGER NOT NULL DEFAULT 0,
+        funsensho INTEGER NOT NULL DEFAULT 0,
+        loss INTEGER NOT NULL DEFAULT 0,
+        points INTEGER NOT NULL DEFAULT 0,
+        oponent_id INTEGER NOT NULL,
+        rank_no INTEGER NOT NULL DEFAULT 0,
+        opponent_rank_no INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (draft_id, tournament_day, rikishi_id),
+        FOREIGN KEY (draft_id) REFERENCES drafts(id)
+    ) WITHOUT ROWID""",
+    # rendered /banzuke json, shared by all workers; deleted whenever the basho's banzuke changes
+    """CREATE TABLE IF NOT EXISTS banzuke_payloads (
+        basho_id INTEGER PRIMARY KEY NOT NULL,
+        payload TEXT NOT NULL,
+        etag TEXT NOT NULL,
+        FOREIGN KEY (basho_id) REFERENCES basho(id)
+    )""",
+] + standings.SCHEMA + analytics.SCHEMA
+
+# days_results used to be a table with two rows per bout per draft. It is now this view:
+# each picked rikishi's bouts, from bouts, for the days the draft has scored, plus the
+# archived rows. A query by draft_id reads that basho's bouts for the days asked for
+# (ux_bouts_basho_day_bout) and keeps the drafted ones (idx_draft_picks_game_rikishi), so
+# scoring a day writes no rows per draft and storage grows with basho, not drafts.
+DAYS_RESULTS_VIEW = """
+    CREATE VIEW IF NOT EXISTS days_results AS
+    SELECT d.id AS draft_id, b.tournament_day, b.winner_id AS rikishi_id, 1 AS win, b.fusen AS funsensho,
+           0 AS loss, b.points, b.loser_id AS oponent_id, b.winner_rank AS rank_no,
+           b.loser_rank AS opponent_rank_no
+      FROM drafts AS d
+      JOIN draft_picks AS dp ON dp.draft_id = d.id
+      JOIN bouts AS b ON b.basho_id = d.basho_id AND b.winner_id = dp.rikishi_id
+     WHERE b.tournament_day <= d.last_days_results_loaded
+       AND NOT EXISTS (SELECT 1 FROM days_results_archive AS a
+                        WHERE a.draft_id = d.id AND a.tournament_day = b.tournament_day)
+    UNION ALL
+    SELECT d.id, b.tournament_day, b.loser_id, 0, b.fusen, 1, 0, b.winner_id, b.loser_rank, b.winner_rank
+      FROM drafts AS d
+      JOIN draft_picks AS dp ON dp.draft_id = d.id
+      JOIN bouts AS b ON b.basho_id = d.basho_id AND b.loser_id = dp.rikishi_id
+     WHERE b.tournament_day <= d.last_days_results_loaded
+       AND NOT EXISTS (SELECT 1 FROM days_results_archive AS a
+                        WHERE a.draft_id = d.id AND a.tournament_day = b.tournament_day)
+    UNION ALL
+    SELECT draft_id, tournament_day, rikishi_id, win, funsensho, loss, points, oponent_id,
+           rank_no, opponent_rank_no
+      FROM days_results_archive"""
+
+
+def init_db(db):
+    """
+    Create any tables or indexes missing from an existing database.
+    :param db: database connection
+    """
+
+    had_bouts = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bouts'")
+    had_standings = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'draft_standings'")
+    had_analytics = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_days'")
+
+    for sql in SCHEMA:
+        db.execute(sql)
+
+    if not had_bouts:
+        # basho.last_update_day now tracks the days stored in bouts, so start over
+        db.execute("UPDATE basho SET last_update_day = 0")
+
+    if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'days_results'"):
+        # both ranks are stored with each days_results row so reads don't join the banzuke twice
+        if add_column(db, "days_results", "rank_no", "INTEGER NOT NULL DEFAULT 0"):
+            add_column(db, "days_results", "opponent_rank_no", "INTEGER NOT NULL DEFAULT 0")
+            db.execute("""
+                UPDATE days_results
+                   SET rank_no = rw.rank_no,
+                       opponent_rank_no = ro.rank_no
+                  FROM drafts AS d
+                  JOIN banzuke AS bw ON bw.basho_id = d.basho_id
+                  JOIN ranks   AS rw ON rw.id = bw.rank_id
+                  JOIN banzuke AS bo ON bo.basho_id = d.basho_id
+                  JOIN ranks   AS ro ON ro.id = bo.rank_id
+                 WHERE d.id = days_results.draft_id
+                   AND bw.rikishi_id = days_results.rikishi_id
+                   AND bo.rikishi_id = days_results.oponent_id
+                """)
+        migrate_days_results(db)
+    db.execute(DAYS_RESULTS_VIEW)
+
+    # when a banzuke was last found unpublished on sumodb (unix time)
+    add_column(db, "basho", "banzuke_checked_at", "INTEGER NOT NULL DEFAULT 0")
+    # bumped whenever the basho's stored points are rescored, so cached days results are refetched
+    add_column(db, "basho", "results_version", "INTEGER NOT NULL DEFAULT 0")
+
+    if not had_standings:
+        # standings are maintained as results come in; fill them in for what is already scored
+        db.execute("BEGIN")
+        try:
+            for basho in db.execute("SELECT DISTINCT basho_id FROM drafts"):
+                standings.rebuild(db, basho["basho_id"])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    if not had_analytics:
+        # the analytics aggregates are kept up as bouts are stored; add up the ones already there
+        db.execute("BEGIN")
+        try:
+            analytics.rebuild(db)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def migrate_days_results(db):
+    """
+    Replace the days_results table with the view over bouts. Days the bouts table
+    doesn't have (scored before it existed) are kept in days_results_archive.
+    """
+
+    db.execute("BEGIN")
+    try:
+        db.execute("""
+            INSERT OR IGNORE INTO days_results_archive
+                (draft_id, tournament_day, rikishi_id, win, funsensho, loss, points, oponent_id,
+                 rank_no, opponent_rank_no)
+            SELECT dr.draft_id, dr.tournament_day, dr.rikishi_id, dr.win, dr.funsensho, dr.loss, dr.points,
+                   dr.oponent_id, dr.rank_no, dr.opponent_rank_no
+              FROM days_results AS dr
+              JOIN drafts AS d ON d.id = dr.draft_id
+             WHERE NOT EXISTS (SELECT 1 FROM bouts AS b
+                                WHERE b.basho_id = d.basho_id AND b.tournament_day = dr.tournament_day)
+            """)
+        db.execute("DROP TABLE days_results")
+        db.execute(DAYS_RESULTS_VIEW)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+
+
+def add_column(db, table, column, definition):
+    """Add column to table unless it is already there. Returns True if it was added."""
 
+    columns = {r["name"] for r in db.execute("SELECT name FROM pragma_table_info(?)", table)}
+    if column in columns:
+        return False
+    db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
 
 
 # Return number of rows impacted by sql, help stop loosing race conditions
@@ -472,59 +602,79 @@ def cas_update(db, sql, *params):
     return n
 
 
-def fetch_days_results(db, basho_id, user_id, day):
+def ingest_days_results(db, basho_id, day):
     """
-    Fetch the result for the day-th day of the basho (if not already fetched)
-    Update the days_results for the given user's drafts if not already done
+    Fetch the day-th day of the basho from sumodb once, resolve the rikishi and
+    store the bouts for the basho. Returns True if the day's bouts are stored.
     """
     if not (1 <= day <= 16):
-        return None
+        return False
 
-    game_details = db.execute("SELECT id as draft_id, last_days_results_loaded "
-                              "  FROM drafts "
-                              " WHERE user_id = ? AND basho_id = ? "
-                              " LIMIT 1",
-                              user_id,
-                              basho_id)
-
-    # Update basho.last_update_day if no one else has
-    cas_update(db, "UPDATE basho SET last_update_day = ? WHERE id = ? AND last_update_day = ?",
-              day,
-              basho_id,
-              day - 1)
-
-    basho_details = db.execute("SELECT start_year, start_month "
+    basho_details = db.execute("SELECT start_year, start_month, last_update_day "
                                "FROM basho "
                                "WHERE id = ?",
                                basho_id)
 
     year = basho_details[0]['start_year']
     month = basho_details[0]['start_month']
-    draft_id = game_details[0]['draft_id']
-    max_day = game_details[0]["last_days_results_loaded"]
+    last_update_day = basho_details[0]['last_update_day']
 
-    if max_day != day - 1:
-         return None
+    if last_update_day >= day:
+        return True
+    if last_update_day != day - 1:
+        return False
 
     results = fetch_basho_results(year, month, day)
+    # no bouts yet means the day hasn't happened; day 16 is empty unless there was a playoff
+    if not results and day != 16:
+        return False
+
     amended = amend_results(db, basho_id, results)
-    points = calculate_points_fast(db, draft_id, amended)
+    points = calculate_points_fast(db, basho_id, day, amended)
+
+    db.execute("BEGIN")
+    try:
+        save_bouts(db, basho_id, day, points)
+        # Update basho.last_update_day if no one else has
+        cas_update(db, "UPDATE basho SET last_update_day = ? WHERE id = ? AND last_update_day = ?",
+                   day,
+                   basho_id,
+                   day - 1)
+        analytics.add(db, basho_id)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+
+    return True
+
+
+def fetch_days_results(db, basho_id, day):
+    """
+    Make sure the day-th day of the basho has been ingested, then score it for
+    every draft on the basho that has not already loaded it.
+    Returns True if the day is available.
+    """
+    if not ingest_days_results(db, basho_id, day):
+        return False
 
     # ---- All writes IN ONE TRANSACTION ----
     db.execute("BEGIN")
     try:
-        update_results_fast(db, draft_id, day, points)        # see F)
-        # Mark the draft as having loaded this day; CAS to be safe if concurrent
+        update_results_fast(db, basho_id, day)
+        # Mark the drafts as having loaded this day; CAS to be safe if concurrent
         cas_update(
             db,
-            "UPDATE drafts SET last_days_results_loaded = ? WHERE id = ? AND last_days_results_loaded = ?",
-            day, draft_id, day - 1
+            "UPDATE drafts SET last_days_results_loaded = ? WHERE basho_id = ? AND last_days_results_loaded = ?",
+            day, basho_id, day - 1
         )
         db.execute("COMMIT")
     except Exception:
         db.execute("ROLLBACK")
         raise
 
+    return True
+
 
 def insert_player_data(db, name, user_name=None, user_id=None):
     """
@@ -566,63 +716,13 @@ def get_players(db, id):
 
 
 # Feth a banzuke for the year/month from sumodb
-def c_to_rank(c):
-    special_ranks = {'Y': 1, 'O': 2, 'S': 3, 'K': 4}
-    if c in special_ranks:
-        return special_ranks[c]
-    return int(c[1:]) + 4
-
-
+@instrument.parses
 def fetch_banzuke(year:int, month:int):
     """
     Fetch the Makuuchi banzuke for a given month/year from sumodb.sumogames.de
     and return JSON with each wrestler's name, rank, and East/West side.
     """
-    # build the YYYYMM parameter
-    basho_ym = f"{year}{int(month):02d}"
-    url = f"https://sumodb.sumogames.de/Banzuke.aspx?b={basho_ym}"
-    resp = requests.get(url)
-    resp.raise_for_status()
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-    # find the banzuke table whose caption says "Makuuchi Banzuke"
-    makuuchi_table = None
-    for tbl in soup.find_all("table", class_="banzuke"):
-        cap = tbl.find("caption")
-        if cap and "Makuuchi Banzuke" in cap.get_text():
-            makuuchi_table = tbl
-            break
-    if makuuchi_table is None:
-        #raise RuntimeError(f"Could not find Makuuchi banzuke for {basho_ym}")
-        return []
-
-    results = []
-    for tr in makuuchi_table.tbody.find_all("tr"):
-        # the rank cell in every row
-        rank_td = tr.find("td", class_="short_rank")
-        if not rank_td:
-            continue
-        rank = c_to_rank(rank_td.get_text(strip=True))
-
-        # grab *any* cell with a link to Rikishi.aspx (skips the record‑links,
-        # because those point to Rikishi_basho.aspx, not Rikishi.aspx)
-        rikishi_tds = [
-            td for td in tr.find_all("td")
-            if td.find("a", href=lambda u: u and u.startswith("Rikishi.aspx"))
-        ]
-
-        for td in rikishi_tds:
-            name = td.find("a", href=lambda u: u and u.startswith("Rikishi.aspx")).get_text(strip=True)
-            # East if it's to the left of the rank cell; otherwise West
-            side = "East" if tr.find_all("td").index(td) < tr.find_all("td").index(rank_td) else "West"
-            results.append({
-                "name": name,
-                "rank": rank,
-                "side": side
-            })
-
-    return results
-
+    return sumoparse.parse_banzuke(get_page(banzuke_url(year, int(month))))
 
 
 def persist_banzuke(db, basho_id, year:int, month:int) -> None:
@@ -637,6 +737,8 @@ def persist_banzuke(db, basho_id, year:int, month:int) -> None:
     try:
         banzuke = fetch_banzuke(year, month)
         if not banzuke:
+            # not published yet, remember when we looked so load_banzuke can wait before retrying
+            db.execute("UPDATE basho SET banzuke_checked_at = ? WHERE id = ?", int(time.time()), basho_id)
             return None
     except RuntimeError:
         raise RuntimeError("Failed to fetch banzuke data from sumodb.")
@@ -653,6 +755,7 @@ def persist_banzuke(db, basho_id, year:int, month:int) -> None:
         add_if_missing_rikishi(db, basho_id, ring_name, rank_id, False)
 
     db.execute("UPDATE basho SET banzuke_loaded = 1 WHERE id = ?", basho_id)
+    invalidate_banzuke_payload(db, basho_id)
 
 
 def get_basho_data(db, only_loaded=False):
@@ -675,47 +778,152 @@ def get_basho_data(db, only_loaded=False):
     return basho
 
 
-def load_banzuke(db):
+# How long to trust "banzuke not published yet" before asking sumodb again
+BANZUKE_RETRY_HOURS = 6
+
+
+def load_banzuke(db, retry_hours=BANZUKE_RETRY_HOURS):
     """
-    Fetch banzuke for all bashos that are  or have happened this  and not already loaded
+    Fetch banzuke for all bashos that are  or have happened this  and not already loaded,
+    skipping any found unpublished within the last retry_hours.
+    Run by the ingest command, never by a page.
     :param db: database connection
     """
 
+    retry_after = int(time.time()) - retry_hours * 60 * 60
     basho = get_basho_data(db, only_loaded = False)
     for b in basho:
+        if b['banzuke_checked_at'] > retry_after:
+            continue
         persist_banzuke(db, b['id'], b['start_year'], b['start_month'])
 
 
-def fetch_save_results(db, user_id, basho_id):
+def fetch_save_results(db, basho_id):
     """
     Get results for the given basho.
-    Store results in days_results table
+    Each day is fetched from sumodb once and stored in the bouts table, then
+    scored for every draft on the basho: the draft_picks totals and the standings
+    are updated, and the draft's days_results (a view over bouts) grow by the day.
+    All the pages needed are downloaded concurrently up front (sumodb.prefetch);
+    parsing and writing then go one day at a time, in order, as each page lands.
+    Returns True if the basho is under way and more results are expected.
     """
 
     today = date.today()
+    in_progress = False
 
-    bashos = db.execute("SELECT basho.id as basho_id, last_update_day, start_year, start_month, start_day, drafts.id as draft_id "
+    bashos = db.execute("SELECT basho.id as basho_id, start_year, start_month, start_day, last_update_day, "
+                        "       MIN(drafts.last_days_results_loaded) AS lowest_day, "
+                        "       SUM(drafts.prizes = 0) AS need_prizes, "
+                        "       SUM(drafts.winner = 0) AS need_winner "
                         "  FROM basho "
                         "  JOIN drafts ON basho.id = drafts.basho_id "
-                        " WHERE basho.id = ? AND last_update_day < 16 ",
+                        " WHERE basho.id = ? "
+                        " GROUP BY basho.id",
                         basho_id)
 
     for basho in bashos:
         start_day = basho['start_day']
         start_month = basho['start_month']
         start_year = basho['start_year']
-        last_update_day = basho['last_update_day']
 
-        target_date = date(today.year, start_month, start_day)
-        days_between = min(16, abs((target_date - today).days))
+        # days since the start, nothing to fetch before the basho begins
+        target_date = date(start_year, start_month, start_day)
+        days_between = max(0, min(16, (today - target_date).days))
+
+        # bouts are stored from the day after last_update_day whatever the drafts have scored
+        # (a basho scored before bouts existed has none), days already in bouts are scored
+        # from there and only the rest come from sumodb
+        first_day = min(basho['lowest_day'], basho['last_update_day']) + 1
+        urls = [results_url(start_year, start_month, i)
+                for i in range(basho['last_update_day'] + 1, days_between + 1)]
+        if days_between >= 15:
+            if basho['need_prizes']:
+                urls.append(SANSHO_URL)
+            if basho['need_winner']:
+                urls.append(results_text_url(start_year, start_month))
+        pages = prefetch(urls)
+
+        def wait_for(url):
+            if url in pages:
+                pages[url].result()
+
+        last_day = basho['lowest_day']
+        for i in range(first_day, days_between + 1):
+            wait_for(results_url(start_year, start_month, i))
+            if i <= last_day:
+                # every draft has scored it already
+                if not ingest_days_results(db, basho['basho_id'], i):
+                    break
+                continue
+            if not fetch_days_results(db, basho['basho_id'], i):
+                break
+            last_day = i
+
+        if last_day >= 15:
+            if basho['need_prizes']:
+                wait_for(SANSHO_URL)
+                fetch_sansho_winners(db, basho['basho_id'], start_year, start_month)
+            if basho['need_winner']:
+                wait_for(results_text_url(start_year, start_month))
+                fetch_makuuchi_yusho_winner(db, basho['basho_id'], start_year, start_month)
 
+        in_progress = in_progress or 0 < days_between and last_day < 16
 
-        for i in range(last_update_day, days_between + 1):
-            fetch_days_results(db, basho['basho_id'], user_id, i)
+    return in_progress
+
+
+def ingest_results(db):
+    """
+    Fetch and score the results of every loaded basho this year, so that pages
+    only ever read from the database.
+    Returns True if any basho is in progress.
+    :param db: database connection
+    """
+
+    in_progress = False
+    for basho in get_basho_data(db, only_loaded=True):
+        in_progress = fetch_save_results(db, basho['id']) or in_progress
+
+    return in_progress
+
+
+def get_days_results(db, draft_id, first_day, last_day):
+    """
+    Return the days results of a draft for days first_day..last_day as DayResults,
+    with the ring name and the banzuke rank of both rikishi, ordered by day.
+    days_results is a view: the day range of the basho's bouts (ux_bouts_basho_day_bout)
+    joined to the draft's picks, plus days_results_archive for days scored before bouts
+    existed, then a rikishi lookup per row. The ranks come from the bouts.
+    """
+
+    return [jsonapi.DayResult(*row) for row in db.tuples(f"""
+        SELECT {jsonapi.DAY_RESULT_COLUMNS}
+        FROM days_results AS dr
+        JOIN rikishi  AS r  ON dr.rikishi_id = r.id
+        WHERE dr.draft_id = ? AND dr.tournament_day BETWEEN ? AND ?
+        ORDER BY dr.tournament_day
+        """, draft_id, first_day, last_day)]
+
+
+def draft_results_state(db, draft_id, user_id):
+    """
+    What a draft's days results depend on, for their ETags: the days scored (loaded),
+    the basho's results_version and whether the basho is over. None for an unknown
+    draft or one that isn't the user's.
+    """
+
+    draft = db.execute("SELECT d.last_days_results_loaded AS loaded, b.results_version, b.start_year, b.start_month "
+                       "  FROM drafts AS d "
+                       "  JOIN basho AS b ON b.id = d.basho_id "
+                       " WHERE d.id = ? AND d.user_id = ?",
+                       draft_id, user_id)
+    if not draft:
+        return None
+    draft = draft[0]
+    draft["over"] = basho_is_over(draft["start_year"], draft["start_month"])
+    return draft
 
-            if i == 15:
-                fetch_sansho_winners(db, basho['draft_id'], start_year, start_month)
-                fetch_makuuchi_yusho_winner(db, basho['draft_id'], start_year, start_month)
 
 def get_basho_winner(db, basho_id):
     return db.execute("SELECT rikishi_id "
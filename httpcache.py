@@ -0,0 +1,84 @@
+import hashlib
+import os
+
+from flask import current_app, jsonify, request
+
+# HTTP cache policy, per kind of response (applied by apply_policy after every request):
+#
+#   fingerprinted static   /static/<file>?v=<hash of the file>, from static_url(): public for a year,
+#                          since a changed file gets a new url
+#   other static           revalidated against the file's ETag
+#   immutable json         private, max-age=IMMUTABLE_MAX_AGE plus a strong ETag: the banzuke and
+#                          scored days of a finished basho
+#   revalidated json       private, no-cache plus a strong ETag, so a repeat request is a 304
+#   everything else        no-store: pages built from the session and data that is still changing
+#
+# Views choose with immutable() and revalidated(); json_with_etag() answers If-None-Match
+# from an ETag the view can work out without building the payload.
+
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+IMMUTABLE_MAX_AGE = 24 * 60 * 60        # a recompute can still change a finished basho's points
+
+_fingerprints = {}      # filename -> (mtime, hash)
+
+
+def static_url(filename):
+    """Url of a file under static/ with a fingerprint of its contents, for templates."""
+    path = os.path.join(current_app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return f"{current_app.static_url_path}/{filename}"
+    cached = _fingerprints.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, "rb") as f:
+            cached = _fingerprints[filename] = (mtime, hashlib.sha1(f.read()).hexdigest()[:12])
+    return f"{current_app.static_url_path}/{filename}?v={cached[1]}"
+
+
+def immutable(response):
+    response.cache_control.private = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    return response
+
+
+def revalidated(response):
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def json_with_etag(etag, build, final=False):
+    """
+    json response of build() with a strong ETag, or a 304 without calling build()
+    when the request's If-None-Match already has it. final responses are immutable.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    return immutable(response) if final else revalidated(response)
+
+
+def apply_policy(response):
+    """Cache-Control for responses whose view didn't set one."""
+    if "Cache-Control" in response.headers and request.endpoint != "static":
+        return response
+
+    if request.endpoint == "static":
+        if request.args.get("v"):
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+            response.headers.pop("Expires", None)
+        else:
+            response.cache_control.no_cache = True
+    elif response.get_etag()[0]:
+        revalidated(response)
+    else:
+        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+        response.headers["Expires"] = 0
+        response.headers["Pragma"] = "no-cache"
+    return response
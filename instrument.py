@@ -0,0 +1,256 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+
+# Opt-in per-request instrumentation, enabled with HONBASHO_INSTRUMENT=1.
+#
+# Every db.execute, every download from sumodb and the html parsing in the helpers.py
+# fetch functions are timed. Per request that is sent back as a Server-Timing header
+# and written as one json log line ("honbasho.requests" logger); totals since start
+# are served at /_metrics in the Prometheus text format.
+
+SLOWEST = 3             # statements kept per request
+STATEMENT_LABELS = 50   # distinct statements exported on /_metrics
+
+log = logging.getLogger("honbasho.requests")
+
+
+def enabled():
+    return os.getenv("HONBASHO_INSTRUMENT", "0") == "1"
+
+
+class Stats:
+    """What one request (or one background run) spent its time on."""
+
+    __slots__ = ("queries", "sql_time", "slowest", "http", "http_bytes", "http_time", "parse_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest = []   # [(seconds, statement)], longest first
+        self.http = 0
+        self.http_bytes = 0
+        self.http_time = 0.0
+        self.parse_time = 0.0
+
+    def add_query(self, statement, seconds):
+        self.queries += 1
+        self.sql_time += seconds
+        if len(self.slowest) < SLOWEST or seconds > self.slowest[-1][0]:
+            self.slowest = sorted(self.slowest + [(seconds, statement)], reverse=True)[:SLOWEST]
+
+
+# totals since the process started, for /_metrics
+_lock = threading.Lock()
+_routes = {}       # route -> [requests, seconds, queries, sql seconds]
+_statements = {}   # normalized statement -> [calls, seconds]
+_totals = {"http": 0, "http_bytes": 0, "http_seconds": 0.0, "parse_seconds": 0.0}
+
+# sql and http time of the current thread, so parse time can leave them out
+_local = threading.local()
+
+
+def _current():
+    if has_request_context() and "instrument" in g:
+        return g.instrument
+    return None
+
+
+def _thread_time(name):
+    return getattr(_local, name, 0.0)
+
+
+def _add_thread_time(name, seconds):
+    setattr(_local, name, _thread_time(name) + seconds)
+
+
+def normalize(sql):
+    """Statement text with literals and placeholder lists folded, to group like statements."""
+    text = re.sub(r"\s+", " ", sql).strip()
+    text = re.sub(r"'(?:[^']|'')*'", "?", text)
+    text = re.sub(r"\b\d+\b", "?", text)
+    text = re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", text)
+    text = re.sub(r"\([^()]*\)(?:\s*,\s*\([^()]*\))+", "(...), ...", text)
+    return text[:200]
+
+
+class InstrumentedDatabase:
+    """Times every statement run through a Database; everything else is passed through."""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def execute(self, sql, *args):
+        return self._timed(self._db.execute, sql, args)
+
+    def tuples(self, sql, *args):
+        return self._timed(self._db.tuples, sql, args)
+
+    def _timed(self, run, sql, args):
+        start = time.perf_counter()
+        try:
+            return run(sql, *args)
+        finally:
+            seconds = time.perf_counter() - start
+            statement = normalize(sql)
+            _add_thread_time("sql", seconds)
+            stats = _current()
+            if stats is not None:
+                stats.add_query(statement, seconds)
+            with _lock:
+                totals = _statements.setdefault(statement, [0, 0.0])
+                totals[0] += 1
+                totals[1] += seconds
+
+
+def record_http(seconds, nbytes):
+    """Called by sumodb for every request that goes out to the network."""
+    if not enabled():
+        return
+    _add_thread_time("http", seconds)
+    stats = _current()
+    if stats is not None:
+        stats.http += 1
+        stats.http_bytes += nbytes
+        stats.http_time += seconds
+    with _lock:
+        _totals["http"] += 1
+        _totals["http_bytes"] += nbytes
+        _totals["http_seconds"] += seconds
+
+
+def parses(f):
+    """
+    Time a fetch-and-parse function; the sql and http time spent inside it is
+    left out, what remains is counted as parse time.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not enabled():
+            return f(*args, **kwargs)
+        sql, http = _thread_time("sql"), _thread_time("http")
+        start = time.perf_counter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            seconds = (time.perf_counter() - start
+                       - (_thread_time("sql") - sql) - (_thread_time("http") - http))
+            stats = _current()
+            if stats is not None:
+                stats.parse_time += seconds
+            with _lock:
+                _totals["parse_seconds"] += seconds
+
+    return decorated_function
+
+
+def _before_request():
+    g.instrument = Stats()
+    g.instrument_start = time.perf_counter()
+
+
+def _after_request(response):
+    stats = g.pop("instrument", None)
+    if stats is None:
+        return response
+    seconds = time.perf_counter() - g.pop("instrument_start")
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+
+    timings = [f'sql;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries"',
+               f'total;dur={seconds * 1000:.1f}']
+    if stats.http:
+        timings.insert(1, f'sumodb;dur={stats.http_time * 1000:.1f};desc="{stats.http} fetches"')
+    if stats.parse_time:
+        timings.insert(-1, f'parse;dur={stats.parse_time * 1000:.1f}')
+    response.headers["Server-Timing"] = ", ".join(timings)
+
+    log.info(json.dumps({
+        "method": request.method, "route": route, "path": request.path, "status": response.status_code,
+        "ms": round(seconds * 1000, 1),
+        "queries": stats.queries, "sql_ms": round(stats.sql_time * 1000, 1),
+        "slowest": [{"ms": round(s * 1000, 1), "sql": sql} for s, sql in stats.slowest],
+        "http": stats.http, "http_bytes": stats.http_bytes, "http_ms": round(stats.http_time * 1000, 1),
+        "parse_ms": round(stats.parse_time * 1000, 1),
+    }))
+
+    with _lock:
+        totals = _routes.setdefault((request.method, route), [0, 0.0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += stats.queries
+        totals[3] += stats.sql_time
+    return response
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def metrics():
+    """Totals since start in the Prometheus text exposition format."""
+    lines = []
+
+    def family(name, kind, help, samples):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+    with _lock:
+        routes = sorted(_routes.items())
+        statements = sorted(_statements.items(), key=lambda s: -s[1][1])[:STATEMENT_LABELS]
+        totals = dict(_totals)
+
+    by_route = [(f'method="{m}",route="{_label(r)}"', t) for (m, r), t in routes]
+    family("honbasho_requests_total", "counter", "Requests served.",
+           [(labels, t[0]) for labels, t in by_route])
+    family("honbasho_request_seconds_total", "counter", "Time spent serving requests.",
+           [(labels, f"{t[1]:.6f}") for labels, t in by_route])
+    family("honbasho_sql_queries_total", "counter", "SQL statements run by requests.",
+           [(labels, t[2]) for labels, t in by_route])
+    family("honbasho_sql_seconds_total", "counter", "Time requests spent in SQL.",
+           [(labels, f"{t[3]:.6f}") for labels, t in by_route])
+    family("honbasho_sql_statement_calls_total", "counter", "Calls of each statement, slowest first.",
+           [(f'statement="{_label(s)}"', t[0]) for s, t in statements])
+    family("honbasho_sql_statement_seconds_total", "counter", "Time spent in each statement.",
+           [(f'statement="{_label(s)}"', f"{t[1]:.6f}") for s, t in statements])
+    family("honbasho_sumodb_requests_total", "counter", "Pages downloaded from sumodb.",
+           [("", totals["http"])])
+    family("honbasho_sumodb_bytes_total", "counter", "Bytes downloaded from sumodb.",
+           [("", totals["http_bytes"])])
+    family("honbasho_sumodb_seconds_total", "counter", "Time spent downloading from sumodb.",
+           [("", f"{totals['http_seconds']:.6f}")])
+    family("honbasho_parse_seconds_total", "counter", "Time spent parsing sumodb pages.",
+           [("", f"{totals['parse_seconds']:.6f}")])
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app, db):
+    """
+    Hook the instrumentation into app and return db wrapped for it, or db
+    untouched when HONBASHO_INSTRUMENT is not set.
+    """
+    if not enabled():
+        return db
+
+    if not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(logging.INFO)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/_metrics", "metrics",
+                     lambda: Response(metrics(), mimetype="text/plain; version=0.0.4"))
+    return InstrumentedDatabase(db)
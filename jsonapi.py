@@ -0,0 +1,106 @@
+import msgspec
+from flask.json.provider import JSONProvider
+
+# JSON for the api routes, encoded with msgspec instead of the json module.
+#
+# MsgspecJSONProvider replaces Flask's provider app-wide, so jsonify, views that
+# return a dict or list, request.get_json and the templates' tojson all go through it.
+# It encodes straight to bytes and keeps keys in the order they were added, where
+# Flask's provider sorts them.
+#
+# The routes that return a row per bout or pick build the typed structs below from
+# db.tuples rows instead of dicts: a struct is built positionally, its keys are
+# encoded from the class rather than per row, and a field that goes missing
+# is an error here rather than a key the page quietly doesn't find. Their fields are
+# the keys the api has always returned.
+
+
+class Bout(msgspec.Struct, gc=False):
+    """A bout as parsed from a sumodb results page (/parse_sumodb_day, /basho_results)."""
+    winner: str
+    winner_record: str
+    loser: str
+    loser_record: str
+    technique: str
+
+
+class Pick(msgspec.Struct, gc=False):
+    """A draft pick with its player and the draft's basho (/picks)."""
+    draft_id: int
+    player_id: int
+    rikishi_id: int
+    ring_name: str
+    player_name: str
+    basho_id: int
+    start_year: int
+    start_month: int
+
+
+class DayResult(msgspec.Struct, gc=False):
+    """A picked rikishi's bout on one day of a draft (/days_results, /score_game, /live)."""
+    draft_id: int
+    tournament_day: int
+    rikishi_id: int
+    win: int
+    funsensho: int
+    loss: int
+    points: int
+    oponent_id: int
+    rank_no: int
+    opponent_rank_no: int
+    ring_name: str
+    winner_rank_no: int
+
+
+# DayResult's columns, in order, from days_results AS dr JOIN rikishi AS r
+DAY_RESULT_COLUMNS = ("dr.draft_id, dr.tournament_day, dr.rikishi_id, dr.win, dr.funsensho, dr.loss, "
+                      "dr.points, dr.oponent_id, dr.rank_no, dr.opponent_rank_no, r.ring_name, "
+                      "dr.rank_no AS winner_rank_no")
+
+
+class Side(msgspec.Struct, gc=False):
+    """One side of a banzuke slot; "--" for both when nobody holds it."""
+    name: str
+    id: int | str
+
+
+class BanzukeSlot(msgspec.Struct, gc=False):
+    """An east/west pair at one rank of the banzuke (/banzuke)."""
+    EAST: Side
+    rank_name: str
+    WEST: Side
+
+
+def _enc_hook(obj):
+    # what Flask's provider also took: Markup, and float subclasses such as numpy.float64
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    if isinstance(obj, float):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+_encoder = msgspec.json.Encoder(enc_hook=_enc_hook)
+
+
+def encode(obj):
+    """obj as JSON bytes."""
+    return _encoder.encode(obj)
+
+
+class MsgspecJSONProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return _encoder.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        try:
+            return msgspec.json.decode(s)
+        except msgspec.DecodeError as e:
+            # request.get_json turns a ValueError into a 400
+            raise ValueError(str(e)) from e
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(_encoder.encode(obj), mimetype=self.mimetype)
@@ -0,0 +1,199 @@
+import logging
+import queue
+import threading
+import time
+
+from flask import Response
+
+import jsonapi
+
+# Live scoreboard: Server-Sent Events pushed to /score_game while a basho is in progress.
+#
+# The ingest command runs in its own process, so a web process finds out about new
+# results by watching the database. One watcher thread per process checks
+# PRAGMA data_version (a counter sqlite bumps when another connection commits) and,
+# when it moved, reads the state of every draft someone is watching in one query.
+# Drafts that got a new day or their prizes are read once more, all together. Each
+# client keeps the state of the draft it was last sent, so one that connected later
+# only gets what it hasn't seen; clients at the same state share the encoded events.
+#
+# A stream holds a worker thread for as long as the page is open, so a user may only
+# have MAX_STREAMS_PER_USER of them at once; serve with more threads than that times
+# the users expected to watch at the same time.
+
+POLL_INTERVAL = 2.0     # seconds between data_version checks
+KEEPALIVE = 15.0        # seconds between comments sent on a quiet stream
+MAX_STREAMS_PER_USER = 4
+
+log = logging.getLogger(__name__)
+
+
+def _event(kind, data, id=None):
+    """One event in the text/event-stream format."""
+    lines = [f"event: {kind}"]
+    if id is not None:
+        lines.append(f"id: {id}")
+    lines.append("data: " + jsonapi.encode(data).decode())
+    return "\n".join(lines) + "\n\n"
+
+
+def _in(ids):
+    return ", ".join("?" * len(ids))
+
+
+def _new_winners(seen, now):
+    """Whether the prizes or the yusho have been awarded since seen, both (day, prizes, winner)."""
+    return now[1:] != seen[1:] and bool(now[1] or now[2])
+
+
+class Hub:
+    def __init__(self, db, interval=POLL_INTERVAL, max_streams=MAX_STREAMS_PER_USER):
+        self.db = db
+        self.interval = interval
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        # draft_id -> {queue.Queue: (last_days_results_loaded, prizes, winner) last sent to it}
+        self._clients = {}
+        self._streams = {}    # user_id -> streams open
+        self._thread = None
+
+    # ------------------ clients  ------------------ #
+    def subscribe(self, draft_id, state):
+        """Queue of encoded events for draft_id; state is the draft's row as the client last saw it."""
+        q = queue.Queue()
+        with self._lock:
+            self._clients.setdefault(draft_id, {})[q] = state
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-scoreboard", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, draft_id, q):
+        with self._lock:
+            clients = self._clients.get(draft_id, {})
+            clients.pop(q, None)
+            if not clients:
+                self._clients.pop(draft_id, None)
+
+    def stream(self, draft_id, state, user_id):
+        """
+        Response streaming the draft's events, starting with a status event that
+        tells the client how far the draft was scored when it connected. None if
+        the user already has max_streams open.
+        """
+        with self._lock:
+            if self._streams.get(user_id, 0) >= self.max_streams:
+                return None
+            self._streams[user_id] = self._streams.get(user_id, 0) + 1
+        q = self.subscribe(draft_id, state)
+
+        def events():
+            yield "retry: 5000\n\n"
+            yield _event("status", {"last_update_day": state[0], "winners": bool(state[1] or state[2])},
+                         id=state[0])
+            while True:
+                try:
+                    yield q.get(timeout=KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+
+        closed = []
+
+        def close():
+            # also called when the client goes away before the first event, unlike a finally in events()
+            with self._lock:
+                if closed:
+                    return
+                closed.append(True)
+                self._streams[user_id] -= 1
+                if not self._streams[user_id]:
+                    del self._streams[user_id]
+            self.unsubscribe(draft_id, q)
+
+        response = Response(events(), mimetype="text/event-stream",
+                            headers={"X-Accel-Buffering": "no"})
+        response.call_on_close(close)
+        return response
+
+    # ------------------ watcher  ------------------ #
+    def _run(self):
+        version = None
+        while True:
+            time.sleep(self.interval)
+            try:
+                current = self.db.tuples("PRAGMA data_version")[0][0]
+                if current != version:
+                    version = current
+                    self.poll()
+            except Exception:
+                log.exception("live scoreboard poll failed")
+
+    def poll(self):
+        """Read what changed for the watched drafts and queue each client the events it hasn't seen."""
+        with self._lock:
+            watched = {draft_id: dict(clients) for draft_id, clients in self._clients.items()}
+        if not watched:
+            return
+
+        ids = list(watched)
+        current = {draft_id: (day, prizes, winner) for draft_id, day, prizes, winner in self.db.tuples(
+            f"SELECT id, last_days_results_loaded, prizes, winner FROM drafts WHERE id IN ({_in(ids)})", *ids)}
+
+        # clients that were sent the same state get the same events
+        batches = {}        # (draft_id, state sent) -> [queue.Queue, ...]
+        for draft_id, clients in watched.items():
+            now = current.get(draft_id)
+            for q, seen in clients.items():
+                if now is not None and (now[0] > seen[0] or _new_winners(seen, now)):
+                    batches.setdefault((draft_id, seen), []).append(q)
+        if not batches:
+            return
+
+        first_days = {}     # draft_id -> first day a client hasn't seen
+        for draft_id, seen in batches:
+            if current[draft_id][0] > seen[0]:
+                first_days[draft_id] = min(first_days.get(draft_id, seen[0] + 1), seen[0] + 1)
+        by_day = {}
+        if first_days:
+            for row in self.db.tuples(f"""
+                    SELECT {jsonapi.DAY_RESULT_COLUMNS}
+                      FROM days_results AS dr
+                      JOIN rikishi AS r ON dr.rikishi_id = r.id
+                     WHERE dr.draft_id IN ({_in(first_days)}) AND dr.tournament_day >= ?
+                     ORDER BY dr.tournament_day""", *first_days, min(first_days.values())):
+                row = jsonapi.DayResult(*row)
+                by_day.setdefault((row.draft_id, row.tournament_day), []).append(row)
+
+        changed = list({draft_id for draft_id, _ in batches})
+        totals = {}
+        for draft_id, player_id, rikishi_id, wins, losses, points, prizes, winner in self.db.tuples(
+                f"SELECT draft_id, player_id, rikishi_id, wins, losses, points, special_prizes, basho_winner "
+                f"  FROM draft_picks WHERE draft_id IN ({_in(changed)})", *changed):
+            totals.setdefault(draft_id, []).append(
+                {"player_id": player_id, "rikishi_id": rikishi_id, "wins": wins, "losses": losses,
+                 "points": points, "special_prizes": prizes, "basho_winner": winner})
+
+        batched = {}
+        for (draft_id, seen), queues in batches.items():
+            now = current[draft_id]
+            queued = [("day", {"day": day, "results": by_day.get((draft_id, day), [])}, day)
+                      for day in range(seen[0] + 1, now[0] + 1)]
+            if _new_winners(seen, now):
+                queued.append(("winners", {}, None))
+            # the totals go out with the last event of the batch, once the days are painted
+            kind, data, id = queued[-1]
+            queued[-1] = (kind, dict(data, totals=totals.get(draft_id, [])), id)
+            batched[(draft_id, seen)] = [_event(*e) for e in queued]
+
+        with self._lock:
+            for draft_id, clients in watched.items():
+                now = current.get(draft_id)
+                subscribed = self._clients.get(draft_id, {})
+                for q, seen in clients.items():
+                    # skip a client that has gone, or that connected with a newer state since
+                    if now is None or subscribed.get(q) != seen:
+                        continue
+                    for e in batched.get((draft_id, seen), []):
+                        q.put(e)
+                    subscribed[q] = now
+
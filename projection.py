@@ -0,0 +1,216 @@
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+import scoring
+
+# Projected final standings of a draft: the rest of the basho is simulated SIMS times
+# at once with NumPy and scored with the real rules (scoring.win_points, sansho, yusho).
+#
+# Every simulated day pairs all of makuuchi off at once: each rikishi's banzuke position
+# is jittered and neighbours in the jittered order fight, so most bouts are between
+# nearby ranks, as in a real torikumi (drawn from a bank of PAIRINGS such torikumi). The higher rank wins with a logistic probability
+# of the rank gap, its slope fitted to every stored bout. After day 15 the best records
+# from sekiwake down take the special prizes and the best record the yusho (ties are
+# a playoff, won at random), unless sumodb already awarded them.
+
+SIMS = 10000
+MAX_SIMS = 50000
+PAIRING_SPREAD = 4.0        # jitter of banzuke positions, in positions
+PAIRINGS = 1024             # torikumi drawn per simulation run
+SANSHO_PRIZES = 3           # special prizes per basho
+SANSHO_MIN_WINS = 10
+DEFAULT_SLOPE = 0.06        # before there are enough bouts to fit it
+MIN_FIT_BOUTS = 500
+LAST_DAY = 15
+
+CACHE_SIZE = 256
+_cache = OrderedDict()      # (draft_id, day, prizes, winner, sims) -> projection
+
+
+def fit_slope(winner_rank, loser_rank, slopes=np.linspace(0.0, 0.3, 61)):
+    """
+    Maximum likelihood slope k of P(win) = 1 / (1 + exp(-k * (opponent rank_no - own rank_no)))
+    over the given bouts, on a grid of slopes.
+    """
+    gap = np.asarray(loser_rank, dtype=np.float64) - np.asarray(winner_rank, dtype=np.float64)
+    if len(gap) < MIN_FIT_BOUTS:
+        return DEFAULT_SLOPE
+    gaps, counts = np.unique(gap, return_counts=True)
+    # -log sigmoid(k * gap) for every slope and gap, weighted by how often the gap occurred
+    nll = (np.logaddexp(0.0, -np.outer(slopes, gaps)) * counts).sum(axis=1)
+    return float(slopes[np.argmin(nll)])
+
+
+def simulate(rank_no, wins, days_left, slope, sims=SIMS, rng=None, prizes=True, yusho=True):
+    """
+    Simulate the last days_left days of a basho sims times.
+    rank_no and wins are the banzuke rank and current wins of each makuuchi rikishi.
+    Returns a (sims, rikishi) array of the points each rikishi scores from here on.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    rank_no = np.asarray(rank_no, dtype=np.int64)
+    n = len(rank_no)
+    wins = np.broadcast_to(np.asarray(wins, dtype=np.int16), (sims, n)).copy()
+    points = np.zeros((sims, n), dtype=np.int16)
+
+    # a bank of torikumi with the east side's win probability of every bout, and for
+    # either side winning (west, east interleaved) the winner and their points before
+    # the milestone bonus, so a simulated day is a handful of flat lookups
+    east, west = pairings(rank_no, PAIRINGS, rng)
+    bouts = east.shape[1]
+    p_east = (1.0 / (1.0 + np.exp(slope * (rank_no[east] - rank_no[west])))).astype(np.float32)
+    east_class, west_class = scoring.rank_class(rank_no[east]), scoring.rank_class(rank_no[west])
+    winner_of = np.stack([west, east], axis=-1).ravel()
+    points_of = scoring.WIN_POINTS + np.stack([scoring.RANK_BONUS[west_class, east_class],
+                                               scoring.RANK_BONUS[east_class, west_class]], axis=-1).ravel()
+    points_of = points_of.astype(np.int16)
+    milestone = scoring.MILESTONE_BONUS.astype(np.int16)
+
+    flat_wins, flat_points = wins.reshape(-1), points.reshape(-1)
+    row_start = (np.arange(sims) * n)[:, None]
+    side_start = 2 * np.arange(bouts)
+    for _ in range(days_left):
+        day = rng.integers(0, PAIRINGS, sims)
+        east_wins = rng.random((sims, bouts), dtype=np.float32) < p_east[day]
+        outcome = (day * 2 * bouts)[:, None] + side_start + east_wins
+        winner = row_start + winner_of[outcome]
+        before = flat_wins[winner]
+        flat_points[winner] += points_of[outcome] + milestone[before]
+        flat_wins[winner] = before + 1
+
+    rows = np.arange(sims)[:, None]
+    # a random fraction below 1 breaks ties between equal records
+    tiebreak = wins + rng.random((sims, n), dtype=np.float32)
+    if prizes:
+        eligible = (rank_no >= scoring.SEKIWAKE) & (wins >= SANSHO_MIN_WINS)
+        ranked = np.argsort(-np.where(eligible, tiebreak, -1.0), axis=1)[:, :SANSHO_PRIZES]
+        points[rows, ranked] += np.where(eligible[rows, ranked], scoring.SPECIAL_PRIZE_POINTS, 0).astype(np.int16)
+    if yusho:
+        points[np.arange(sims), np.argmax(tiebreak, axis=1)] += scoring.YUSHO_POINTS
+    return points
+
+
+def pairings(rank_no, count, rng):
+    """
+    count random torikumi of the rikishi: each one's banzuke position is jittered
+    and neighbours in the jittered order fight. Returns (east, west), each a
+    (count, bouts) array of indexes into rank_no.
+    """
+    n = len(rank_no)
+    position = np.argsort(np.argsort(rank_no, kind="stable"))
+    order = np.argsort(position + rng.standard_normal((count, n)) * PAIRING_SPREAD, axis=1)
+    paired = n - n % 2
+    return order[:, 0:paired:2], order[:, 1:paired:2]
+
+
+def standings(future, pick_index, pick_player, current):
+    """
+    Per player, from the simulated future points of each rikishi: expected final
+    points, 10th and 90th percentile, and the probability of finishing first
+    (a shared first place counts as a fraction).
+    pick_index is each pick's column in future (-1 for a rikishi not simulated),
+    pick_player its player's index, current the players' points so far.
+    """
+    n_players = len(current)
+    pick_index = np.asarray(pick_index, dtype=np.int64)
+    owner = np.zeros((len(pick_index), n_players))
+    owner[np.arange(len(pick_index)), pick_player] = 1.0
+    owner[pick_index < 0] = 0.0
+
+    totals = future[:, np.maximum(pick_index, 0)] @ owner + np.asarray(current, dtype=np.float64)
+    first = totals == totals.max(axis=1, keepdims=True)
+    win_probability = (first / first.sum(axis=1, keepdims=True)).mean(axis=0)
+    p10, p90 = np.percentile(totals, [10, 90], axis=0)
+    return totals.mean(axis=0), p10, p90, win_probability
+
+
+def project(db, draft_id, sims=SIMS):
+    """
+    Projected final standings of a draft, cached per draft, scored day and results_version:
+    {draft_id, day, sims, players: [{player_id, name, points, expected_points, p10, p90, win_probability}]}
+    or None if there is no such draft or its banzuke is not loaded.
+    """
+    draft = db.execute("SELECT d.basho_id, d.last_days_results_loaded AS day, d.prizes, d.winner, b.results_version "
+                       "  FROM drafts AS d "
+                       "  JOIN basho AS b ON b.id = d.basho_id "
+                       " WHERE d.id = ?", draft_id)
+    if not draft:
+        return None
+    draft = draft[0]
+    sims = max(1, min(sims, MAX_SIMS))
+    # a recompute bumps results_version, rescoring the bouts the projection starts from
+    key = (draft_id, draft["day"], draft["prizes"], draft["winner"], draft["results_version"], sims)
+    cached = _cache.get(key)
+    if cached is not None:
+        _cache.move_to_end(key)
+        return cached
+
+    banzuke = db.tuples("SELECT banzuke.rikishi_id, ranks.rank_no "
+                        "  FROM banzuke "
+                        "  JOIN ranks ON ranks.id = banzuke.rank_id "
+                        " WHERE banzuke.basho_id = ? AND banzuke.call_up = 0 "
+                        " ORDER BY banzuke.rikishi_id",
+                        draft["basho_id"])
+    if not banzuke:
+        return None
+    rikishi = np.array([r[0] for r in banzuke], dtype=np.int64)
+    rank_no = np.array([r[1] for r in banzuke], dtype=np.int64)
+
+    bouts = scoring.load_bouts(db, draft["basho_id"])
+    done = bouts["tournament_day"] <= draft["day"]
+    winners = bouts["winner_id"][done]
+    known = np.isin(winners, rikishi)
+    wins = np.bincount(np.searchsorted(rikishi, winners[known]), minlength=len(rikishi))
+
+    picks = db.execute("SELECT dp.player_id, p.name, dp.rikishi_id, dp.points "
+                       "  FROM draft_picks AS dp "
+                       "  JOIN players AS p ON p.id = dp.player_id "
+                       " WHERE dp.draft_id = ? "
+                       " ORDER BY p.name, dp.player_id",
+                       draft_id)
+    players = list(dict.fromkeys((p["player_id"], p["name"]) for p in picks))
+    player_index = {player_id: i for i, (player_id, _) in enumerate(players)}
+    current = np.zeros(len(players), dtype=np.int64)
+    for p in picks:
+        current[player_index[p["player_id"]]] += p["points"]
+    # picks that are not on the makuuchi banzuke (call ups) score nothing more
+    pick_rikishi = np.array([p["rikishi_id"] for p in picks], dtype=np.int64)
+    column = np.minimum(np.searchsorted(rikishi, pick_rikishi), len(rikishi) - 1)
+    pick_index = np.where(rikishi[column] == pick_rikishi, column, -1)
+
+    rng = np.random.default_rng(zlib.crc32(f"{draft_id}:{draft['day']}".encode()))
+    future = simulate(rank_no, wins, max(0, LAST_DAY - draft["day"]), fitted_slope(db), sims, rng,
+                      prizes=not draft["prizes"], yusho=not draft["winner"])
+    expected, p10, p90, win_probability = standings(
+        future, pick_index, [player_index[p["player_id"]] for p in picks], current)
+
+    projection = {
+        "draft_id": draft_id, "day": draft["day"], "sims": sims,
+        "players": sorted(({"player_id": player_id, "name": name, "points": int(current[i]),
+                            "expected_points": round(float(expected[i]), 1),
+                            "p10": float(p10[i]), "p90": float(p90[i]),
+                            "win_probability": round(float(win_probability[i]), 4)}
+                           for i, (player_id, name) in enumerate(players)),
+                          key=lambda p: -p["expected_points"]),
+    }
+    _cache[key] = projection
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return projection
+
+
+_slopes = {}
+
+
+def fitted_slope(db):
+    """The win probability slope fitted to the stored bouts, refitted when bouts are stored or recomputed."""
+    # MAX(rowid) is read from the end of the table's b-tree, where COUNT(*) would scan every bout
+    version = db.tuples("SELECT (SELECT MAX(rowid) FROM bouts), (SELECT SUM(results_version) FROM basho)")[0]
+    if version not in _slopes:
+        rows = np.array(db.tuples("SELECT winner_rank, loser_rank FROM bouts WHERE fusen = 0"),
+                        dtype=np.int64).reshape(-1, 2)
+        _slopes.clear()
+        _slopes[version] = fit_slope(rows[:, 0], rows[:, 1])
+    return _slopes[version]
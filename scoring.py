@@ -0,0 +1,170 @@
+import numpy as np
+
+import standings
+
+# The scoring rules (see "Scoring System" in README.md) as lookup tables, and a
+# batched scorer that works on whole arrays of bouts instead of one bout at a time.
+
+# Rank classes by banzuke rank_no: 1-4 are san'yaku, every Maegashira (5+) is one class
+YOKOZUNA, OZEKI, SEKIWAKE, KOMUSUBI, MAEGASHIRA = 1, 2, 3, 4, 5
+
+WIN_POINTS = 1
+SPECIAL_PRIZE_POINTS = 2
+YUSHO_POINTS = 10
+
+# RANK_BONUS[winner class, loser class]: beating a higher san'yaku rank
+RANK_BONUS = np.zeros((MAEGASHIRA + 1, MAEGASHIRA + 1), dtype=np.int64)
+RANK_BONUS[MAEGASHIRA, [KOMUSUBI, SEKIWAKE, OZEKI, YOKOZUNA]] = [1, 2, 3, 5]
+RANK_BONUS[KOMUSUBI, [SEKIWAKE, OZEKI, YOKOZUNA]] = [1, 2, 3]
+RANK_BONUS[SEKIWAKE, [OZEKI, YOKOZUNA]] = [1, 2]
+RANK_BONUS[OZEKI, YOKOZUNA] = 1
+
+# MILESTONE_BONUS[wins before the bout]: the 8th win (kachikoshi) and the 10th win
+DAYS = 16
+MILESTONE_BONUS = np.zeros(DAYS + 1, dtype=np.int64)
+MILESTONE_BONUS[7] = 2
+MILESTONE_BONUS[9] = 1
+
+# rows are written back in chunks to stay well under SQLite's bound parameter limit
+CHUNK = 500
+
+
+def rank_class(rank_no):
+    return np.minimum(np.asarray(rank_no, dtype=np.int64), MAEGASHIRA)
+
+
+def win_points(winner_rank, loser_rank, fusen, prior_wins):
+    """
+    Points the winner of each bout earns. All arguments are equal length arrays.
+    No rank bonus for a fusen (default) win.
+    """
+    bonus = RANK_BONUS[rank_class(winner_rank), rank_class(loser_rank)]
+    bonus = np.where(np.asarray(fusen, dtype=bool), 0, bonus)
+    milestone = MILESTONE_BONUS[np.minimum(np.asarray(prior_wins, dtype=np.int64), DAYS)]
+    return WIN_POINTS + bonus + milestone
+
+
+def prior_wins(winner_ids, days):
+    """
+    For each bout, the wins its winner had on earlier days in the same bouts.
+    Two wins on one day (a playoff) both see the same earlier count.
+    """
+    winner_ids = np.asarray(winner_ids, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    n = len(winner_ids)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    order = np.lexsort((days, winner_ids))
+    w, d = winner_ids[order], days[order]
+    idx = np.arange(n)
+
+    new_winner = np.r_[True, w[1:] != w[:-1]]
+    new_day = new_winner | np.r_[True, d[1:] != d[:-1]]
+    winner_start = np.maximum.accumulate(np.where(new_winner, idx, 0))
+    day_start = np.maximum.accumulate(np.where(new_day, idx, 0))
+
+    out = np.empty(n, dtype=np.int64)
+    out[order] = day_start - winner_start
+    return out
+
+
+def load_bouts(db, basho_id):
+    """The basho's bouts as a dict of column arrays, in day and bout order."""
+    columns = ("tournament_day", "bout_no", "winner_id", "loser_id", "winner_rank", "loser_rank", "fusen")
+    rows = db.tuples(f"SELECT {', '.join(columns)} FROM bouts "
+                     " WHERE basho_id = ? "
+                     " ORDER BY tournament_day, bout_no",
+                     basho_id)
+    table = np.array(rows, dtype=np.int64).reshape(-1, len(columns))
+    return {c: table[:, i] for i, c in enumerate(columns)}
+
+
+def score_basho(bouts):
+    """Winner's points for every bout of a basho, from load_bouts()."""
+    return win_points(bouts["winner_rank"], bouts["loser_rank"], bouts["fusen"],
+                      prior_wins(bouts["winner_id"], bouts["tournament_day"]))
+
+
+def pick_totals(bouts, points, pick_rikishi, pick_days):
+    """
+    Wins, losses and bout points of every pick in one pass: cumulative per-rikishi,
+    per-day tables are built from the bouts, then each pick reads the row of its
+    rikishi at the last day its draft has loaded.
+    """
+    pick_rikishi = np.asarray(pick_rikishi, dtype=np.int64)
+    ids = np.unique(np.concatenate([bouts["winner_id"], bouts["loser_id"], pick_rikishi]))
+    winner = np.searchsorted(ids, bouts["winner_id"])
+    loser = np.searchsorted(ids, bouts["loser_id"])
+    day = bouts["tournament_day"]
+
+    shape = (len(ids), DAYS + 1)
+    wins, losses, pts = np.zeros(shape, np.int64), np.zeros(shape, np.int64), np.zeros(shape, np.int64)
+    np.add.at(wins, (winner, day), 1)
+    np.add.at(losses, (loser, day), 1)
+    np.add.at(pts, (winner, day), points)
+
+    row = np.searchsorted(ids, pick_rikishi)
+    col = np.clip(np.asarray(pick_days, dtype=np.int64), 0, DAYS)
+    return (np.cumsum(wins, axis=1)[row, col],
+            np.cumsum(losses, axis=1)[row, col],
+            np.cumsum(pts, axis=1)[row, col])
+
+
+def _update_from_values(db, sql, rows, *params):
+    """Run an UPDATE ... FROM (VALUES ...) AS v for rows, CHUNK rows at a time."""
+    if not rows:
+        return
+    width = len(rows[0])
+    tuple_ph = "(" + ", ".join("?" for _ in range(width)) + ")"
+    for i in range(0, len(rows), CHUNK):
+        chunk = rows[i:i + CHUNK]
+        values = ", ".join(tuple_ph for _ in chunk)
+        db.execute(sql.format(values=values), *[v for r in chunk for v in r], *params)
+
+
+def recompute(db, basho_id):
+    """
+    Rebuild the points of every bout of the basho, the wins, losses and points
+    of every draft pick on it, and its standings, from the raw bouts. Use after
+    a rule change or a corrected bout. Returns the number of draft picks rewritten.
+    """
+    bouts = load_bouts(db, basho_id)
+    points = score_basho(bouts)
+
+    picks = db.execute("SELECT draft_picks.rowid AS pick, rikishi_id, special_prizes, basho_winner, "
+                       "       last_days_results_loaded AS loaded "
+                       "  FROM draft_picks "
+                       "  JOIN drafts ON drafts.id = draft_picks.draft_id "
+                       " WHERE drafts.basho_id = ?",
+                       basho_id)
+    wins, losses, pts = pick_totals(bouts, points,
+                                    [p["rikishi_id"] for p in picks], [p["loaded"] for p in picks])
+
+    db.execute("BEGIN")
+    try:
+        _update_from_values(db, """
+            UPDATE bouts SET points = v.column3
+              FROM (VALUES {values}) AS v
+             WHERE bouts.tournament_day = v.column1 AND bouts.bout_no = v.column2
+               AND bouts.basho_id = ?""",
+            [(int(d), int(n), int(p)) for d, n, p in zip(bouts["tournament_day"], bouts["bout_no"], points)],
+            basho_id)
+
+        _update_from_values(db, """
+            UPDATE draft_picks
+               SET wins = v.column2, losses = v.column3, points = v.column4
+              FROM (VALUES {values}) AS v
+             WHERE draft_picks.rowid = v.column1""",
+            [(p["pick"], int(w), int(l),
+              int(t) + p["special_prizes"] * SPECIAL_PRIZE_POINTS + p["basho_winner"] * YUSHO_POINTS)
+             for p, w, l, t in zip(picks, wins, losses, pts)])
+
+        standings.rebuild(db, basho_id)
+        db.execute("UPDATE basho SET results_version = results_version + 1 WHERE id = ?", basho_id)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+
+    return len(picks)
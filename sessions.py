@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask_session.base import ServerSideSessionInterface
+
+# Server-side sessions in a SQLite table, in place of Flask-Session's filesystem store.
+#
+# Sessions live in their own database file (HONBASHO_SESSION_DB, WAL like the main one)
+# so logins never wait on the ingest job's write lock. Each process keeps the sessions
+# it has read or written in an LRU cache in front of the table, shared by its threads.
+#
+# Every write or delete of a session bumps the one row in sessions_generation, in the
+# same transaction, so whoever sees the new generation reads the new row. A process
+# knows the generation its cache is at and reads the row again before serving a
+# signed-in session from the cache (one lookup by primary key, in place of reading and
+# decoding the session), and at most every CHECK_INTERVAL seconds otherwise: when
+# another worker has written in the meantime (logging someone in or out, changing a
+# password), the cache is dropped and sessions are read again. A logout is therefore
+# seen by every worker on the next request. Its own writes go straight into the cache,
+# and only drop it when the generation they get back shows someone else wrote in between.
+#
+# An unmodified session is only written back when its stored expiry has fallen
+# REFRESH_AFTER behind, not on every request. Expired rows are deleted in batches
+# of SWEEP_BATCH, using the expiry index, at most every SWEEP_INTERVAL seconds
+# (and by `flask session_cleanup`).
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY NOT NULL,
+        data BLOB NOT NULL,
+        expiry INTEGER NOT NULL
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_expiry ON sessions(expiry)",
+    """CREATE TABLE IF NOT EXISTS sessions_generation (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        generation INTEGER NOT NULL
+    )""",
+    "INSERT OR IGNORE INTO sessions_generation (id, generation) VALUES (0, 0)",
+]
+
+CACHE_SIZE = 4096
+CHECK_INTERVAL = 0.5        # seconds between reads of the generation for anonymous sessions
+SIGNED_IN = "user_id"       # session key of a signed-in user, whose session is checked on every request
+REFRESH_AFTER = 5 * 60      # seconds a stored expiry may lag before an unmodified session is saved
+SWEEP_INTERVAL = 5 * 60     # seconds between sweeps of expired sessions
+SWEEP_BATCH = 1000          # expired sessions deleted per statement
+
+
+class SqliteSessionInterface(ServerSideSessionInterface):
+    # no TTL in the store: the base class registers `flask session_cleanup` for us
+    ttl = False
+
+    def __init__(self, app, db, **kwargs):
+        super().__init__(app, cleanup_n_requests=None, **kwargs)
+        self.db = db
+        for sql in SCHEMA:
+            db.execute(sql)
+        self._cache = OrderedDict()     # store_id -> (session dict, expiry)
+        self._lock = threading.Lock()
+        self._generation = self._read_generation()  # the sessions_generation the cache is at
+        self._checked_at = time.monotonic()
+        self._seen = threading.local()  # the session this thread's request loaded
+        self._last_sweep = 0.0
+
+    # ------------------ cache  ------------------ #
+    def _read_generation(self):
+        return self.db.tuples("SELECT generation FROM sessions_generation WHERE id = 0")[0][0]
+
+    def _cached(self, store_id):
+        """The cached (session, expiry) or None, and the generation the cache is at."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(store_id)
+        signed_in = entry is not None and SIGNED_IN in entry[0]
+        if signed_in or now - self._checked_at >= CHECK_INTERVAL:
+            self._checked_at = now
+            generation = self._read_generation()
+            with self._lock:
+                if generation > self._generation:
+                    self._generation = generation
+                    self._cache.clear()
+        with self._lock:
+            entry = self._cache.get(store_id)
+            if entry is not None:
+                self._cache.move_to_end(store_id)
+            return entry, self._generation
+
+    def _put(self, store_id, entry):
+        # with self._lock held
+        self._cache[store_id] = entry
+        self._cache.move_to_end(store_id)
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _remember(self, store_id, entry, generation):
+        """Cache a session read at generation, unless the cache has moved on since."""
+        with self._lock:
+            if generation == self._generation:
+                self._put(store_id, entry)
+
+    def _write(self, store_id, entry, sql, *args):
+        """Run sql writing entry (None: deleting) and bump the generation in one transaction,
+        then bring the cache up to date."""
+        self.db.execute("BEGIN")
+        try:
+            self.db.execute(sql, *args)
+            generation = self.db.tuples("UPDATE sessions_generation SET generation = generation + 1 "
+                                        " WHERE id = 0 RETURNING generation")[0][0]
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        with self._lock:
+            if generation <= self._generation:
+                # a later write has been seen already, and may have been to this session
+                self._cache.pop(store_id, None)
+                return
+            if generation > self._generation + 1:
+                # someone else wrote since the cache was last brought up to date
+                self._cache.clear()
+            self._generation = generation
+            if entry is None:
+                self._cache.pop(store_id, None)
+            else:
+                self._put(store_id, entry)
+
+    # ------------------ Flask-Session storage  ------------------ #
+    def _retrieve_session_data(self, store_id):
+        entry, generation = self._cached(store_id)
+        if entry is None:
+            rows = self.db.tuples("SELECT data, expiry FROM sessions WHERE id = ?", store_id)
+            if not rows:
+                return None
+            entry = (self.serializer.decode(rows[0][0]), rows[0][1])
+            self._remember(store_id, entry, generation)
+
+        data, expiry = entry
+        self._seen.loaded = (store_id, expiry)
+        if expiry <= time.time():
+            self._delete_session(store_id)
+            return None
+        return data
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        expiry = int(time.time() + session_lifetime.total_seconds())
+        self._write(store_id, (dict(session), expiry),
+                    "INSERT INTO sessions (id, data, expiry) VALUES (?, ?, ?) "
+                    "    ON CONFLICT (id) DO UPDATE SET data = excluded.data, expiry = excluded.expiry",
+                    store_id, self.serializer.encode(session), expiry)
+
+        if time.time() - self._last_sweep >= SWEEP_INTERVAL:
+            self._delete_expired_sessions()
+
+    def _delete_session(self, store_id):
+        self._write(store_id, None, "DELETE FROM sessions WHERE id = ?", store_id)
+
+    def _delete_expired_sessions(self):
+        # no generation bump: an expired session is dropped by every cache on its own
+        self._last_sweep = time.time()
+        now = int(self._last_sweep)
+        while self.db.execute("DELETE FROM sessions WHERE id IN "
+                              "  (SELECT id FROM sessions WHERE expiry <= ? LIMIT ?)",
+                              now, SWEEP_BATCH) == SWEEP_BATCH:
+            pass
+        with self._lock:
+            for store_id in [k for k, (_, expiry) in self._cache.items() if expiry <= now]:
+                del self._cache[store_id]
+
+    def should_set_storage(self, app, session):
+        if session.modified:
+            return True
+        if not app.config["SESSION_REFRESH_EACH_REQUEST"]:
+            return False
+        # the expiry the session had when this request loaded it
+        store_id, expiry = getattr(self._seen, "loaded", (None, 0))
+        stale = time.time() + app.permanent_session_lifetime.total_seconds() - REFRESH_AFTER
+        return store_id != self._get_store_id(session.sid) or expiry < stale
@@ -0,0 +1,273 @@
+import itertools
+
+# Materialized standings, kept up to date as results are scored so that no read
+# has to add up days_results:
+#
+#   draft_standings          one row per player of a draft: points, wins, losses, prizes
+#   player_standings         one row per player: totals over every draft they played
+#
+# A draft's cumulative points day by day are not stored: draft() works them out from
+# the days_results view (the draft's picks' bouts) when the table is read, so scoring
+# a day writes the totals only.
+#
+# add() and add_day() are called inside the caller's transaction, next to the
+# draft_picks update they mirror; rebuild() recreates a basho's rows from draft_picks
+# (when the standings tables are first created, and by recompute).
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS draft_standings (
+        draft_id INTEGER NOT NULL,
+        player_id INTEGER NOT NULL,
+        basho_id INTEGER NOT NULL,
+        points INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        special_prizes INTEGER NOT NULL DEFAULT 0,
+        basho_winner INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (draft_id, player_id),
+        FOREIGN KEY (draft_id) REFERENCES drafts(id),
+        FOREIGN KEY (player_id) REFERENCES players(id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_draft_standings_basho_points ON draft_standings(basho_id, points DESC)",
+    # the cumulative points by day are read from the bouts now
+    "DROP TABLE IF EXISTS draft_standings_by_day",
+    """CREATE TABLE IF NOT EXISTS player_standings (
+        player_id INTEGER PRIMARY KEY NOT NULL,
+        points INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        special_prizes INTEGER NOT NULL DEFAULT 0,
+        basho_winner INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (player_id) REFERENCES players(id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_player_standings_points ON player_standings(points DESC)",
+]
+
+COLUMNS = "points, wins, losses, special_prizes, basho_winner"
+
+# The day's bout of every pick of the drafts on the basho still waiting for the day, from
+# the winner's side and the loser's: (draft_id, player_id, rikishi_id, win, loss, points).
+# Parameters: basho_id, day, day - 1, twice.
+DAY_PICKS = """
+    SELECT dp.draft_id, dp.player_id, dp.rikishi_id, 1 AS win, 0 AS loss, b.points
+      FROM bouts AS b
+      JOIN draft_picks AS dp ON dp.rikishi_id = b.winner_id
+      JOIN drafts      AS d  ON d.id = dp.draft_id AND d.basho_id = b.basho_id
+     WHERE b.basho_id = ? AND b.tournament_day = ? AND d.last_days_results_loaded = ?
+    UNION ALL
+    SELECT dp.draft_id, dp.player_id, dp.rikishi_id, 0, 1, 0
+      FROM bouts AS b
+      JOIN draft_picks AS dp ON dp.rikishi_id = b.loser_id
+      JOIN drafts      AS d  ON d.id = dp.draft_id AND d.basho_id = b.basho_id
+     WHERE b.basho_id = ? AND b.tournament_day = ? AND d.last_days_results_loaded = ?"""
+
+
+def add(db, deltas, *params):
+    """
+    Add to the standings the rows selected by deltas, a SELECT of
+    (draft_id, player_id, points, wins, losses, special_prizes, basho_winner).
+    """
+    _stage(db, deltas, *params)
+    _apply(db)
+
+
+def add_day(db, basho_id, day):
+    """
+    Add the day's bouts (DAY_PICKS) to the standings of every draft on the basho that
+    is loading the day, straight from bouts and draft_picks. A player without a bout
+    still gets their draft_standings row, so the draft lists everyone once it is scored.
+    """
+    params = (basho_id, day, day - 1) * 2
+    db.execute(f"""
+        INSERT INTO draft_standings (draft_id, player_id, basho_id, {COLUMNS})
+        SELECT draft_id, player_id, ?, SUM(points), SUM(win), SUM(loss), 0, 0
+          FROM ({DAY_PICKS}
+                 UNION ALL
+                SELECT DISTINCT dp.draft_id, dp.player_id, 0, 0, 0, 0
+                  FROM draft_picks AS dp
+                  JOIN drafts AS d ON d.id = dp.draft_id
+                 WHERE d.basho_id = ? AND d.last_days_results_loaded = ?)
+         GROUP BY draft_id, player_id
+            ON CONFLICT (draft_id, player_id) DO UPDATE
+           SET points = points + excluded.points,
+               wins = wins + excluded.wins,
+               losses = losses + excluded.losses
+         WHERE excluded.wins + excluded.losses > 0""",
+        basho_id, *params, basho_id, day - 1)
+    db.execute(f"""
+        INSERT INTO player_standings (player_id, {COLUMNS})
+        SELECT player_id, SUM(points), SUM(win), SUM(loss), 0, 0
+          FROM ({DAY_PICKS}
+                 UNION ALL
+                SELECT DISTINCT dp.draft_id, dp.player_id, 0, 0, 0, 0
+                  FROM draft_picks AS dp
+                  JOIN drafts AS d ON d.id = dp.draft_id
+                 WHERE d.basho_id = ? AND d.last_days_results_loaded = ?)
+         GROUP BY player_id
+            ON CONFLICT (player_id) DO UPDATE
+           SET points = points + excluded.points,
+               wins = wins + excluded.wins,
+               losses = losses + excluded.losses
+         WHERE excluded.wins + excluded.losses > 0""",
+        *params, basho_id, day - 1)
+
+
+def _stage(db, deltas, *params):
+    db.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS standings_delta (
+            draft_id INTEGER NOT NULL,
+            player_id INTEGER NOT NULL,
+            points INTEGER NOT NULL,
+            wins INTEGER NOT NULL,
+            losses INTEGER NOT NULL,
+            special_prizes INTEGER NOT NULL,
+            basho_winner INTEGER NOT NULL
+        )""")
+    db.execute("DELETE FROM standings_delta")
+    db.execute(f"INSERT INTO standings_delta (draft_id, player_id, {COLUMNS}) {deltas}", *params)
+
+
+def _apply(db):
+    """Add the rows in standings_delta to draft_standings and player_standings."""
+    # the WHERE keeps SQLite from reading ON CONFLICT as part of the join
+    db.execute(f"""
+        INSERT INTO draft_standings (draft_id, player_id, basho_id, {COLUMNS})
+        SELECT sd.draft_id, sd.player_id, d.basho_id, sd.points, sd.wins, sd.losses,
+               sd.special_prizes, sd.basho_winner
+          FROM standings_delta AS sd
+         CROSS JOIN drafts AS d    -- keeps the unindexed staging table on the outside
+         WHERE d.id = sd.draft_id
+            ON CONFLICT (draft_id, player_id) DO UPDATE
+           SET points = points + excluded.points,
+               wins = wins + excluded.wins,
+               losses = losses + excluded.losses,
+               special_prizes = special_prizes + excluded.special_prizes,
+               basho_winner = basho_winner + excluded.basho_winner""")
+    db.execute(f"""
+        INSERT INTO player_standings (player_id, {COLUMNS})
+        SELECT player_id, SUM(points), SUM(wins), SUM(losses), SUM(special_prizes), SUM(basho_winner)
+          FROM standings_delta
+         GROUP BY player_id
+            ON CONFLICT (player_id) DO UPDATE
+           SET points = points + excluded.points,
+               wins = wins + excluded.wins,
+               losses = losses + excluded.losses,
+               special_prizes = special_prizes + excluded.special_prizes,
+               basho_winner = basho_winner + excluded.basho_winner""")
+    db.execute("DELETE FROM standings_delta")
+
+
+def rebuild(db, basho_id):
+    """Recreate the standings of every draft on the basho from draft_picks."""
+    # everyone whose totals can change: the players on the basho before, and after, the rebuild
+    db.execute("CREATE TEMP TABLE IF NOT EXISTS standings_players (player_id INTEGER PRIMARY KEY NOT NULL)")
+    db.execute("DELETE FROM standings_players")
+    db.execute("""
+        INSERT OR IGNORE INTO standings_players
+        SELECT player_id FROM draft_standings WHERE basho_id = ?
+         UNION
+        SELECT dp.player_id FROM draft_picks AS dp JOIN drafts AS d ON d.id = dp.draft_id WHERE d.basho_id = ?""",
+        basho_id, basho_id)
+
+    db.execute("DELETE FROM draft_standings WHERE basho_id = ?", basho_id)
+    db.execute(f"""
+        INSERT INTO draft_standings (draft_id, player_id, basho_id, {COLUMNS})
+        SELECT dp.draft_id, dp.player_id, d.basho_id, SUM(dp.points), SUM(dp.wins), SUM(dp.losses),
+               SUM(dp.special_prizes), SUM(dp.basho_winner)
+          FROM draft_picks AS dp
+          JOIN drafts AS d ON d.id = dp.draft_id
+         WHERE d.basho_id = ? AND d.last_days_results_loaded > 0
+         GROUP BY dp.draft_id, dp.player_id""",
+        basho_id)
+
+    # a player's totals span every basho they played, so add theirs up again from draft_standings;
+    # one left with no draft_standings at all (picks or drafts removed) loses their row
+    db.execute("DELETE FROM player_standings WHERE player_id IN (SELECT player_id FROM standings_players)")
+    db.execute(f"""
+        INSERT INTO player_standings (player_id, {COLUMNS})
+        SELECT player_id, SUM(points), SUM(wins), SUM(losses), SUM(special_prizes), SUM(basho_winner)
+          FROM draft_standings
+         WHERE player_id IN (SELECT player_id FROM standings_players)
+         GROUP BY player_id""")
+    db.execute("DELETE FROM standings_players")
+
+
+def remove_draft(db, draft_id):
+    """Take a draft's rows out of the standings before the draft is deleted."""
+    db.execute("""
+        UPDATE player_standings
+           SET points = player_standings.points - ds.points,
+               wins = player_standings.wins - ds.wins,
+               losses = player_standings.losses - ds.losses,
+               special_prizes = player_standings.special_prizes - ds.special_prizes,
+               basho_winner = player_standings.basho_winner - ds.basho_winner
+          FROM draft_standings AS ds
+         WHERE ds.player_id = player_standings.player_id AND ds.draft_id = ?""",
+        draft_id)
+    db.execute("DELETE FROM draft_standings WHERE draft_id = ?", draft_id)
+
+
+def draft(db, draft_id):
+    """
+    The draft's players best first, each with their totals and cumulative points by day:
+    [{player_id, name, rank, points, wins, losses, special_prizes, basho_winner, days: [...]}, ...]
+    """
+    players = db.execute("""
+        SELECT ds.player_id, p.name, ds.points, ds.wins, ds.losses, ds.special_prizes, ds.basho_winner
+          FROM draft_standings AS ds
+          JOIN players AS p ON p.id = ds.player_id
+         WHERE ds.draft_id = ?
+         ORDER BY ds.points DESC, p.name""",
+        draft_id)
+
+    # cumulative points by scored day (bouts only, the prizes and the yusho come at the end)
+    loaded = db.tuples("SELECT last_days_results_loaded FROM drafts WHERE id = ?", draft_id)
+    loaded = loaded[0][0] if loaded else 0
+    day_points = {player["player_id"]: [0] * loaded for player in players}
+    for player_id, day, points in db.tuples("SELECT dp.player_id, dr.tournament_day, SUM(dr.points) "
+                                            "  FROM days_results AS dr "
+                                            "  JOIN draft_picks AS dp "
+                                            "    ON dp.draft_id = dr.draft_id AND dp.rikishi_id = dr.rikishi_id "
+                                            " WHERE dr.draft_id = ? "
+                                            " GROUP BY dp.player_id, dr.tournament_day",
+                                            draft_id):
+        if player_id in day_points and day <= loaded:
+            day_points[player_id][day - 1] = points
+    days = {player_id: list(itertools.accumulate(points)) for player_id, points in day_points.items()}
+
+    rank = 0
+    for i, player in enumerate(players):
+        if i == 0 or player["points"] != players[i - 1]["points"]:
+            rank = i + 1
+        player["rank"] = rank
+        player["days"] = days.get(player["player_id"], [])
+    return players
+
+
+def leaderboard(db, user_id, basho_id=None, limit=50):
+    """
+    The user's best limit players of a basho over all its drafts, or their best
+    players over everything they have played when basho_id is None.
+    """
+    if basho_id is None:
+        return db.execute("""
+            SELECT ps.player_id, p.name, u.username, ps.points, ps.wins, ps.losses, ps.special_prizes, ps.basho_winner
+              FROM player_standings AS ps
+              JOIN players AS p ON p.id = ps.player_id
+              JOIN users   AS u ON u.id = p.user_id
+             WHERE p.user_id = ?
+             ORDER BY ps.points DESC
+             LIMIT ?""",
+            user_id, limit)
+
+    return db.execute("""
+        SELECT ds.draft_id, d.name AS draft_name, ds.player_id, p.name, u.username,
+               ds.points, ds.wins, ds.losses, ds.special_prizes, ds.basho_winner
+          FROM draft_standings AS ds
+          JOIN drafts  AS d ON d.id = ds.draft_id
+          JOIN players AS p ON p.id = ds.player_id
+          JOIN users   AS u ON u.id = p.user_id
+         WHERE ds.basho_id = ? AND p.user_id = ?
+         ORDER BY ds.points DESC
+         LIMIT ?""",
+        basho_id, user_id, limit)
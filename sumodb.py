@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+import instrument
+
+# Every page we read from sumodb goes through get_page(), which keeps the raw
+# html on disk so repeated scoring, backfills and dev runs hardly touch the network.
+#
+#   <cache dir>/objects/<sha256 of body>   raw html, stored once per distinct page body
+#   <cache dir>/urls/<sha256 of url>.json  {url, body, etag, last_modified, fetched_at}
+#
+# SUMODB_CACHE_DIR moves the cache (e.g. to a directory of saved fixtures) and
+# SUMODB_OFFLINE=1 serves only from the cache, never from the network.
+# SUMODB_BASE_URL points at another server with the same pages (e.g. bench/standin.py).
+
+BASE_URL = os.getenv("SUMODB_BASE_URL", "https://sumodb.sumogames.de/")
+CACHE_DIR = os.getenv("SUMODB_CACHE_DIR",
+                      os.path.join(os.path.dirname(__file__), ".sumodb_cache"))
+TIMEOUT = 30
+
+# politeness: at most FETCH_WORKERS downloads at once, and after a first burst of
+# FETCH_WORKERS no more than RATE_LIMIT request starts per second to any one host;
+# failed downloads are retried RETRIES times with exponential backoff
+FETCH_WORKERS = 4
+RATE_LIMIT = 8
+RETRIES = 3
+BACKOFF = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+FOREVER = None
+
+# hits: served from disk, revalidated: 304 from sumodb, misses: full download
+stats = {"hits": 0, "revalidated": 0, "misses": 0, "retries": 0}
+_stats_lock = threading.Lock()
+
+_buckets = {}      # host -> (tokens, time they were counted), a token bucket per host
+_rate_lock = threading.Lock()
+
+log = logging.getLogger(__name__)
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+
+def offline():
+    return os.getenv("SUMODB_OFFLINE", "0") == "1"
+
+
+def basho_is_over(year: int, month: int) -> bool:
+    """A basho is over (and its pages final) once its month has passed."""
+    today = date.today()
+    return (year, month) < (today.year, today.month)
+
+
+def basho_over_at(year: int, month: int) -> float:
+    """The time (epoch seconds) basho_is_over() turns true: the start of the next month."""
+    return datetime(year + month // 12, month % 12 + 1, 1).timestamp()
+
+
+def ttl_for(url, fetched_at=None):
+    """
+    Seconds a cached copy of url stays fresh without asking sumodb, or FOREVER.
+    Pages for a basho whose month has passed never change, but only a copy fetched
+    after that is final: one fetched during the basho may miss the last corrections.
+    :param fetched_at: when the cached copy was fetched (epoch seconds), if there is one
+    """
+    m = re.search(r"[?&]b=(\d{4})(\d{2})", url)
+    finished = (m is not None and basho_is_over(int(m.group(1)), int(m.group(2)))
+                and (fetched_at is None or fetched_at >= basho_over_at(int(m.group(1)), int(m.group(2)))))
+
+    if "results.aspx" in url or "Results_text.aspx" in url:
+        return FOREVER if finished else 10 * MINUTE
+    if "Banzuke.aspx" in url:
+        return FOREVER if finished else HOUR
+    if "Sansho.aspx" in url:
+        # one page for every basho, grows at the end of each one
+        return HOUR
+    return 10 * MINUTE
+
+
+def _key(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _meta_path(url):
+    return os.path.join(CACHE_DIR, "urls", _key(url) + ".json")
+
+
+def _object_path(digest):
+    return os.path.join(CACHE_DIR, "objects", digest)
+
+
+def _write_atomic(path, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _load(url):
+    """Return (meta, html) for a cached url, or (None, None)."""
+    try:
+        with open(_meta_path(url)) as f:
+            meta = json.load(f)
+        with open(_object_path(meta["body"]), encoding="utf-8") as f:
+            return meta, f.read()
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+def _store(url, html, etag=None, last_modified=None):
+    digest = _key(html)
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        _write_atomic(path, html.encode("utf-8"))
+    meta = {"url": url, "body": digest, "etag": etag,
+            "last_modified": last_modified, "fetched_at": time.time()}
+    _write_atomic(_meta_path(url), json.dumps(meta).encode())
+
+
+def _count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+
+def _wait_turn(url):
+    """Sleep until the per-host rate limit lets another request start."""
+    host = urlsplit(url).netloc
+    with _rate_lock:
+        now = time.monotonic()
+        tokens, counted = _buckets.get(host, (FETCH_WORKERS, now))
+        # take a token now; a negative balance is a place in the queue
+        tokens = min(FETCH_WORKERS, tokens + (now - counted) * RATE_LIMIT) - 1
+        _buckets[host] = (tokens, now)
+    if tokens < 0:
+        time.sleep(-tokens / RATE_LIMIT)
+
+
+def _download(url, headers):
+    """GET url, retrying connection errors, timeouts, 429 and 5xx with exponential backoff."""
+    for attempt in range(RETRIES + 1):
+        _wait_turn(url)
+        start = time.perf_counter()
+        try:
+            resp = _session.get(url, headers=headers, timeout=TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == RETRIES:
+                raise
+        else:
+            instrument.record_http(time.perf_counter() - start, len(resp.content))
+            if resp.status_code not in RETRY_STATUS or attempt == RETRIES:
+                return resp
+        _count("retries")
+        time.sleep(BACKOFF * 2 ** attempt * (1 + random.random()))
+
+
+def get_page(url, ttl=-1):
+    """
+    Return the html of a sumodb page, from the disk cache when it is fresh,
+    otherwise revalidating with ETag / If-Modified-Since or downloading it.
+    :param url: full url of the page
+    :param ttl: seconds the cached copy stays fresh; defaults to ttl_for(url, <when it was fetched>)
+    """
+    meta, html = _load(url)
+    if ttl == -1:
+        ttl = ttl_for(url, meta["fetched_at"] if meta else None)
+    if html is not None:
+        fresh = ttl is FOREVER or time.time() - meta["fetched_at"] < ttl
+        if fresh or offline():
+            _count("hits")
+            return html
+    elif offline():
+        raise RuntimeError(f"{url} is not in the sumodb cache and SUMODB_OFFLINE is set")
+
+    headers = {}
+    if html is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    resp = _download(url, headers)
+    if resp.status_code == 304 and html is not None:
+        _count("revalidated")
+        _store(url, html, meta.get("etag"), meta.get("last_modified"))
+        return html
+
+    resp.raise_for_status()
+    _count("misses")
+    _store(url, resp.text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    return resp.text
+
+
+def prefetch(urls):
+    """
+    Start downloading urls into the cache on up to FETCH_WORKERS threads and
+    return {url: future}. Wait on a url's future before reading it with get_page()
+    and the read is a cache hit. A failed download is logged, not raised, so the
+    later get_page() tries again and raises in the caller.
+    """
+
+    def fetch(url):
+        try:
+            get_page(url)
+        except Exception:
+            log.warning("prefetch of %s failed", url, exc_info=True)
+
+    pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="sumodb")
+    futures = {url: pool.submit(fetch, url) for url in dict.fromkeys(urls)}
+    pool.shutdown(wait=False)
+    return futures
+
+
+def cache_stats():
+    """Hit/miss counters since the process started, plus the hit ratio."""
+    total = stats["hits"] + stats["revalidated"] + stats["misses"]
+    return dict(stats, hit_ratio=(stats["hits"] + stats["revalidated"]) / total if total else 0.0)
@@ -0,0 +1,448 @@
+import html as htmllib
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+# Parsers for the four sumodb pages honbasho reads, with two interchangeable backends:
+#
+#   fast  scans only the table (or <pre>) it needs with a regex tokenizer and keeps
+#         flat per-cell lists, no document tree (the default)
+#   soup  the original BeautifulSoup parsers, kept as the reference
+#
+# SUMOPARSE_BACKEND picks one. Both return exactly the same values; bench/parsers.py
+# checks that against saved pages and times them.
+
+BACKEND = os.getenv("SUMOPARSE_BACKEND", "fast")
+
+PRIZE_NAMES = ["Gino‑sho", "Shukun‑sho", "Kanto‑sho"]
+WIN_IMAGES = ("hoshi_shiro.gif", "hoshi_fusensho.gif")
+
+
+def c_to_rank(c):
+    special_ranks = {'Y': 1, 'O': 2, 'S': 3, 'K': 4}
+    if c in special_ranks:
+        return special_ranks[c]
+    return int(c[1:]) + 4
+
+
+def makuuchi_winner(lines):
+    """Ring name with the most wins in the Makuuchi block of Results_text, or None."""
+    in_makuuchi = False
+    most_wins = -1
+    winner = None
+
+    for line in lines:
+        line = line.strip()
+        if line == "Makuuchi":
+            in_makuuchi = True
+            continue
+        elif in_makuuchi and re.match(r"^[A-Z][a-z]", line):  # e.g. "Juryo"
+            break
+        elif in_makuuchi:
+            parts = re.split(r"\s{2,}", line)
+            for i in [1, 4]:  # these are the ring name + record columns
+                if i < len(parts):
+                    part = parts[i]
+                    if "(" in part and ")" in part:
+                        try:
+                            ring_name = part.split(" (")[0]
+                            record = part.split("(")[1].split(")")[0]
+                            wins = int(record.split("-")[0])
+                            if wins > most_wins:
+                                most_wins = wins
+                                winner = ring_name
+                        except Exception:
+                            continue
+    return winner
+
+
+# ------------------ soup backend  ------------------  #
+
+def soup_results(html):
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", class_="tk_table")
+    if not table:
+        raise RuntimeError("Couldn't find the results table")
+
+    bouts = []
+    for tr in table.find_all("tr"):
+        tds = tr.find_all("td")
+        if len(tds) != 5:
+            continue
+
+        left_star  = tds[0].find("img")["src"]
+        right_star = tds[4].find("img")["src"]
+
+        # decide which side won
+        if any(img in left_star  for img in WIN_IMAGES):
+            winner_td, loser_td = tds[1], tds[3]
+        elif any(img in right_star for img in WIN_IMAGES):
+            winner_td, loser_td = tds[3], tds[1]
+        else:
+            # no clear winner marker → skip
+            continue
+
+        # technique override for fusen‐wins/dropouts
+        if "fusen" in left_star or "fusen" in right_star:
+            technique = "fusen"
+        else:
+            tech_strings = list(tds[2].stripped_strings)
+            technique = next((s for s in tech_strings if s.isalpha()), "")
+
+        # helper to extract name + record and strip off the "(...)"
+        def extract_info(cell):
+            name = cell.find(
+                "a", href=lambda u: u and u.startswith("Rikishi.aspx")
+            ).get_text(strip=True)
+            raw_rec = cell.find(
+                "a", href=lambda u: u and "Rikishi_basho.aspx" in u
+            ).get_text(strip=True)
+            rec = re.sub(r'\s*\(.*?\)', '', raw_rec)
+            return name, rec
+
+        winner_name, winner_record = extract_info(winner_td)
+        loser_name,  loser_record  = extract_info(loser_td)
+
+        bouts.append({
+            "winner":        winner_name,
+            "winner_record": winner_record,
+            "loser":         loser_name,
+            "loser_record":  loser_record,
+            "technique":     technique
+        })
+
+    return bouts
+
+
+def soup_banzuke(html):
+    soup = BeautifulSoup(html, "html.parser")
+    # find the banzuke table whose caption says "Makuuchi Banzuke"
+    makuuchi_table = None
+    for tbl in soup.find_all("table", class_="banzuke"):
+        cap = tbl.find("caption")
+        if cap and "Makuuchi Banzuke" in cap.get_text():
+            makuuchi_table = tbl
+            break
+    if makuuchi_table is None:
+        return []
+
+    results = []
+    for tr in makuuchi_table.tbody.find_all("tr"):
+        # the rank cell in every row
+        rank_td = tr.find("td", class_="short_rank")
+        if not rank_td:
+            continue
+        rank = c_to_rank(rank_td.get_text(strip=True))
+
+        # grab *any* cell with a link to Rikishi.aspx (skips the record‑links,
+        # because those point to Rikishi_basho.aspx, not Rikishi.aspx)
+        rikishi_tds = [
+            td for td in tr.find_all("td")
+            if td.find("a", href=lambda u: u and u.startswith("Rikishi.aspx"))
+        ]
+
+        for td in rikishi_tds:
+            name = td.find("a", href=lambda u: u and u.startswith("Rikishi.aspx")).get_text(strip=True)
+            # East if it's to the left of the rank cell; otherwise West
+            side = "East" if tr.find_all("td").index(td) < tr.find_all("td").index(rank_td) else "West"
+            results.append({
+                "name": name,
+                "rank": rank,
+                "side": side
+            })
+
+    return results
+
+
+def soup_sansho(html, target):
+    soup = BeautifulSoup(html, "html.parser")
+
+    table = soup.find("table")
+    if not table:
+        raise RuntimeError("No table found on page")
+
+    rows = table.find_all("tr")
+    target_row = None
+    for row in rows[1:]:  # skip header
+        cells = row.find_all("td")
+        if not cells:
+            continue
+        if cells[0].text.strip() == target:
+            target_row = cells
+            break
+
+    if not target_row:
+        raise ValueError(f"No basho found for {target}")
+
+    results = []
+    for idx, prize in enumerate(PRIZE_NAMES, start=1):
+        td = target_row[idx]
+        if not td or not td.text.strip() or "not awarded" in td.text.lower():
+            continue
+
+        for a in td.find_all("a"):
+            full_text = a.text.strip()
+            # Strip rank prefix like "M14e Kusano"
+            parts = full_text.split()
+            ring_name = parts[-1] if len(parts) >= 2 else full_text
+            results.append({
+                "prize": prize,
+                "ring_name": ring_name
+            })
+
+    return results
+
+
+def soup_yusho(html):
+    soup = BeautifulSoup(html, "html.parser")
+    pre = soup.find("pre")
+    if not pre:
+        raise RuntimeError("Could not find results text block")
+    return makuuchi_winner(pre.get_text().splitlines())
+
+
+# ------------------ fast backend  ------------------  #
+
+_TOKEN = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9]*)([^>]*)>|([^<]+)", re.S)
+_ATTR = re.compile(r"""([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+_RESULTS_TABLE = re.compile(r"""<table\b[^>]*\bclass\s*=\s*["']?[^"'>]*\btk_table\b""", re.I)
+_BANZUKE_TABLE = re.compile(r"""<table\b[^>]*\bclass\s*=\s*["']?[^"'>]*\bbanzuke\b""", re.I)
+_ANY_TABLE = re.compile(r"<table\b", re.I)
+_PRE = re.compile(r"<pre\b[^>]*>(.*?)</pre\s*>", re.I | re.S)
+_TAG = re.compile(r"<[^>]*>")
+
+
+def _text(s):
+    return htmllib.unescape(s) if "&" in s else s
+
+
+def _find_tag(html, pattern):
+    """Starts of the matches of pattern that are not inside a <script> or a comment."""
+    lower = None
+    for m in pattern.finditer(html):
+        if lower is None:
+            lower = html.lower()
+        at = m.start()
+        if (lower.rfind("<script", 0, at) <= lower.rfind("</script", 0, at)
+                and html.rfind("<!--", 0, at) <= html.rfind("-->", 0, at)):
+            yield at
+
+
+def _attrs(s):
+    return {m.group(1).lower(): _text(m.group(2) or m.group(3) or m.group(4) or "")
+            for m in _ATTR.finditer(s)}
+
+
+class Cell:
+    """A <td>: its class, image srcs, [href, text pieces] of its links and its text pieces."""
+
+    __slots__ = ("cls", "imgs", "links", "strings")
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.imgs = []
+        self.links = []
+        self.strings = []
+
+    def text(self):
+        return "".join(self.strings)
+
+    def stripped_strings(self):
+        return [s.strip() for s in self.strings if s.strip()]
+
+    def link(self, test):
+        """Text of the first link whose href passes test, as get_text(strip=True), or None."""
+        for href, pieces in self.links:
+            if test(href):
+                return "".join(p.strip() for p in pieces)
+        return None
+
+
+def read_table(html, start):
+    """
+    Tokenize one table from the '<table' at start up to its closing tag.
+    Returns (caption text, rows), each row a list of the Cells of its <td>s.
+    """
+    caption = []
+    rows = []
+    depth = 0
+    row = cell = None
+    in_caption = in_link = False
+
+    for m in _TOKEN.finditer(html, start):
+        closing, tag, attrs, text = m.groups()
+        if tag is None and text is None:
+            continue    # a comment
+        if text is not None:
+            if in_caption:
+                caption.append(text)
+            if cell is not None:
+                text = _text(text)
+                cell.strings.append(text)
+                if in_link:
+                    cell.links[-1][1].append(text)
+            continue
+
+        tag = tag.lower()
+        if tag == "table":
+            depth += -1 if closing else 1
+            if depth == 0:
+                break
+        elif depth != 1 and tag != "a" and tag != "img":
+            continue
+        elif tag == "tr":
+            if closing:
+                row = cell = None
+            else:
+                row = []
+                rows.append(row)
+        elif tag == "td":
+            in_link = False
+            if closing:
+                cell = None
+            elif row is not None:
+                cell = Cell(_attrs(attrs).get("class", "") if "class" in attrs else "")
+                row.append(cell)
+        elif tag == "th":
+            cell = None
+        elif tag == "caption":
+            in_caption = not closing
+        elif tag == "a" and cell is not None:
+            if closing:
+                in_link = False
+            else:
+                cell.links.append([_attrs(attrs).get("href", ""), []])
+                in_link = True
+        elif tag == "img" and cell is not None and not closing:
+            cell.imgs.append(_attrs(attrs).get("src", ""))
+
+    return _text("".join(caption)), rows
+
+
+def _is_rikishi(href):
+    return href.startswith("Rikishi.aspx")
+
+
+def _is_record(href):
+    return "Rikishi_basho.aspx" in href
+
+
+def fast_results(html):
+    start = next(_find_tag(html, _RESULTS_TABLE), None)
+    if start is None:
+        raise RuntimeError("Couldn't find the results table")
+
+    bouts = []
+    for tds in read_table(html, start)[1]:
+        if len(tds) != 5 or not tds[0].imgs or not tds[4].imgs:
+            continue
+        left_star, right_star = tds[0].imgs[0], tds[4].imgs[0]
+
+        if any(img in left_star for img in WIN_IMAGES):
+            winner_td, loser_td = tds[1], tds[3]
+        elif any(img in right_star for img in WIN_IMAGES):
+            winner_td, loser_td = tds[3], tds[1]
+        else:
+            continue
+
+        if "fusen" in left_star or "fusen" in right_star:
+            technique = "fusen"
+        else:
+            technique = next((s for s in tds[2].stripped_strings() if s.isalpha()), "")
+
+        bouts.append({
+            "winner":        winner_td.link(_is_rikishi),
+            "winner_record": re.sub(r'\s*\(.*?\)', '', winner_td.link(_is_record)),
+            "loser":         loser_td.link(_is_rikishi),
+            "loser_record":  re.sub(r'\s*\(.*?\)', '', loser_td.link(_is_record)),
+            "technique":     technique
+        })
+
+    return bouts
+
+
+def fast_banzuke(html):
+    for start in _find_tag(html, _BANZUKE_TABLE):
+        caption, rows = read_table(html, start)
+        if "Makuuchi Banzuke" in caption:
+            break
+    else:
+        return []
+
+    results = []
+    for tds in rows:
+        rank_at = next((i for i, td in enumerate(tds) if "short_rank" in td.cls.split()), None)
+        if rank_at is None:
+            continue
+        rank = c_to_rank("".join(tds[rank_at].stripped_strings()))
+
+        for i, td in enumerate(tds):
+            name = td.link(_is_rikishi)
+            if name is not None:
+                results.append({
+                    "name": name,
+                    "rank": rank,
+                    "side": "East" if i < rank_at else "West"
+                })
+
+    return results
+
+
+def fast_sansho(html, target):
+    start = next(_find_tag(html, _ANY_TABLE), None)
+    if start is None:
+        raise RuntimeError("No table found on page")
+
+    target_row = next((cells for cells in read_table(html, start)[1][1:]
+                       if cells and cells[0].text().strip() == target), None)
+    if not target_row:
+        raise ValueError(f"No basho found for {target}")
+
+    results = []
+    for idx, prize in enumerate(PRIZE_NAMES, start=1):
+        text = target_row[idx].text()
+        if not text.strip() or "not awarded" in text.lower():
+            continue
+        for _, pieces in target_row[idx].links:
+            full_text = "".join(pieces)
+            parts = full_text.split()
+            results.append({
+                "prize": prize,
+                "ring_name": parts[-1] if len(parts) >= 2 else full_text.strip()
+            })
+
+    return results
+
+
+def fast_yusho(html):
+    start = next(_find_tag(html, _PRE), None)
+    if start is None:
+        raise RuntimeError("Could not find results text block")
+    return makuuchi_winner(_text(_TAG.sub("", _PRE.match(html, start).group(1))).splitlines())
+
+
+BACKENDS = {
+    "soup": (soup_results, soup_banzuke, soup_sansho, soup_yusho),
+    "fast": (fast_results, fast_banzuke, fast_sansho, fast_yusho),
+}
+
+
+def parse_results(html, backend=None):
+    """[{winner, winner_record, loser, loser_record, technique}] of a results.aspx page."""
+    return BACKENDS[backend or BACKEND][0](html)
+
+
+def parse_banzuke(html, backend=None):
+    """[{name, rank, side}] of the Makuuchi table of a Banzuke.aspx page, [] if not published."""
+    return BACKENDS[backend or BACKEND][1](html)
+
+
+def parse_sansho(html, target, backend=None):
+    """[{prize, ring_name}] of the basho target ("YYYY.MM") on the Sansho.aspx page."""
+    return BACKENDS[backend or BACKEND][2](html, target)
+
+
+def parse_yusho(html, backend=None):
+    """Ring name of the Makuuchi yusho winner on a Results_text.aspx page, or None."""
+    return BACKENDS[backend or BACKEND][3](html)